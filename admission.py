@@ -0,0 +1,177 @@
+"""
+Admission control for the query path.
+
+Without limits, a traffic spike parks every /query request in the
+FastAPI threadpool, each one waiting on the embedder and then up to
+LLM_API_TIMEOUT on the LLM, until all of them time out together.
+Instead:
+
+    query_gate   → at most QUERY_MAX_CONCURRENT queries run at once; a
+                   request that cannot get a slot within QUERY_QUEUE_TIMEOUT
+                   is rejected with 503 + Retry-After.
+    Deadline     → every query has a budget of QUERY_DEADLINE_SECONDS from
+                   arrival; what is left is the LLM call's timeout.
+    llm_gate     → at most LLM_MAX_CONCURRENT LLM calls. When no slot frees
+                   up within LLM_QUEUE_TIMEOUT, or less than LLM_MIN_BUDGET
+                   is left, the query is answered retrieval-only
+                   (degraded=true, no LLM answer). /query/batch waits for
+                   a slot up to its own deadline instead.
+    llm_batch_gate → batch LLM calls first take one of its
+                   LLM_BATCH_MAX_CONCURRENT slots (default: one less than
+                   llm_gate), so batches never hold every llm_gate slot
+                   and interactive queries keep at least one.
+    single_flight → identical concurrent queries (same partition, user,
+                   mode and text) run once; the others wait for its result.
+
+Counts per decision are in drive_agent_admission_total.
+"""
+
+import os
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+from backend.app.utils.metrics import REGISTRY
+
+QUERY_MAX_CONCURRENT = int(os.environ.get("QUERY_MAX_CONCURRENT", "8"))
+QUERY_QUEUE_TIMEOUT = float(os.environ.get("QUERY_QUEUE_TIMEOUT", "2.0"))        # seconds
+QUERY_DEADLINE_SECONDS = float(os.environ.get("QUERY_DEADLINE_SECONDS", "20"))
+LLM_MAX_CONCURRENT = int(os.environ.get("LLM_MAX_CONCURRENT", "4"))
+LLM_QUEUE_TIMEOUT = float(os.environ.get("LLM_QUEUE_TIMEOUT", "1.0"))
+LLM_BATCH_MAX_CONCURRENT = int(os.environ.get("LLM_BATCH_MAX_CONCURRENT", str(max(1, LLM_MAX_CONCURRENT - 1))))
+LLM_MIN_BUDGET = 2.0          # seconds; with less left the LLM call is not worth starting
+
+ADMISSION_TOTAL = REGISTRY.counter(
+    "drive_agent_admission_total", "Query admission decisions, by gate and result",
+)
+
+
+class Overloaded(Exception):
+    """No capacity within the queue deadline; the caller should retry later."""
+
+    def __init__(self, gate: str, retry_after: int):
+        super().__init__(f"{gate} overloaded, retry in {retry_after}s")
+        self.gate = gate
+        self.retry_after = retry_after
+
+
+class Deadline:
+    """Absolute time budget of one request."""
+
+    def __init__(self, seconds: float = QUERY_DEADLINE_SECONDS):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+
+# -------------------------------------------------------------------------
+# Bounded concurrency with a bounded queue wait
+# -------------------------------------------------------------------------
+class Gate:
+    EWMA_ALPHA = 0.2              # weight of the newest service time
+
+    def __init__(self, name: str, limit: int, queue_timeout: float):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._service_seconds = 1.0           # EWMA, for Retry-After
+        self._sem = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> int:
+        """Seconds until the work ahead of a new request has likely drained."""
+        with self._lock:
+            backlog = self.active + self.waiting
+        return max(1, math.ceil(self._service_seconds * backlog / self.limit))
+
+    def try_enter(self, timeout: float) -> bool:
+        with self._lock:
+            self.waiting += 1
+        ok = self._sem.acquire(timeout=max(0.0, timeout))
+        with self._lock:
+            self.waiting -= 1
+            if ok:
+                self.active += 1
+        return ok
+
+    def leave(self, seconds: float):
+        with self._lock:
+            self.active -= 1
+            self._service_seconds += self.EWMA_ALPHA * (seconds - self._service_seconds)
+        self._sem.release()
+
+    @contextmanager
+    def slot(self, deadline: Deadline = None, queue_timeout: float = None):
+        """Hold one slot; raises Overloaded if none frees up in time (queue_timeout overrides the gate's)."""
+        wait = self.queue_timeout if queue_timeout is None else queue_timeout
+        timeout = wait if deadline is None else min(wait, deadline.remaining())
+        if not self.try_enter(timeout):
+            ADMISSION_TOTAL.inc(gate=self.name, result="rejected")
+            raise Overloaded(self.name, self.retry_after())
+
+        ADMISSION_TOTAL.inc(gate=self.name, result="admitted")
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.leave(time.monotonic() - started)
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "active": self.active, "waiting": self.waiting,
+                "service_seconds": round(self._service_seconds, 3)}
+
+
+query_gate = Gate("query", QUERY_MAX_CONCURRENT, QUERY_QUEUE_TIMEOUT)
+llm_gate = Gate("llm", LLM_MAX_CONCURRENT, LLM_QUEUE_TIMEOUT)
+llm_batch_gate = Gate("llm_batch", LLM_BATCH_MAX_CONCURRENT, LLM_QUEUE_TIMEOUT)
+
+
+# -------------------------------------------------------------------------
+# Single-flight
+# -------------------------------------------------------------------------
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Concurrent do() calls with the same key share one execution of fn."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout: float = None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            ADMISSION_TOTAL.inc(gate="single_flight", result="shared")
+            if not call.done.wait(timeout):
+                raise Overloaded("single_flight", query_gate.retry_after())
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,108 @@
+"""
+Synthetic Drive corpus generator (benchmarks).
+
+    python bench_corpus.py out_dir --files 200 --paragraphs 20
+
+Writes a reproducible mix of PDF / DOCX / TXT / PNG files filled with
+pseudo-random business prose. The same seed always gives the same corpus,
+so benchmark runs are comparable.
+"""
+
+import os
+import random
+import argparse
+
+VOCAB = (
+    "invoice contract resume project report budget meeting summary design review "
+    "quarterly revenue customer support policy onboarding roadmap deadline vendor "
+    "payment schedule architecture deployment incident analysis hiring training "
+    "forecast marketing campaign launch feedback security compliance audit"
+).split()
+
+DEFAULT_MIX = {"pdf": 0.4, "docx": 0.3, "txt": 0.2, "png": 0.1}
+
+
+def _paragraph(rng: random.Random, words: int = 80) -> str:
+    text = " ".join(rng.choice(VOCAB) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _write_txt(path, paragraphs):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(paragraphs))
+
+
+def _write_pdf(path, paragraphs, per_page=5):
+    import fitz
+
+    doc = fitz.open()
+    for i in range(0, len(paragraphs), per_page):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), "\n\n".join(paragraphs[i:i + per_page]), fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def _write_docx(path, paragraphs):
+    from docx import Document
+
+    doc = Document()
+    for p in paragraphs:
+        doc.add_paragraph(p)
+    doc.save(path)
+
+
+def _write_png(path, paragraphs):
+    from PIL import Image, ImageDraw
+
+    lines = []
+    for p in paragraphs[:3]:
+        words = p.split()
+        lines += [" ".join(words[i:i + 10]) for i in range(0, len(words), 10)]
+
+    img = Image.new("RGB", (900, 20 + 18 * len(lines)), "white")
+    draw = ImageDraw.Draw(img)
+    for i, line in enumerate(lines):
+        draw.text((10, 10 + 18 * i), line, fill="black")
+    img.save(path)
+
+
+WRITERS = {"pdf": _write_pdf, "docx": _write_docx, "txt": _write_txt, "png": _write_png}
+
+
+def generate_corpus(out_dir: str, files: int = 100, paragraphs: int = 20,
+                    mix: dict = None, seed: int = 42, prefix: str = "doc") -> list[str]:
+    """Create `files` documents in `out_dir`; returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds, weights = zip(*mix.items())
+
+    paths = []
+    for i in range(files):
+        kind = rng.choices(kinds, weights)[0]
+        n = max(1, int(rng.gauss(paragraphs, paragraphs / 4)))
+        body = [_paragraph(rng) for _ in range(n)]
+
+        path = os.path.join(out_dir, f"{prefix}_{i:05d}.{kind}")
+        WRITERS[kind](path, body)
+        paths.append(path)
+
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("out_dir")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.out_dir, args.files, args.paragraphs, seed=args.seed)
+    size = sum(os.path.getsize(p) for p in paths)
+    print(f"✔ {len(paths)} files, {size / 1e6:.1f} MB → {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
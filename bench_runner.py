@@ -0,0 +1,251 @@
+"""
+End-to-end benchmark suite.
+
+    python bench_runner.py                                  # defaults
+    python bench_runner.py --files 500 --index-sizes 10000 100000 1000000 \\
+                           --concurrency 1 8 32 --llm-latency-ms 300
+
+Everything runs against local stand-ins — no Google Drive, no LLM provider:
+    - bench_corpus.py      synthetic PDF / DOCX / TXT / PNG corpus
+    - fake_drive.py        Drive v3 files()/changes() served from that corpus
+    - mock_llm_server.py   OpenAI-compatible endpoint with fixed latency
+
+Scenarios:
+    full_sync          sync_drive_files over the whole corpus
+    incremental_sync   add --new-files files, sync again
+    query_latency      answer_query() end to end on the synced index
+    search_scaling     FaissStore.search latency at each --index-sizes
+    concurrent_query   answer_query() from N threads at each --concurrency
+
+Results are written as JSON (one file per run) so the sync pipeline,
+FaissStore and query path can be compared run over run.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def _percentiles(samples_ms: list) -> dict:
+    if not samples_ms:
+        return {}
+    arr = np.asarray(samples_ms)
+    return {
+        "count": len(samples_ms),
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+        "max_ms": round(float(arr.max()), 3),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def _queries(n: int, seed: int = 7) -> list[str]:
+    from backend.bench.bench_corpus import VOCAB
+
+    rng = random.Random(seed)
+    return [" ".join(rng.sample(VOCAB, 4)) for _ in range(n)]
+
+
+# -------------------------------------------------------------------------
+# Scenarios
+# -------------------------------------------------------------------------
+def run_sync(drive) -> dict:
+    from backend.app.drive.sync_jobs import SyncJob
+    from backend.app.drive.sync_service import sync_drive_files
+
+    requests_before, bytes_before = drive.requests, drive.bytes_served
+    job = SyncJob(trigger="bench")
+    job.started_at = time.time()
+
+    start = time.perf_counter()
+    sync_drive_files(job=job, service=drive)
+    wall = time.perf_counter() - start
+
+    job.finished_at = time.time()
+    report = job.to_dict()
+    return {
+        "wall_seconds": round(wall, 3),
+        "progress": report["progress"],
+        "stage_seconds": report["stage_seconds"],
+        "throughput": report["throughput"],
+        "drive_requests": drive.requests - requests_before,
+        "drive_bytes": drive.bytes_served - bytes_before,
+    }
+
+
+def run_query_latency(queries: list[str]) -> dict:
+    from backend.app.rag.query_service import answer_query
+
+    answer_query(queries[0])                  # warm-up (model + index load)
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        answer_query(q)
+        samples.append((time.perf_counter() - start) * 1000)
+    return _percentiles(samples)
+
+
+def run_concurrent(queries: list[str], levels: list[int]) -> dict:
+    from backend.app.rag.query_service import answer_query
+
+    out = {}
+    for level in levels:
+        samples = []
+
+        def one(q):
+            start = time.perf_counter()
+            answer_query(q)
+            samples.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            list(pool.map(one, queries))
+        wall = time.perf_counter() - start
+
+        out[str(level)] = {"qps": round(len(queries) / wall, 2), **_percentiles(samples)}
+    return out
+
+
+def run_search_scaling(sizes: list[int], dim: int, n_queries: int, base_dir: str) -> dict:
+    from backend.app.vectorstore.faiss_store import FaissStore
+
+    rng = np.random.default_rng(0)
+    out = {}
+    for size in sizes:
+        work = os.path.join(base_dir, f"index_{size}")
+        os.makedirs(os.path.join(work, "backend", "app", "data"), exist_ok=True)
+        os.chdir(work)                              # store paths are relative to cwd
+
+        writer = FaissStore(dim=dim)
+        for start in range(0, size, 50000):
+            n = min(50000, size - start)
+            metas = [{"file_name": f"f{start + i}", "file_id": str(start + i),
+                      "drive_link": "", "snippet": ""} for i in range(n)]
+            writer.add_batch(rng.standard_normal((n, dim), dtype=np.float32), metas, save=False)
+        build_start = time.perf_counter()
+        writer.save()
+        build = time.perf_counter() - build_start
+
+        reader = FaissStore(dim=dim, read_only=True, watch=False)
+        queries = rng.standard_normal((n_queries, dim), dtype=np.float32)
+        samples = []
+        for q in queries:
+            start = time.perf_counter()
+            reader.search(q, k=7)
+            samples.append((time.perf_counter() - start) * 1000)
+
+        out[str(size)] = {"save_seconds": round(build, 3), **_percentiles(samples)}
+    return out
+
+
+# -------------------------------------------------------------------------
+# Runner
+# -------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--new-files", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--index-sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--drive-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--model", default=os.path.abspath("local_model"))
+    parser.add_argument("--out", default="bench_results")
+    parser.add_argument("--keep-workdir", action="store_true")
+    args = parser.parse_args()
+
+    out_dir = os.path.abspath(args.out)
+    project_dir = os.getcwd()
+    commit = _git_commit()
+
+    # Everything (data dir, snapshots, raw cache) lives in a throwaway workdir
+    workdir = tempfile.mkdtemp(prefix="drive_bench_")
+    os.makedirs(os.path.join(workdir, "backend", "app", "data"), exist_ok=True)
+    os.chdir(workdir)
+
+    # Mock LLM must be configured before llm_engine is imported
+    from backend.bench.mock_llm_server import start_mock_llm
+    llm_server, llm_url = start_mock_llm(latency_ms=args.llm_latency_ms)
+    os.environ.update({"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "mock", "OPENAI_API_URL": llm_url})
+    os.environ.setdefault("WARMUP_ON_STARTUP", "0")
+
+    from backend.app.embeddings import embedder
+    embedder.LOCAL_MODEL_PATH = args.model
+    embedder.ONNX_DIR = os.path.join(args.model, "onnx")
+
+    from backend.app.vectorstore.faiss_store import get_faiss_store
+    from backend.bench.bench_corpus import generate_corpus
+    from backend.bench.fake_drive import FakeDriveService
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": vars(args),
+        "scenarios": {},
+    }
+    scenarios = results["scenarios"]
+
+    try:
+        corpus_dir = os.path.join(workdir, "corpus")
+        print(f"📄 Generating corpus ({args.files} files)")
+        generate_corpus(corpus_dir, args.files, args.paragraphs)
+        drive = FakeDriveService(corpus_dir, latency_ms=args.drive_latency_ms)
+
+        print("⏱ full_sync")
+        scenarios["full_sync"] = run_sync(drive)
+
+        print("⏱ incremental_sync")
+        for path in generate_corpus(corpus_dir, args.new_files, args.paragraphs, seed=99, prefix="new"):
+            drive.add_file(path)
+        scenarios["incremental_sync"] = run_sync(drive)
+
+        queries = _queries(args.queries)
+        print("⏱ query_latency")
+        scenarios["query_latency"] = run_query_latency(queries)
+
+        print("⏱ concurrent_query")
+        scenarios["concurrent_query"] = run_concurrent(queries, args.concurrency)
+
+        print("⏱ search_scaling")
+        dim = embedder.get_embedding_model().dimension()
+        get_faiss_store(read_only=True).close()     # its watcher must not follow the chdir
+        scenarios["search_scaling"] = run_search_scaling(args.index_sizes, dim, args.queries, workdir)
+    finally:
+        llm_server.shutdown()
+        os.chdir(project_dir)
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps(scenarios, indent=2))
+    print(f"\n✅ Results → {out_path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
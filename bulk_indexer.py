@@ -0,0 +1,321 @@
+"""
+Offline bulk indexer — build an index without the Drive API.
+
+    python bulk_indexer.py index ./exported_drive --replace           # local directory tree
+    python bulk_indexer.py index --from-raw --replace                 # the raw download cache
+    python bulk_indexer.py index ./more_docs                          # add to the current index
+    python bulk_indexer.py index ./docs --replace --index-type ivf    # one trained IVF segment
+    python bulk_indexer.py rebuild --index-type ivf                   # stored vectors → new index type
+    python bulk_indexer.py rebuild --reembed                          # new embedding model
+    python bulk_indexer.py ... --partition team-drive-id              # one partition's index
+
+index:
+    Files are extracted + chunked on a process pool (--workers, one per
+    CPU by default), chunks of many files are embedded together in large
+    batches, and everything is published as ONE new snapshot version at
+    the end (--replace: as the whole index). Chunks go through the same
+    dedup as sync. The vectors stay in memory up to --memory-mb, beyond
+    that they are written as staged segments.
+
+    Local files get the id "local-<sha1 of the relative path>" and a file://
+    link. Files in the raw cache that the ingest journal knows keep their
+    Drive id, name and link and are marked committed, so the next sync
+    skips them; with --replace every other file is synced again. A
+    --replace build is journaled into a staging journal that replaces the
+    real one only once the build is published, so a failed build leaves
+    index and journal as they were.
+
+rebuild:
+    Reads every published vector (or, with --reembed, every stored chunk
+    text) and writes them as one segment of the requested metric / index
+    type. Unlike migrate_index.py, which converts segment by segment, ivf
+    is trained once on the whole index. --reembed needs the full chunk
+    texts (text store); segments from before it only have 250-char snippets.
+
+Holds the sync lock for the duration, so no sync can publish in between.
+Running query workers pick the new version up through their snapshot
+watcher; no restart needed.
+"""
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+import pathlib
+from multiprocessing import Pool
+
+from backend.app.drive.sync_jobs import FileLock, lock_path
+from backend.app.drive.ingest_journal import IngestJournal, journal_path, EMBEDDED
+from backend.app.vectorstore.faiss_store import FaissStore
+from backend.app.vectorstore.text_store import SnippetTexts
+from backend.app.extractors.extractor import Extractor
+from backend.app.processing.chunker import chunk_text, iter_chunks
+from backend.app.processing.cleaner import normalize_pieces, is_paged, NORMALIZE_ENABLED
+from backend.app.processing.dedup import Deduplicator, DEDUP_ENABLED
+from backend.app.embeddings.embedder import get_embedding_model, EMBED_BATCH_SIZE
+from backend.app.core.partitions import partition_dir, partition_path
+
+BULK_EMBED_CHUNKS = EMBED_BATCH_SIZE * 16      # chunks (across files) per embed call
+BULK_MEMORY_MB = int(os.environ.get("BULK_MEMORY_MB", "2048"))
+
+
+# -------------------------------------------------------------------------
+# Extraction workers
+# -------------------------------------------------------------------------
+_extractor = None
+
+
+def _init_worker():
+    global _extractor
+    _extractor = Extractor()
+
+
+def _extract(path):
+    """Worker: one file → (path, non-blank chunks, error), normalized like sync does."""
+    try:
+        pieces = _extractor.iter_extract(path)
+        if NORMALIZE_ENABLED:
+            pieces = normalize_pieces(pieces, paged=is_paged(path))
+        chunks = [c for c in iter_chunks(pieces) if c.strip()]
+    except Exception as e:
+        return path, None, str(e)
+    return path, chunks, None
+
+
+# -------------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------------
+def _walk(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for name in sorted(filenames):
+            if not name.startswith("."):
+                yield os.path.join(dirpath, name)
+
+
+def _file_entries(root, known):
+    """{path: (file_id, file_name, link)}; `known` = raw files the journal maps to Drive ids."""
+    entries = {}
+    for path in _walk(root):
+        drive = known.get(os.path.normpath(path))
+        if drive is not None:
+            file_id, file_name = drive
+            entries[path] = (file_id, file_name, f"https://drive.google.com/file/d/{file_id}")
+        else:
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            file_id = "local-" + hashlib.sha1(rel.encode("utf-8")).hexdigest()[:16]
+            entries[path] = (file_id, rel, pathlib.Path(path).resolve().as_uri())
+    return entries
+
+
+class _Batcher:
+    """Collects chunks of many files; embeds + adds them to the store in big batches."""
+
+    def __init__(self, store, embedder, memory_bytes, save_kwargs):
+        self.store = store
+        self.embedder = embedder
+        self.memory_bytes = memory_bytes
+        self.save_kwargs = save_kwargs
+        self.texts, self.metas = [], []
+        self.embedded = 0
+
+    def add(self, texts, metas):
+        self.texts.extend(texts)
+        self.metas.extend(metas)
+        if len(self.texts) >= BULK_EMBED_CHUNKS:
+            self.flush()
+
+    def flush(self):
+        if not self.texts:
+            return
+        vectors = self.embedder.embed_batch(self.texts, batch_size=EMBED_BATCH_SIZE)
+        self.store.add_batch(vectors, self.metas, save=False, texts=self.texts)
+        self.embedded += len(self.texts)
+        self.texts, self.metas = [], []
+        if self.store.pending_bytes() >= self.memory_bytes:
+            self.store.save(publish=False, **self.save_kwargs)        # memory ceiling → staged segment
+
+
+# -------------------------------------------------------------------------
+# index
+# -------------------------------------------------------------------------
+def index_files(args):
+    root = partition_path(args.partition, "raw") if args.from_raw else args.directory
+    if not root or not os.path.isdir(root):
+        print(f"❌ Not a directory: {root}")
+        sys.exit(1)
+
+    store = FaissStore(read_only=False, data_dir=partition_dir(args.partition))
+    journal = IngestJournal(journal_path(args.partition))
+    manifest = store.read_manifest()
+    journal.reconcile(manifest)
+
+    entries = _file_entries(root, journal.raw_files() if args.from_raw else {})
+    if not entries:
+        print(f"❌ No files under {root}")
+        sys.exit(1)
+
+    # --replace: dedup + chunk rows start empty, swapped in after publishing
+    target = journal.begin_replace(manifest["version"] if manifest else 0) if args.replace else journal
+    dedup = Deduplicator(target) if DEDUP_ENABLED else None
+    embedder = get_embedding_model()
+    save_kwargs = {"replace": args.replace, "metric": args.metric, "index_type": args.index_type}
+    batcher = _Batcher(store, embedder, args.memory_mb * 1024 * 1024, save_kwargs)
+
+    print(f"📂 Indexing {len(entries)} files from {root} with {args.workers} workers")
+    started = time.time()
+    done, failed, committed = 0, 0, []
+    try:
+        with Pool(args.workers, initializer=_init_worker) as pool:
+            for path, chunks, error in pool.imap_unordered(_extract, list(entries), chunksize=4):
+                file_id, file_name, link = entries[path]
+                if error is not None:
+                    print(f"⚠️  Skipping {file_name}: {error}")
+                    failed += 1
+                    continue
+
+                # No text → placeholder, like sync does for videos
+                chunks = chunks or chunk_text(f"This is a video file: {file_name}\nLink: {link}")
+
+                hashes = [None] * len(chunks)
+                if dedup is not None:
+                    dedup.start_file(file_id)
+                    kept = []
+                    for chunk in chunks:
+                        chunk_hash, kind = dedup.check(chunk)
+                        if kind is None:
+                            kept.append((chunk, chunk_hash))
+                    chunks, hashes = [c for c, _ in kept], [h for _, h in kept]
+
+                batcher.add(chunks, [{
+                    "file_name": file_name,
+                    "file_id": file_id,
+                    "drive_link": link,
+                    "snippet": chunk[:250],
+                    "chunk_hash": chunk_hash,
+                } for chunk, chunk_hash in zip(chunks, hashes)])
+
+                if dedup is not None:
+                    target.record_chunks(file_id, file_name, dedup.new_chunks, dedup.postings, len(chunks))
+                else:
+                    target.mark(file_id, file_name, EMBEDDED, chunks=len(chunks))
+                committed.append((file_id, file_name))
+
+                done += 1
+                if done % 500 == 0:
+                    print(f"   {done}/{len(entries)} files, {batcher.embedded} chunks embedded")
+
+        batcher.flush()
+        print(f"💾 Publishing {batcher.embedded} chunks as one snapshot version")
+        store.save(files=[fid for fid, _ in committed], **save_kwargs)
+    except BaseException:
+        store.discard_pending()          # nothing of this run becomes visible
+        if target is not journal:
+            journal.discard_replace(target)
+        journal.close()
+        raise
+
+    if target is not journal:
+        journal.apply_replace(target)
+    else:
+        journal.mark_committed_many(committed)
+    journal.close()
+    print(f"✔ Indexed {done} files ({failed} failed) in {time.time() - started:.1f}s "
+          f"→ version {store.version}, {len(store.meta)} vectors")
+
+
+# -------------------------------------------------------------------------
+# rebuild
+# -------------------------------------------------------------------------
+def rebuild_index(args):
+    store = FaissStore(read_only=False, data_dir=partition_dir(args.partition))   # also migrates pre-snapshot files
+    manifest = store.read_manifest()
+    if not manifest:
+        print("❌ No published index to rebuild.")
+        sys.exit(1)
+
+    snap = store.snapshot
+    total = len(snap.meta)
+    metric = args.metric or manifest.get("metric", "l2")
+    index_type = args.index_type or manifest.get("index_type", "flat")
+    save_kwargs = {"replace": True, "metric": metric, "index_type": index_type}
+
+    embedder = None
+    if args.reembed:
+        embedder = get_embedding_model()
+        if embedder.dimension() != store.dim:
+            print(f"❌ The model embeds {embedder.dimension()} dims, the store expects {store.dim}.")
+            sys.exit(1)
+        parts = snap.texts.parts if hasattr(snap.texts, "parts") else [snap.texts]
+        if any(isinstance(t, SnippetTexts) for t in parts):
+            print("⚠️  Some segments have no full chunk text; their 250-char snippets are re-embedded.")
+    batcher = _Batcher(store, embedder, args.memory_mb * 1024 * 1024, save_kwargs)
+
+    print(f"🔁 Rebuilding {total} vectors as {metric}/{index_type}" + (" (re-embedding)" if args.reembed else ""))
+    started = time.time()
+    try:
+        ends = list(snap.segment_starts[1:]) + [total]
+        for seg_start, seg_end in zip(snap.segment_starts, ends):
+            for start in range(seg_start, seg_end, BULK_EMBED_CHUNKS):
+                count = min(BULK_EMBED_CHUNKS, seg_end - start)
+                metas = [snap.meta[i] for i in range(start, start + count)]
+                texts = [snap.texts[i] for i in range(start, start + count)]
+                if args.reembed:
+                    batcher.add(texts, metas)
+                    continue
+                store.add_batch(snap.vectors(start, count), metas, save=False, texts=texts)
+                if store.pending_bytes() >= batcher.memory_bytes:
+                    store.save(publish=False, **save_kwargs)
+
+        batcher.flush()
+        store.save(files=manifest.get("committed_files"), **save_kwargs)
+    except BaseException:
+        store.discard_pending()
+        raise
+
+    print(f"✔ Rebuilt in {time.time() - started:.1f}s → version {store.version}, {len(store.meta)} vectors")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_index = sub.add_parser("index", help="index a local directory tree or the raw download cache")
+    p_index.add_argument("directory", nargs="?")
+    p_index.add_argument("--from-raw", action="store_true", help="index the partition's raw download cache")
+    p_index.add_argument("--replace", action="store_true", help="publish as the whole index")
+    p_index.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+
+    p_rebuild = sub.add_parser("rebuild", help="rebuild the published index as one segment")
+    p_rebuild.add_argument("--reembed", action="store_true", help="embed the stored chunk texts again")
+
+    for p in (p_index, p_rebuild):
+        p.add_argument("--metric", choices=["ip", "l2"], default=None)
+        p.add_argument("--index-type", choices=["flat", "hnsw", "ivf"], default=None)
+        p.add_argument("--memory-mb", type=int, default=BULK_MEMORY_MB)
+        p.add_argument("--partition", default=None)
+    args = parser.parse_args()
+
+    if args.command == "index":
+        if bool(args.directory) == args.from_raw:
+            parser.error("give a directory or --from-raw")
+        if (args.metric or args.index_type) and not args.replace:
+            parser.error("--metric / --index-type need --replace (segments of one index share them)")
+
+    lock = FileLock(lock_path(args.partition))
+    if not lock.try_acquire():
+        print("❌ A sync is running — try again when it has finished.")
+        sys.exit(1)
+
+    try:
+        if args.command == "index":
+            index_files(args)
+        else:
+            rebuild_index(args)
+    finally:
+        lock.release()
+
+
+if __name__ == "__main__":        # required: pool workers re-import this module on Windows
+    main()
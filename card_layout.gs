@@ -18,7 +18,7 @@ function buildResultCard(result) {
       .setHeader("Matched Files");
 
   result.results.forEach(function(item) {
-    var snippet = item.text.substring(0, 150) + "...";   // Short preview snippet
+    var snippet = item.snippet.substring(0, 150) + "...";   // Short preview snippet
 
     section.addWidget(
       CardService.newTextParagraph()
@@ -19,3 +19,29 @@ def chunk_text(text: str) -> list[str]:
         chunks.append(chunk)
 
     return chunks
+
+
+def iter_chunks(pieces):
+    """
+    Streaming chunk_text(): takes an iterable of text pieces (pages,
+    paragraphs, blocks) and yields exactly the chunks chunk_text() would
+    return for "".join(pieces), holding at most one window plus one
+    piece in memory.
+    """
+
+    chunk_size = settings.CHUNK_SIZE
+    step = chunk_size - settings.CHUNK_OVERLAP
+
+    buffer = ""                                     # text from the current window start on
+    for piece in pieces:
+        buffer += piece
+
+        start = 0
+        while len(buffer) - start >= chunk_size:    # full windows can be emitted right away
+            yield buffer[start:start + chunk_size]
+            start += step
+        buffer = buffer[start:]
+
+    # Tail: the last (shorter) windows, same as the end of chunk_text()
+    for start in range(0, len(buffer), step):
+        yield buffer[start:start + chunk_size]
@@ -1,4 +1,191 @@
-import re   # Regex library for cleaning unwanted patterns
+"""
+Text cleaning before chunking.
+
+normalize_pieces() is the streaming stage sync runs between the
+extractor and the chunker. It works on the extractor's pieces (PDF pages,
+DOCX paragraphs, TXT blocks) and holds back at most one line between
+pieces:
+
+    1. Unicode NFKC (ligatures, full-width forms, compatibility chars);
+       non-ASCII text is kept, so non-English documents stay searchable
+    2. control characters dropped (tab → space, form feed → newline,
+       soft hyphen / zero-width chars removed), CRLF → LF
+    3. page streams only: header / footer lines removed — an edge line
+       (first / last BOILERPLATE_EDGE_LINES non-blank lines of a page, never
+       all of them) that is an edge line on BOILERPLATE_MIN_PAGES pages of
+       the surrounding ±BOILERPLATE_WINDOW pages. Lines must match exactly
+       (case + spacing folded) except for page numbers ("Page 3 of 9",
+       "3/9", "- 3 -", "Report | 3"); other numbers must match too
+    4. de-hyphenation: "exam-\\nple" → "example" (lowercase continuation only)
+    5. runs of spaces collapsed, 3+ newlines → one blank line
+
+Newlines are kept, so paragraph structure reaches the chunker.
+clean_text() is the old whole-string cleaner, kept for callers that
+want flat ASCII text (see normalize_bench.py for a comparison).
+"""
+
+import os
+import re
+import unicodedata
+from collections import Counter, deque
+
+NORMALIZE_ENABLED = os.environ.get("SYNC_NORMALIZE", "1") == "1"
+BOILERPLATE_WINDOW = int(os.environ.get("BOILERPLATE_WINDOW", "4"))       # pages each side
+BOILERPLATE_MIN_PAGES = int(os.environ.get("BOILERPLATE_MIN_PAGES", "3"))
+BOILERPLATE_EDGE_LINES = 2
+BOILERPLATE_MAX_LINE = 120       # longer lines are content, never boilerplate
+MAX_CARRY_CHARS = 64 * 1024      # a "line" longer than this is passed on anyway
+
+PAGED_FORMATS = {"pdf"}          # extractor pieces are pages → header / footer removal
+
+# Control characters: C0 / C1 + DEL dropped, tab → space, CR / FF → newline,
+# plus invisible format characters NFKC keeps (soft hyphen, zero-width, BOM)
+# (a regex finds the rare hits; str.translate would touch every character)
+_CONTROL = re.compile("[\x00-\x09\x0b-\x1f\x7f-\x9f\u00ad\u200b-\u200d\u2060\ufeff]")
+_CONTROL_REPLACEMENT = {"\t": " ", "\x0c": "\n", "\r": "\n"}
+
+_HYPHEN_BREAK = re.compile(r"-[ \t]*\n[ \t]*")
+_SPACES = re.compile(r" +\n| {2,}")           # trailing spaces / runs (tabs are spaces by now)
+_BLANK_LINES = re.compile(r"\n{3,}")
+# Page numbers: "page 3 (of 9)", "3 of 9", "3/9", a line that is only a
+# number ("- 3 -"), or a number set off by a separator ("Report | 3")
+_PAGE_NUMBER = re.compile(
+    r"\bpage \d{1,4}(?: of \d{1,4})?\b|\b\d{1,4} ?(?:/|of) ?\d{1,4}\b"
+    r"|^[\W_]*\d{1,4}[\W_]*$|^\d{1,4} ?[|·•–—-]|[|·•–—-] ?\d{1,4}$"
+)
+
+
+def is_paged(file_name: str) -> bool:
+    return os.path.splitext(file_name)[1].lower().lstrip(".") in PAGED_FORMATS
+
+
+def _clean(text: str) -> str:
+    """Steps 1 + 2 for one piece."""
+    text = text.replace("\r\n", "\n")
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text)
+    return _CONTROL.sub(lambda m: _CONTROL_REPLACEMENT.get(m.group(0), ""), text)
+
+
+def _join_hyphenated(m) -> str:
+    text, start, end = m.string, m.start(), m.end()
+    if start and end < len(text) and text[start - 1].isalpha() and text[end].islower():
+        return ""
+    return m.group(0)
+
+
+def _finish(text: str) -> str:
+    """Steps 4 + 5 on complete lines (each regex only runs if its trigger occurs)."""
+    if "-\n" in text or "- " in text:
+        text = _HYPHEN_BREAK.sub(_join_hyphenated, text)
+    if "  " in text or " \n" in text:
+        text = _SPACES.sub(lambda m: "\n" if m.group(0).endswith("\n") else " ", text)
+    if "\n\n\n" in text:
+        text = _BLANK_LINES.sub("\n\n", text)
+    return text
+
+
+# -------------------------------------------------------------------------
+# Header / footer removal over a sliding window of pages
+# -------------------------------------------------------------------------
+def _edge_keys(lines: list) -> dict:
+    """{line_no: key} of the first / last non-blank lines of a page (at least one line is not an edge)."""
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    n = min(BOILERPLATE_EDGE_LINES, (len(filled) - 1) // 2)
+    edges = filled[:n] + filled[len(filled) - n:] if n > 0 else []
+    keys = {}
+    for i in edges:
+        line = lines[i].strip()
+        if len(line) <= BOILERPLATE_MAX_LINE:
+            keys[i] = _PAGE_NUMBER.sub("#", " ".join(line.lower().split()))    # "Page 3 of 9" ~ "Page 4 of 9"
+    return keys
+
+
+class _BoilerplateFilter:
+    """Emits each page once BOILERPLATE_WINDOW later pages are known (or at the end)."""
+
+    def __init__(self, window: int = BOILERPLATE_WINDOW, min_pages: int = BOILERPLATE_MIN_PAGES):
+        self.window = window
+        self.min_pages = min_pages
+        self.pages = deque()        # (lines, {line_no: key}), up to `window` already emitted ones first
+        self.counts = Counter()     # key → pages in `self.pages` having it as an edge line
+        self.next = 0               # position in self.pages of the next page to emit
+
+    def push(self, page: str):
+        lines = page.split("\n")
+        keys = _edge_keys(lines)
+        self.pages.append((lines, keys))
+        self.counts.update(set(keys.values()))
+        while len(self.pages) - 1 - self.next >= self.window:
+            yield self._emit()
+
+    def flush(self):
+        while self.next < len(self.pages):
+            yield self._emit()
+
+    def _emit(self) -> str:
+        lines, keys = self.pages[self.next]
+        self.next += 1
+        drop = {i for i, key in keys.items() if self.counts[key] >= self.min_pages}
+        page = "\n".join(line for i, line in enumerate(lines) if i not in drop) if drop else "\n".join(lines)
+
+        while self.next > self.window:              # forget pages that left the window
+            _, old = self.pages.popleft()
+            self.counts.subtract(set(old.values()))
+            self.next -= 1
+        return page
+
+
+def _pages_without_boilerplate(pieces):
+    filt = _BoilerplateFilter()
+    for piece in pieces:
+        yield from filt.push(_clean(piece))
+    yield from filt.flush()
+
+
+def _split_tail(text: str):
+    """(complete part, carry): hold back an unfinished last line, or one ending in "-"."""
+    body = text.rstrip(" \t\n")
+    if body.endswith("-"):
+        cut = text.rfind("\n", 0, len(body)) + 1
+    elif not text.endswith("\n"):
+        cut = text.rfind("\n") + 1
+    else:
+        return text, ""
+    if cut == 0 and len(text) > MAX_CARRY_CHARS:
+        return text, ""
+    return text[:cut], text[cut:]
+
+
+def _complete_lines(source):
+    carry = ""
+    for piece in source:
+        text, carry = _split_tail(carry + piece)
+        if text:
+            yield text
+    if carry:
+        yield carry
+
+
+def normalize_pieces(pieces, paged: bool = False):
+    """Streaming normalization of extractor pieces (see module docstring); yields text pieces."""
+    source = _pages_without_boilerplate(pieces) if paged else (_clean(p) for p in pieces)
+    trailing = 2                    # newlines the output so far ends with (2 → none at the start)
+    for text in _complete_lines(source):
+        out = _finish(text)
+        lead = len(out) - len(out.lstrip("\n"))
+        if trailing + lead > 2:                       # no 3+ newlines across pieces either
+            out = out[min(lead, trailing + lead - 2):]
+        if out:
+            body = out.rstrip("\n")
+            trailing = min(2, len(out) - len(body) + (0 if body else trailing))
+            yield out
+
+
+def normalize_text(text: str, paged: bool = False) -> str:
+    """normalize_pieces() for one whole string (pages separated by form feeds if paged)."""
+    return "".join(normalize_pieces(text.split("\f") if paged else [text], paged=paged))
+
 
 def clean_text(text: str) -> str:
     """
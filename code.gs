@@ -41,12 +41,35 @@ function runQuery(e) {
   // Backend API endpoint
   var url = "http://localhost:8000/query";   // Change to your backend URL if deployed
 
+  // Which index to search + who is asking (results are filtered by Drive sharing).
+  // Set the script property DRIVE_PARTITION to a shared drive id to search
+  // that drive; otherwise each user gets their own partition. The backend
+  // takes the user from the signed identity token, not from a header.
+  var user = Session.getActiveUser().getEmail();
+  var partition = PropertiesService.getScriptProperties().getProperty("DRIVE_PARTITION") || user;
+
   var response = UrlFetchApp.fetch(url, {
     "method": "post",
     "contentType": "application/json",
-    "payload": JSON.stringify({ query: query })
+    "headers": {
+      "Authorization": "Bearer " + ScriptApp.getIdentityToken(),
+      "X-Drive-Partition": partition
+    },
+    // Only the fields the card shows → smaller (gzip-compressed) response
+    "payload": JSON.stringify({ query: query, fields: ["file_name", "snippet", "drive_link"] }),
+    "muteHttpExceptions": true
   });
 
+  // Backend overloaded → ask the user to retry instead of failing the add-on
+  if (response.getResponseCode() == 503) {
+    var wait = response.getHeaders()["Retry-After"] || "a few";
+    return CardService.newCardBuilder()
+      .addSection(CardService.newCardSection()
+        .addWidget(CardService.newTextParagraph()
+          .setText("The search service is busy. Please try again in " + wait + " seconds.")))
+      .build();
+  }
+
   var result = JSON.parse(response.getContentText());  // Convert JSON string to JS object
 
   return buildResultCard(result);      // Show answer & matched files
@@ -0,0 +1,126 @@
+"""
+Chunk Deduplication (exact + near-duplicate)
+--------------------------------------------
+
+Drive folders hold many copies / versions of the same document.
+
+    exact → SHA-1 of the normalized text (case + whitespace folded).
+            Before a chunk is embedded, sync asks the Deduplicator whether
+            the same chunk is already indexed. If so it is not embedded;
+            the file is only added to the postings list of that chunk,
+            and search results expand to every file in it.
+    near  → 64-bit SimHash over word 3-shingles; two chunks are near
+            duplicates when the Hamming distance is <= DEDUP_MAX_DISTANCE.
+            A near duplicate differs in some words, so it is embedded and
+            stored like a new chunk (its file is cited for its own text
+            only). At query time collapse_near() keeps just the best of
+            near-duplicate hits, so copies do not crowd the top-k.
+
+Chunk rows (hash, SimHash + its 4 16-bit bands) and postings live in the
+ingest journal (same SQLite database), written together with the file's
+`embedded` state, and only count once the owning file is `committed`.
+"""
+
+import os
+import re
+import hashlib
+
+import numpy as np
+
+DEDUP_ENABLED = os.environ.get("SYNC_DEDUP", "1") == "1"
+DEDUP_MAX_DISTANCE = int(os.environ.get("DEDUP_MAX_DISTANCE", "3"))   # 0 = no near-duplicate collapsing
+
+BANDS = 4                        # = the b0..b3 columns of the journal's chunks table
+BAND_BITS = 64 // BANDS
+_BAND_MASK = (1 << BAND_BITS) - 1
+_WORD = re.compile(r"\w+")
+
+
+def normalize_chunk(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def content_hash(text: str) -> str:
+    """Exact-duplicate key of a chunk."""
+    return hashlib.sha1(normalize_chunk(text).encode("utf-8")).hexdigest()
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """64-bit SimHash of the chunk's word shingles (unsigned int)."""
+    words = _WORD.findall(text.lower())
+    if len(words) < shingle:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + shingle]) for i in range(len(words) - shingle + 1)]
+
+    if not grams:
+        return 0
+
+    # One 8-byte digest per shingle → (n, 64) bit matrix → majority vote per bit
+    digests = b"".join(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest() for g in grams)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(grams)
+    return int.from_bytes(np.packbits(votes > 0, bitorder="little").tobytes(), "little")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def bands(value: int) -> list[int]:
+    return [(value >> (i * BAND_BITS)) & _BAND_MASK for i in range(BANDS)]
+
+
+class Deduplicator:
+    """
+    Per-sync dedup state. `check()` answers for one chunk; chunks kept
+    for embedding are remembered until the next publish (the journal only
+    knows them once their file is committed), and everything for the file
+    is written by `journal.record_chunks()`.
+    """
+
+    def __init__(self, journal):
+        self.journal = journal
+        self.published()
+        self.start_file(None)
+
+    def start_file(self, file_id):
+        self.file_id = file_id
+        self.new_chunks = []        # (hash, simhash) of chunks this file will embed
+        self.postings = set()       # every chunk hash this file contains
+
+    def published(self):
+        """The files embedded so far are committed: the journal finds their chunks now."""
+        self._local = set()         # hashes of chunks embedded since the last publish
+
+    def check(self, text: str):
+        """
+        Returns (chunk_hash, kind): kind is None for a new chunk (embed it),
+        "exact" for a copy of an indexed one (skip it; hash = that chunk).
+        """
+        h = content_hash(text)
+        self.postings.add(h)
+        if h in self._local or self.journal.has_chunk(h):
+            return h, "exact"
+
+        self._local.add(h)
+        self.new_chunks.append((h, simhash(text)))
+        return h, None
+
+
+def collapse_near(results: list, simhashes: dict, max_distance: int = DEDUP_MAX_DISTANCE):
+    """
+    Drop hits that are near duplicates of a better hit in the same list
+    (in place; `results` best first, simhashes = {chunk_hash: simhash}).
+    """
+    if max_distance <= 0:
+        return
+    kept, seen = [], []
+    for r in results:
+        sim = simhashes.get(r.get("chunk_hash"))
+        if sim is not None:
+            if any(hamming(sim, s) <= max_distance for s in seen):
+                continue
+            seen.append(sim)
+        kept.append(r)
+    results[:] = kept
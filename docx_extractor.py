@@ -1,14 +1,48 @@
-from docx import Document   # python-docx library for reading .docx files
+import io
 
 def extract_docx_text(file_path: str) -> str:
     """
     Extracts text from a Microsoft Word (.docx) file.
     """
 
+    from docx import Document                 # python-docx (imported on first use)
+
     doc = Document(file_path)                 # Load the DOCX file
-    paragraphs = []                           # Will store text from each paragraph
+    return _join_paragraphs(doc)
+
+
+def extract_docx_bytes(data: bytes) -> str:
+    """
+    Extracts text from a .docx file held in memory.
+    python-docx accepts any file-like object, so we wrap the bytes.
+    """
+
+    from docx import Document
+
+    doc = Document(io.BytesIO(data))          # Load the DOCX from the buffer
+    return _join_paragraphs(doc)
+
+
+def iter_docx_paragraphs(file_path: str):
+    """Yields paragraph text piece by piece (same text as extract_docx_text)."""
+
+    from docx import Document
+
+    yield from _iter_paragraphs(Document(file_path))
+
+
+def iter_docx_paragraphs_bytes(data: bytes):
+    """Same as iter_docx_paragraphs, for a .docx held in memory."""
+
+    from docx import Document
+
+    yield from _iter_paragraphs(Document(io.BytesIO(data)))
+
+
+def _iter_paragraphs(doc):
+    for i, para in enumerate(doc.paragraphs): # Loop through every paragraph in the file
+        yield ("\n" if i else "") + para.text # Newline-separated, like _join_paragraphs
 
-    for para in doc.paragraphs:               # Loop through every paragraph in the file
-        paragraphs.append(para.text)          # Append raw text from the paragraph
 
-    return "\n".join(paragraphs)              # Join all paragraphs with newlines
+def _join_paragraphs(doc) -> str:
+    return "".join(_iter_paragraphs(doc))     # Join all paragraphs with newlines
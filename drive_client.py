@@ -6,9 +6,16 @@ from backend.app.config import settings
 
 SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
 
-def get_drive_service():
+
+class DriveNotAuthorized(RuntimeError):
+    """No usable token and a browser login is not allowed (server-side syncs)."""
+
+
+def get_drive_service(token_path: str = None, interactive: bool = True):
     """
     Safely creates and returns an authenticated Google Drive client.
+    `token_path` selects the partition's token (default: settings.GOOGLE_TOKEN_PATH).
+    interactive=False → DriveNotAuthorized instead of a browser login.
     Handles:
         ✔ token.json (valid or expired)
         ✔ corrupted tokens
@@ -16,13 +23,14 @@ def get_drive_service():
         ✔ fresh OAuth login
     """
 
+    token_path = token_path or settings.GOOGLE_TOKEN_PATH
     creds = None
 
     # 1) LOAD EXISTING TOKEN
-    if os.path.exists(settings.GOOGLE_TOKEN_PATH):
+    if os.path.exists(token_path):
         try:
             creds = Credentials.from_authorized_user_file(
-                settings.GOOGLE_TOKEN_PATH, SCOPES
+                token_path, SCOPES
             )
         except Exception:
             # Token invalid or encrypted → force login
@@ -35,6 +43,8 @@ def get_drive_service():
                 creds.refresh(Request())
             except Exception:
                 creds = None  # fallback to full login
+        if (creds is None or not creds.valid) and not interactive:
+            raise DriveNotAuthorized(f"Drive is not authorized: no valid token at {token_path}")
         if creds is None or not creds.valid:
             # 3) FRESH LOGIN FLOW
             flow = InstalledAppFlow.from_client_secrets_file(
@@ -44,7 +54,7 @@ def get_drive_service():
             creds = flow.run_local_server(port=0)
 
         # 4) SAVE TOKEN
-        with open(settings.GOOGLE_TOKEN_PATH, "w") as token:
+        with open(token_path, "w") as token:
             token.write(creds.to_json())
 
     # 5) RETURN DRIVE SERVICE
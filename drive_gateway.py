@@ -0,0 +1,366 @@
+"""
+Drive Gateway — quota-aware access to the Drive API
+---------------------------------------------------
+
+Every Drive call of a sync goes through one DriveGateway:
+
+    gateway = DriveGateway(service, service_factory=lambda: get_drive_service(token))
+    files = gateway.list_files(q, fields)
+    perms = gateway.batch({fid: lambda s, fid=fid: s.permissions().list(fileId=fid)})
+    gateway.download(file_id, fh)
+
+Rate limiting:
+    A token bucket (DRIVE_QPS, burst DRIVE_BURST) shared by every gateway
+    and download thread of the process; one token per API call, one per
+    sub-request of a batch, one per downloaded media chunk.
+
+Adaptive backoff:
+    429 / 403 rateLimitExceeded / userRateLimitExceeded → the call is
+    retried after exponential backoff with jitter (Retry-After wins), and
+    the bucket rate is halved; it climbs back to DRIVE_QPS in small steps
+    after successes (AIMD). 5xx and transport errors are retried without
+    slowing down. Anything else (404, 403 cannotDownloadFile, ...) is
+    raised at once as DriveFileError.
+
+Batching:
+    batch() groups up to DRIVE_BATCH_SIZE metadata requests into one
+    HTTP batch (service.new_batch_http_request); sub-requests that hit a
+    quota error are retried in the next round.
+
+Quota usage per sync is in gateway.stats (also on the sync job) and in
+the drive_agent_drive_requests_total metric.
+"""
+
+import os
+import json
+import time
+import random
+import threading
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseDownload
+
+from backend.app.utils.logger import get_logger
+from backend.app.utils.metrics import REGISTRY
+
+logger = get_logger("drive_gateway")
+
+DRIVE_QPS = float(os.environ.get("DRIVE_QPS", "10"))
+DRIVE_BURST = int(os.environ.get("DRIVE_BURST", "20"))
+DRIVE_MIN_QPS = 0.5
+DRIVE_MAX_RETRIES = int(os.environ.get("DRIVE_MAX_RETRIES", "8"))
+DRIVE_BACKOFF_MAX = 64.0          # seconds
+DRIVE_BATCH_SIZE = 100            # Drive's limit per batch request
+DRIVE_DOWNLOAD_WORKERS = int(os.environ.get("DRIVE_DOWNLOAD_WORKERS", "4"))
+
+QUOTA_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+DRIVE_REQUESTS_TOTAL = REGISTRY.counter(
+    "drive_agent_drive_requests_total", "Drive API calls (batch sub-requests counted singly), by kind and result",
+)
+DRIVE_BACKOFF_SECONDS = REGISTRY.counter(
+    "drive_agent_drive_backoff_seconds_total", "Time spent backing off after Drive quota / server errors",
+)
+
+
+class DriveFileError(Exception):
+    """A Drive call failed for good (not retryable); the sync skips the file."""
+
+
+# -------------------------------------------------------------------------
+# Rate limiter
+# -------------------------------------------------------------------------
+class RateLimiter:
+    """Token bucket with AIMD: halve the rate on a quota error, creep back on success."""
+
+    RECOVER_EVERY = 50            # successes per additive step
+    RECOVER_STEP = 0.1            # × target rate
+    CUT_INTERVAL = 1.0            # parallel 429s within this many seconds cut the rate once
+
+    def __init__(self, rate: float = DRIVE_QPS, burst: int = DRIVE_BURST):
+        self.target = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._successes = 0
+        self._last_cut = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, n: int = 1):
+        """Block until `n` tokens are available (large n is taken in burst-size pieces)."""
+        while n > 0:
+            take = min(n, self.burst)
+            while True:
+                with self._lock:
+                    self._refill(time.monotonic())
+                    if self._tokens >= take:
+                        self._tokens -= take
+                        break
+                    wait = (take - self._tokens) / self.rate
+                time.sleep(wait)
+            n -= take
+
+    def throttled(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._tokens, 0.0)
+            self._successes = 0
+            if now - self._last_cut < self.CUT_INTERVAL:
+                return
+            self._last_cut = now
+            self.rate = max(DRIVE_MIN_QPS, self.rate / 2)
+        logger.warning("drive quota hit, rate lowered to %.2f req/s", self.rate)
+
+    def succeeded(self, n: int = 1):
+        with self._lock:
+            if self.rate >= self.target:
+                return
+            self._successes += n
+            if self._successes >= self.RECOVER_EVERY:
+                self._successes = 0
+                self.rate = min(self.target, self.rate + self.target * self.RECOVER_STEP)
+
+
+limiter = RateLimiter()          # one per process: the project quota is shared
+
+
+# -------------------------------------------------------------------------
+# Error classification
+# -------------------------------------------------------------------------
+def _reason(err: HttpError):
+    try:
+        return json.loads(err.content)["error"]["errors"][0]["reason"]
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+def classify(err: Exception) -> str:
+    """"quota" (slow down + retry), "retry" (transient), or "fatal"."""
+    if isinstance(err, HttpError):
+        status = err.resp.status
+        if status == 429 or (status == 403 and _reason(err) in QUOTA_REASONS):
+            return "quota"
+        if status >= 500:
+            return "retry"
+        return "fatal"
+    if isinstance(err, (OSError, TimeoutError, ConnectionError)):
+        return "retry"
+    try:
+        import httplib2
+        if isinstance(err, httplib2.HttpLib2Error):
+            return "retry"
+    except ImportError:
+        pass
+    return "fatal"
+
+
+def _retry_after(err: Exception):
+    try:
+        return float(err.resp.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+# -------------------------------------------------------------------------
+# Quota usage of one gateway (one sync)
+# -------------------------------------------------------------------------
+class QuotaStats:
+    def __init__(self, limiter: RateLimiter):
+        self.limiter = limiter
+        self.requests = 0           # API calls incl. batch sub-requests and media chunks
+        self.batches = 0
+        self.throttled = 0          # quota errors
+        self.retries = 0
+        self.failed = 0             # given up (DriveFileError)
+        self.backoff_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, n in counts.items():
+                setattr(self, name, getattr(self, name) + n)
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "failed": self.failed,
+            "backoff_seconds": round(self.backoff_seconds, 2),
+            "rate_limit_qps": round(self.limiter.rate, 2),
+        }
+
+
+# -------------------------------------------------------------------------
+# Gateway
+# -------------------------------------------------------------------------
+class DriveGateway:
+    """
+    Rate-limited, retrying wrapper around one Drive service.
+
+    googleapiclient services are not thread-safe; with a `service_factory`
+    every thread (download workers) builds its own, otherwise the one
+    `service` is shared (fine for FakeDriveService).
+    """
+
+    def __init__(self, service, service_factory=None, limiter: RateLimiter = limiter):
+        self.service = service
+        self.limiter = limiter
+        self.stats = QuotaStats(limiter)
+        self._factory = service_factory
+        self._local = threading.local()
+        self._owner = threading.get_ident()
+
+    def _service(self):
+        if self._factory is None or threading.get_ident() == self._owner:
+            return self.service
+        service = getattr(self._local, "service", None)
+        if service is None:
+            service = self._local.service = self._factory()
+        return service
+
+    # ------------ retry policy ------------
+    def _backoff(self, err: Exception, attempt: int, kind: str):
+        """Sleep before retry `attempt`, or raise if the error is final."""
+        verdict = classify(err)
+        if verdict == "fatal" or attempt >= DRIVE_MAX_RETRIES:
+            self.stats.add(failed=1)
+            DRIVE_REQUESTS_TOTAL.inc(kind=kind, result="error")
+            if verdict == "fatal" and isinstance(err, HttpError):
+                raise DriveFileError(f"{err.resp.status} {_reason(err) or ''}".strip()) from err
+            raise err
+
+        if verdict == "quota":
+            self.limiter.throttled()
+            self.stats.add(throttled=1)
+            DRIVE_REQUESTS_TOTAL.inc(kind=kind, result="throttled")
+        else:
+            DRIVE_REQUESTS_TOTAL.inc(kind=kind, result="retry")
+
+        delay = _retry_after(err) or min(DRIVE_BACKOFF_MAX, 2 ** attempt) * random.uniform(0.5, 1.0)
+        logger.info("drive %s retry=%d in %.1fs: %s", kind, attempt + 1, delay, err)
+        self.stats.add(retries=1, backoff_seconds=delay)
+        DRIVE_BACKOFF_SECONDS.inc(delay)
+        time.sleep(delay)
+
+    def _ok(self, kind: str, n: int = 1):
+        self.limiter.succeeded(n)
+        self.stats.add(requests=n)
+        DRIVE_REQUESTS_TOTAL.inc(n, kind=kind, result="ok")
+
+    # ------------ calls ------------
+    def call(self, make_request, kind: str = "metadata"):
+        """Execute make_request(service) with rate limiting + retries; returns the response."""
+        for attempt in range(DRIVE_MAX_RETRIES + 1):
+            self.limiter.acquire()
+            try:
+                result = make_request(self._service()).execute()
+            except Exception as e:
+                self._backoff(e, attempt, kind)
+                continue
+            self._ok(kind)
+            return result
+
+    def list_files(self, q: str, fields: str, page_size: int = 1000, **kwargs) -> list:
+        """All files matching `q`, following nextPageToken."""
+        files = []
+        page_token = None
+        while True:
+            results = self.call(lambda s: s.files().list(
+                q=q, fields=fields, pageSize=page_size, pageToken=page_token, **kwargs,
+            ), kind="list")
+            files.extend(results.get("files", []))
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                return files
+
+    def batch(self, requests: dict, kind: str = "metadata") -> dict:
+        """
+        {key: make_request(service)} → {key: response or DriveFileError},
+        sent as HTTP batches of DRIVE_BATCH_SIZE. Never raises for a failed
+        batch: its keys get a DriveFileError, so callers skip those files.
+        """
+        results = {}
+        todo = list(requests.items())
+        attempt = 0
+        while todo:
+            retry = []
+            for start in range(0, len(todo), DRIVE_BATCH_SIZE):
+                group = todo[start:start + DRIVE_BATCH_SIZE]
+                try:
+                    retry.extend(self._send_batch(group, results, kind))
+                except Exception as e:          # the HTTP batch itself failed for good
+                    logger.warning("drive %s batch of %d failed: %s", kind, len(group), e)
+                    for key, _ in group:
+                        results.setdefault(key, DriveFileError(str(e)))
+            if not retry:
+                break
+
+            # Quota / transient failures inside the batch → back off once, resend those
+            err = retry[0][1]
+            todo = [item for item, _ in retry]
+            try:
+                self._backoff(err, attempt, kind)
+            except Exception:
+                for key, _ in todo:
+                    results[key] = DriveFileError(str(err))
+                break
+            attempt += 1
+        return results
+
+    def _send_batch(self, group, results: dict, kind: str):
+        """One HTTP batch; returns [((key, make_request), error)] to retry."""
+        failed = []
+        succeeded = [0]
+        service = self._service()
+
+        def callback(request_id, response, exception):
+            key, make_request = group[int(request_id)]
+            if exception is None:
+                results[key] = response
+                succeeded[0] += 1
+            elif classify(exception) == "fatal":
+                self.stats.add(failed=1)
+                DRIVE_REQUESTS_TOTAL.inc(kind=kind, result="error")
+                results[key] = DriveFileError(str(exception))
+            else:
+                failed.append(((key, make_request), exception))
+
+        self.limiter.acquire(len(group))
+        batch = service.new_batch_http_request(callback=callback)
+        for i, (_, make_request) in enumerate(group):
+            batch.add(make_request(service), request_id=str(i))
+
+        for attempt in range(DRIVE_MAX_RETRIES + 1):
+            try:
+                batch.execute()
+                break
+            except Exception as e:              # the batch request itself failed
+                self._backoff(e, attempt, kind)
+
+        self.stats.add(batches=1)
+        self._ok(kind, succeeded[0])
+        return failed
+
+    def download(self, file_id: str, fh):
+        """Stream one file's content into `fh`; a failed chunk is retried where it stopped."""
+        request = self._service().files().get_media(fileId=file_id)
+        downloader = MediaIoBaseDownload(fh, request)
+        done = False
+        attempt = 0
+        while not done:
+            self.limiter.acquire()
+            try:
+                _, done = downloader.next_chunk()
+            except Exception as e:
+                self._backoff(e, attempt, "download")
+                attempt += 1
+                continue
+            attempt = 0
+            self._ok("download")
@@ -0,0 +1,84 @@
+"""
+Embedding backend check: parity with torch + throughput.
+
+    python embed_bench.py                       # all backends
+    python embed_bench.py --backends torch onnx --threads 4
+
+For every backend it prints:
+    - sentences/sec on a fixed set of chunk-sized texts
+    - min / mean cosine similarity against the float32 torch backend
+    - resident memory after loading the model (where available)
+
+Exits with status 1 if a backend's minimum cosine drops below --min-cosine.
+"""
+
+import sys
+import time
+import argparse
+import numpy as np
+
+from backend.app.embeddings.embedder import EmbeddingModel, BACKENDS
+
+
+def _rss_mb():
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 1024 if sys.platform != "darwin" else rss / (1024 * 1024)
+    except ImportError:
+        return None  # Windows
+
+
+def _sample_texts(n: int) -> list[str]:
+    words = (
+        "invoice contract resume project report budget meeting summary design "
+        "review quarterly revenue customer support policy onboarding roadmap"
+    ).split()
+    rng = np.random.default_rng(0)
+    return [" ".join(rng.choice(words, size=120)) for _ in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--sentences", type=int, default=512)
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args()
+
+    texts = _sample_texts(args.sentences)
+    reference = None
+    failed = False
+
+    for name in ["torch"] + [b for b in args.backends if b != "torch"]:
+        model = EmbeddingModel(backend=name, threads=args.threads)
+        rss = _rss_mb()
+
+        model.embed_batch(texts[:8])                      # warm-up
+        start = time.perf_counter()
+        emb = model.embed_batch(texts)
+        elapsed = time.perf_counter() - start
+
+        line = f"{name:10s} {len(texts) / elapsed:8.1f} sentences/sec"
+        if rss is not None:
+            line += f"   peak RSS {rss:7.0f} MB"
+
+        if reference is None:
+            reference = emb
+        else:
+            a = emb / np.linalg.norm(emb, axis=1, keepdims=True)
+            b = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+            cos = (a * b).sum(axis=1)
+            line += f"   cosine vs torch min={cos.min():.4f} mean={cos.mean():.4f}"
+            if cos.min() < args.min_cosine:
+                line += "   ❌ below threshold"
+                failed = True
+
+        print(line)
+        del model
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
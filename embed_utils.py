@@ -12,6 +12,23 @@ def normalize_vector(vec: np.ndarray) -> np.ndarray:
     return vec / norm             # Return normalized vector
 
 
+def normalize_batch(mat: np.ndarray, copy: bool = True) -> np.ndarray:
+    """
+    Normalizes every row of a (n, dim) float32 matrix in one vectorized pass.
+    With copy=False the input array is modified in place.
+    """
+
+    # float32 for FAISS; asarray keeps the caller's buffer when it already fits
+    mat = np.array(mat, dtype="float32") if copy else np.asarray(mat, dtype="float32")
+    if mat.ndim == 1:
+        mat = mat.reshape(1, -1)
+
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)  # One magnitude per row
+    norms[norms == 0] = 1.0                             # Leave zero rows untouched
+    mat /= norms
+    return mat
+
+
 def reshape_vector(vec: np.ndarray) -> np.ndarray:
     """
     Ensures that the vector has shape (1, dim) instead of (dim,).
@@ -1,12 +1,31 @@
 # --------------------------------------------------------------
 # Embedding Model (Local Offline Embeddings) – Safe Version
 # --------------------------------------------------------------
+#
+# Backends (EMBEDDING_BACKEND):
+#   torch      → SentenceTransformer, float32 PyTorch (default)
+#   int8       → same model, Linear layers dynamically quantized to int8
+#   onnx       → ONNX Runtime, float32 graph exported from the local model
+#   onnx-int8  → ONNX Runtime, dynamically quantized int8 graph
+#
+# EMBEDDING_THREADS caps the CPU threads used by torch / onnxruntime.
 
 import os
+import threading
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from backend.app.utils.logger import get_logger
+
+logger = get_logger("embedder")
 
 LOCAL_MODEL_PATH = "./local_model"
+ONNX_DIR = os.path.join(LOCAL_MODEL_PATH, "onnx")
+
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_THREADS = int(os.environ.get("EMBEDDING_THREADS", "0"))    # 0 = library default
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "32"))
+
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
 
 MAX_CHARS = 2000   # prevent memory explodes
                   # (chunker creates ~800 char chunks so this is SAFE)
@@ -18,15 +37,49 @@ class EmbeddingModel:
     Protects against memory overflow by truncating long text.
     """
 
-    def __init__(self):
+    def __init__(self, backend: str = None, threads: int = None):
         # confirm the local model exists
         if not os.path.exists(LOCAL_MODEL_PATH):
             raise FileNotFoundError(
                 "❌ Local model NOT found! Run: python backend/download_model.py"
             )
 
-        print(f"🔵 Loading local embedding model from: {LOCAL_MODEL_PATH}")
-        self.model = SentenceTransformer(LOCAL_MODEL_PATH)
+        self.backend = (backend or EMBEDDING_BACKEND).lower()
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown EMBEDDING_BACKEND '{self.backend}' (use one of {BACKENDS})")
+
+        threads = EMBEDDING_THREADS if threads is None else threads
+
+        logger.info("loading embedding model path=%s backend=%s", LOCAL_MODEL_PATH, self.backend)
+        self.model = self._load(threads)
+
+    # ------------ Backend loading ------------
+    def _load(self, threads: int):
+        if self.backend in ("onnx", "onnx-int8"):
+            from backend.app.embeddings.onnx_backend import OnnxEncoder, export_onnx
+
+            quantize = self.backend == "onnx-int8"
+            onnx_path = os.path.join(ONNX_DIR, "model_int8.onnx" if quantize else "model.onnx")
+            if not os.path.exists(onnx_path):
+                export_onnx(LOCAL_MODEL_PATH, onnx_path, quantize=quantize)  # one-time
+            return OnnxEncoder(LOCAL_MODEL_PATH, onnx_path, threads=threads)
+
+        import torch   # deferred so importing this module stays cheap
+        if threads > 0:
+            torch.set_num_threads(threads)
+
+        from sentence_transformers import SentenceTransformer   # heavy: pulls in torch
+        model = SentenceTransformer(LOCAL_MODEL_PATH, device="cpu")
+
+        if self.backend == "int8":
+            # Weights of every nn.Linear → int8; activations quantized on the fly
+            torch.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+        return model
+
+    def dimension(self) -> int:
+        return int(self.model.get_sentence_embedding_dimension())
 
     # ------------ Utility: ensure safe input ------------
     def _prepare(self, text: str) -> str:
@@ -42,6 +95,26 @@ class EmbeddingModel:
         emb = self.model.encode(safe_text, convert_to_numpy=True)
         return emb.astype("float32")
 
+    # ------------ Embed many texts in one call ------------
+    def embed_batch(self, texts: list[str], batch_size: int = EMBED_BATCH_SIZE,
+                    out: np.ndarray = None) -> np.ndarray:
+        """
+        Returns a (len(texts), dim) float32 matrix.
+        With `out`, the rows are written into that preallocated buffer
+        (sync reuses one buffer for every batch) and a view of it is returned.
+        """
+        if not texts:
+            return np.zeros((0, self.dimension()), dtype="float32")
+
+        safe_texts = [self._prepare(t) for t in texts]
+        emb = self.model.encode(safe_texts, batch_size=batch_size, convert_to_numpy=True)
+        if out is None:
+            return np.asarray(emb, dtype="float32")
+
+        out = out[:len(texts)]
+        out[...] = emb
+        return out
+
     # ------------ Embed a query ------------
     def embed_query(self, query: str) -> np.ndarray:
         safe_query = self._prepare(query)
@@ -51,3 +124,24 @@ class EmbeddingModel:
     # ------------ Embed a single text to maintain compatibility ------------
     def embed_text(self, text: str) -> np.ndarray:
         return self.embed(text)
+
+
+# --------------------------------------------------------------
+# Process-wide singleton (loaded on first use, not at import)
+# --------------------------------------------------------------
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_embedding_model() -> EmbeddingModel:
+    """Return the shared EmbeddingModel, loading it on the first call."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = EmbeddingModel()
+    return _model
+
+
+def is_embedding_model_loaded() -> bool:
+    return _model is not None
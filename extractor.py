@@ -3,14 +3,30 @@ Unified Extractor Interface (Windows-Safe Version WITH VIDEO SUPPORT)
 
 Video transcription is NOT done, but video files are recognized
 and a placeholder text is returned so they appear in search results.
+
+Two entry points:
+    extract(path)              → file already on disk
+    extract_bytes(data, name)  → file still in memory (no disk round trip)
+
+plus streaming variants that yield the text piece by piece (PDF page,
+DOCX paragraph, TXT block), so a huge file never exists as one string:
+    iter_extract(path)
+    iter_extract_bytes(data, name)
 """
 
 import os
+import codecs
 
 # Import working extractors
-from backend.app.extractors.pdf_extractor import extract_pdf_text
-from backend.app.extractors.docx_extractor import extract_docx_text
-from backend.app.extractors.ocr_extractor import extract_image_text
+from backend.app.extractors.pdf_extractor import (
+    extract_pdf_text, extract_pdf_bytes, iter_pdf_pages, iter_pdf_pages_bytes,
+)
+from backend.app.extractors.docx_extractor import (
+    extract_docx_text, extract_docx_bytes, iter_docx_paragraphs, iter_docx_paragraphs_bytes,
+)
+from backend.app.extractors.ocr_extractor import extract_image_text, extract_image_bytes
+
+TEXT_BLOCK_CHARS = 1 << 20      # plain text is streamed in ~1 MB blocks
 
 
 class Extractor:
@@ -35,6 +51,37 @@ class Extractor:
             "mkv": self._video_placeholder,
         }
 
+        # Same formats, but reading from an in-memory buffer
+        self.bytes_handlers = {
+            "pdf": extract_pdf_bytes,
+            "docx": extract_docx_bytes,
+            "doc": extract_docx_bytes,
+            "txt": self._decode_text,
+
+            "png": extract_image_bytes,
+            "jpg": extract_image_bytes,
+            "jpeg": extract_image_bytes,
+
+            "mp4": self._video_placeholder,
+            "mov": self._video_placeholder,
+            "avi": self._video_placeholder,
+            "mkv": self._video_placeholder,
+        }
+
+        # Streaming handlers; other formats yield their whole text once
+        self.iter_handlers = {
+            "pdf": iter_pdf_pages,
+            "docx": iter_docx_paragraphs,
+            "doc": iter_docx_paragraphs,
+            "txt": self._iter_text,
+        }
+        self.iter_bytes_handlers = {
+            "pdf": iter_pdf_pages_bytes,
+            "docx": iter_docx_paragraphs_bytes,
+            "doc": iter_docx_paragraphs_bytes,
+            "txt": self._iter_decoded,
+        }
+
     def _read_text(self, path: str) -> str:
         """Simple plain text reader fallback."""
         try:
@@ -47,7 +94,46 @@ class Extractor:
             except:
                 return ""
 
-    def _video_placeholder(self, path: str) -> str:
+    def _decode_text(self, data) -> str:
+        """Plain text fallback for in-memory buffers."""
+        try:
+            return bytes(data).decode("utf-8")
+        except:
+            return bytes(data).decode("utf-8", errors="ignore")
+
+    def _iter_text(self, path: str):
+        """Plain text file, one block at a time."""
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            while True:
+                block = f.read(TEXT_BLOCK_CHARS)
+                if not block:
+                    return
+                yield block
+
+    def _iter_decoded(self, data):
+        """In-memory plain text, decoded one block at a time."""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        view = memoryview(data)
+        for start in range(0, len(view), TEXT_BLOCK_CHARS):
+            yield decoder.decode(view[start:start + TEXT_BLOCK_CHARS])
+        yield decoder.decode(b"", final=True)
+
+    def _stream(self, pieces, fallback):
+        """
+        Yield from a streaming handler. If the parser fails before producing
+        anything, fall back like extract() does; a failure halfway through
+        keeps what was already yielded.
+        """
+        produced = False
+        try:
+            for piece in pieces:
+                produced = True
+                yield piece
+        except Exception:
+            if not produced:
+                yield fallback()
+
+    def _video_placeholder(self, path) -> str:
         """Return placeholder text for video files."""
         return "[VIDEO FILE – no transcription on Windows]"
 
@@ -66,3 +152,53 @@ class Extractor:
             return handler(path)
         except:
             return self._read_text(path)
+
+    def extract_bytes(self, data, file_name: str) -> str:
+        """
+        Extract text from a downloaded buffer (bytes / memoryview).
+        The file name is only used to pick the handler.
+        """
+
+        if data is None or len(data) == 0:
+            return ""
+
+        ext = os.path.splitext(file_name)[1].lower().lstrip(".")
+        handler = self.bytes_handlers.get(ext)
+
+        if handler is None:
+            return self._decode_text(data)
+
+        try:
+            return handler(data)
+        except:
+            return self._decode_text(data)
+
+    def iter_extract(self, path: str):
+        """Streaming extract(): yields text pieces instead of one string."""
+
+        if not os.path.exists(path):
+            return
+
+        ext = os.path.splitext(path)[1].lower().lstrip(".")
+        handler = self.iter_handlers.get(ext)
+
+        if handler is None:
+            yield self.extract(path)
+            return
+
+        yield from self._stream(handler(path), lambda: self._read_text(path))
+
+    def iter_extract_bytes(self, data, file_name: str):
+        """Streaming extract_bytes(): yields text pieces instead of one string."""
+
+        if data is None or len(data) == 0:
+            return
+
+        ext = os.path.splitext(file_name)[1].lower().lstrip(".")
+        handler = self.iter_bytes_handlers.get(ext)
+
+        if handler is None:
+            yield self.extract_bytes(data, file_name)
+            return
+
+        yield from self._stream(handler(data), lambda: self._decode_text(data))
@@ -2,6 +2,7 @@ import faiss
 import numpy as np
 import os
 from backend.app.config import settings
+from backend.app.vectorstore.faiss_store import rank_hits
 
 
 # -------------------------------------------------------------
@@ -63,9 +64,12 @@ def search_index(index, query_vec: np.ndarray, k: int = 5):
 
     ✔ Fetch top-20 matches instead of top-5
     ✔ Filter poor matches using distance threshold
-    ✔ Sort remaining by similarity
     ✔ Return top-k best results
 
+    Scoring + filtering now goes through faiss_store.rank_hits, the same
+    vectorized path FaissStore.search uses (no per-hit Python sorting:
+    FAISS already returns each row best-first).
+
     WHY THIS WORKS:
     - FAISS distance: lower = more similar
     - MiniLM embedding distances usually 0.4–1.0 for strong matches
@@ -79,25 +83,14 @@ def search_index(index, query_vec: np.ndarray, k: int = 5):
     # Step 1: Search top 20 candidates
     distances, ids = index.search(query_vec, 20)
 
-    distances = distances[0]
-    ids = ids[0]
-
-    # Pair up (id, distance)
-    pairs = list(zip(ids, distances))
-
     # Step 2: filter weak matches using distance threshold
     THRESHOLD = 1.20    # lower = more strict, higher = more documents included
 
-    filtered = [(idx, dist) for idx, dist in pairs if dist < THRESHOLD]
-
-    # Step 3: sort by best similarity (lowest distance first)
-    filtered = sorted(filtered, key=lambda x: x[1])
-
-    # Step 4: take top-K final results
-    filtered = filtered[:k]
+    # squared L2 threshold → cosine cutoff (unit vectors: d = 2 - 2·cos)
+    _, keep = rank_hits(distances, ids, "l2", min_score=1.0 - THRESHOLD / 2.0)
 
-    # Step 5: split into IDs and distances
-    final_ids = [x[0] for x in filtered]
-    final_dist = [x[1] for x in filtered]
+    # Step 3: take top-K final results
+    final_ids = ids[0][keep[0]][:k].tolist()
+    final_dist = distances[0][keep[0]][:k].tolist()
 
     return final_ids, final_dist
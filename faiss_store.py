@@ -1,75 +1,1000 @@
 import os
+import time
+import mmap
+import bisect
+import threading
+import shutil
 import faiss
 import numpy as np
-import json
+from array import array
+from collections import OrderedDict
+
+from backend.app.embeddings.embed_utils import normalize_batch
+from backend.app.vectorstore.text_store import write_text_file, open_texts, SnippetTexts, stitch
+from backend.app.vectorstore.file_index import (
+    FileIndex, file_runs, write_file_runs, read_file_runs,
+    COARSE_TOP_FILES, COARSE_MIN_VECTORS, COARSE_MAX_FRACTION,
+)
+from backend.app.core.partitions import (
+    normalize_partition, partition_dir, MAX_LOADED_PARTITIONS,
+)
+from backend.app.utils.logger import get_logger
+from backend.app.utils.metrics import stage_timer, CACHE_TOTAL
+from backend.app.utils.profiling import track_allocations
+from backend.app.utils.jsonio import dumps, loads        # metadata + manifest (orjson if installed)
+
+logger = get_logger("faiss_store")
 
 VECTOR_DIM = 384  # for all-MiniLM-L6-v2 model
 
 # Save inside data folder (correct)
-INDEX_PATH = "backend/app/data/faiss_index.bin"
-META_PATH = "backend/app/data/faiss_meta.json"
+DATA_DIR = "backend/app/data"
+INDEX_PATH = "backend/app/data/faiss_index.bin"      # legacy single-file index
+META_PATH = "backend/app/data/faiss_meta.json"       # legacy single-file metadata
 
+# Versioned snapshots:
+#   snapshots/manifest.json         → {"version": N, "dim": 384, "segments": [...]}
+#   snapshots/seg_000042.index      → FAISS vectors of one segment (immutable)
+#   snapshots/seg_000042.jsonl      → metadata of the same segment (+ .offsets.npy)
+#   snapshots/seg_000042.text       → full chunk texts, compressed (see text_store.py)
+#   snapshots/seg_000042.files.*    → per-file centroids for coarse search (see file_index.py)
+# Every save() appends one segment and atomically replaces manifest.json.
+# save(publish=False) only stages a segment (memory-ceiling flushes); it
+# becomes visible with the next publishing save(). Past MAX_SEGMENTS the
+# MERGE_WIDTH adjacent segments with the fewest vectors are merged into one
+# (merge_window()), never the whole index. The manifest also lists
+# the Drive file ids that publish completed ("committed_files"), which is
+# how the sync journal recovers from a crash right after publishing, and
+# when each segment dropped out of the published set ("retired": name →
+# time); those are deleted GC_GRACE_SECONDS after that.
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+MANIFEST_PATH = os.path.join(SNAPSHOT_DIR, "manifest.json")
 
-class FaissStore:
-    def __init__(self, dim: int = VECTOR_DIM):
+# Query workers map the segment files read-only, so N processes share one
+# physical copy of the vectors through the OS page cache.
+USE_MMAP = os.environ.get("FAISS_MMAP", "1") == "1"
+WATCH_INTERVAL = float(os.environ.get("FAISS_WATCH_INTERVAL", "1.0"))   # seconds
+MAX_SEGMENTS = int(os.environ.get("FAISS_MAX_SEGMENTS", "16"))          # then merge some
+MERGE_WIDTH = int(os.environ.get("FAISS_MERGE_WIDTH", "4"))             # segments merged at a time
+GC_GRACE_SECONDS = 300        # retired segments are deleted this long after they stopped being published
+
+# Writer-side buffer of not-yet-saved vectors. It is kept between saves so
+# streaming sync reuses the same memory; bigger buffers are released.
+PENDING_MIN_ROWS = 1024
+PENDING_RETAIN_BYTES = 64 * 1024 * 1024
+
+# Metric + index type for NEW stores; an existing store keeps what its
+# manifest says until it is converted with migrate_index.py.
+#   ip → inner product on L2-normalized vectors (= cosine similarity)
+#   l2 → squared euclidean distance (legacy)
+DEFAULT_METRIC = os.environ.get("FAISS_METRIC", "ip").lower()
+DEFAULT_INDEX_TYPE = os.environ.get("FAISS_INDEX_TYPE", "flat").lower()   # flat | hnsw | ivf
+HNSW_M = int(os.environ.get("FAISS_HNSW_M", "32"))
+HNSW_EF_SEARCH = int(os.environ.get("FAISS_HNSW_EF_SEARCH", "64"))
+
+# IVF is trained per segment: nlist scales with the segment (≈ 4·√n, at most
+# FAISS_IVF_NLIST, ≥ 39 training points per list). Best with one big
+# segment from bulk_indexer.py; small sync segments get few lists.
+IVF_NLIST = int(os.environ.get("FAISS_IVF_NLIST", "1024"))
+IVF_NPROBE = int(os.environ.get("FAISS_IVF_NPROBE", "16"))
+IVF_TRAIN_SAMPLE = 256 * 1024          # rows used to train a big segment
+COMPACT_BATCH_ROWS = 50000             # vectors copied at a time when merging segments
+
+
+# -------------------------------------------------------------------------
+# Index factory + scoring
+# -------------------------------------------------------------------------
+def ivf_nlist(n_vectors: int) -> int:
+    if not n_vectors:
+        return 1
+    return int(max(1, min(IVF_NLIST, n_vectors // 39, 4 * np.sqrt(n_vectors))))
+
+
+def new_index(dim: int, metric: str = DEFAULT_METRIC, index_type: str = DEFAULT_INDEX_TYPE,
+              n_vectors: int = None):
+    """
+    Create an empty index for the given metric ("ip"/"l2") and type
+    ("flat"/"hnsw"/"ivf"). An ivf index must be trained before add()
+    (see build_index); `n_vectors` sizes its lists.
+    """
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "ip" else faiss.METRIC_L2
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss_metric)
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+
+    if index_type == "ivf":
+        nlist = ivf_nlist(n_vectors)
+        quantizer = faiss.IndexFlatIP(dim) if metric == "ip" else faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss_metric)
+        index.nprobe = min(IVF_NPROBE, nlist)
+        return index
+
+    return faiss.IndexFlatIP(dim) if metric == "ip" else faiss.IndexFlatL2(dim)
+
+
+def _train(index, sample: np.ndarray):
+    """Train an untrained (ivf) index; flat / hnsw need nothing."""
+    if index.is_trained:
+        return
+    if len(sample) > IVF_TRAIN_SAMPLE:
+        rows = np.random.default_rng(0).choice(len(sample), IVF_TRAIN_SAMPLE, replace=False)
+        sample = sample[np.sort(rows)]
+    index.train(sample)
+    index.make_direct_map()              # ids → vectors for reconstruct (compaction, coarse search)
+
+
+def build_index(vectors: np.ndarray, metric: str, index_type: str):
+    """Index holding `vectors` (already normalized for ip), trained if the type needs it."""
+    index = new_index(vectors.shape[1], metric, index_type, n_vectors=len(vectors))
+    _train(index, vectors)
+    index.add(vectors)
+    return index
+
+
+def rank_hits(distances: np.ndarray, ids: np.ndarray, metric: str, min_score: float = None):
+    """
+    The single scoring path for every search.
+
+    Turns a FAISS (distances, ids) matrix into similarity scores
+    (higher = better, cosine for unit vectors) plus a keep-mask.
+    FAISS rows are sorted best-first, so the mask is cut at the first
+    hit below `min_score` (early termination) — no per-hit Python sorting.
+    """
+    if metric == "ip":
+        scores = distances
+    else:
+        # squared L2 between unit vectors = 2 - 2·cos  →  cos = 1 - d/2
+        scores = 1.0 - distances / 2.0
+
+    keep = ids >= 0
+    if min_score is not None:
+        keep &= scores >= min_score
+    keep = np.logical_and.accumulate(keep, axis=1)
+
+    return scores, keep
+
+
+# -------------------------------------------------------------------------
+# File helpers
+# -------------------------------------------------------------------------
+def read_index_file(path: str, use_mmap: bool = False):
+    """Load a FAISS index, optionally memory-mapped and read-only."""
+    if not use_mmap:
+        return _prepare(faiss.read_index(path))
+
+    # IO_FLAG_MMAP_IFC also maps flat codes (IndexFlat*); older builds only
+    # map inverted lists, in which case flat indexes are read normally.
+    flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    return _prepare(faiss.read_index(path, flags | faiss.IO_FLAG_READ_ONLY))
+
+
+def _prepare(index):
+    """Search-time settings that are not serialized."""
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    if hasattr(index, "nprobe"):
+        index.nprobe = min(IVF_NPROBE, index.nlist)
+        index.make_direct_map()
+    return index
+
+
+def write_meta_file(path: str, metadata_list):
+    """
+    Write metadata as JSON lines plus an offsets table (<path>.offsets.npy)
+    so readers can fetch entry i without parsing the whole file.
+    `metadata_list` may be any iterable (streamed when merging segments).
+    """
+    offsets = array("Q", [0])
+
+    with open(path, "wb") as f:
+        pos = 0
+        for m in metadata_list:
+            line = dumps(m) + b"\n"
+            f.write(line)
+            pos += len(line)
+            offsets.append(pos)
+
+    np.save(path + ".offsets.npy", np.frombuffer(offsets, dtype=np.uint64))
+
+
+def _fsync_path(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # not supported for this file (some Windows setups)
+    finally:
+        os.close(fd)
+
+
+def _write_json_atomic(path: str, data: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(dumps(data))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)                            # atomic on POSIX and Windows
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # still mapped by a reader (Windows) or already gone
+
+
+def merge_window(segments, max_segments: int = MAX_SEGMENTS, width: int = MERGE_WIDTH):
+    """
+    [start, end) of the segments to merge once there are too many: the
+    `width` adjacent ones (at least enough to get back to max_segments)
+    with the fewest vectors. Small new segments merge with each other
+    and big ones are rewritten rarely, so a vector is rewritten about
+    log_width(N) times instead of on every publish. Adjacent, so global
+    ids keep their order (a file's chunks stay next to each other).
+    """
+    width = min(len(segments), max(2, width, len(segments) - max_segments + 1))
+    counts = [s["count"] for s in segments]
+    start = min(range(len(segments) - width + 1), key=lambda i: sum(counts[i:i + width]))
+    return start, start + width
+
+
+def read_manifest(snapshot_dir: str = SNAPSHOT_DIR):
+    """Return the published manifest dict, or None if nothing is published."""
+    try:
+        with open(os.path.join(snapshot_dir, "manifest.json"), "rb") as f:
+            return loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+class MappedMetadata:
+    """
+    Read-only, memory-mapped view of a JSONL metadata file.
+    Behaves like a list: len(meta), meta[i], iteration.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offsets = np.load(path + ".offsets.npy", mmap_mode="r")
+        self._fh = open(path, "rb")
+        size = os.fstat(self._fh.fileno()).st_size
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return loads(self._mm[start:end])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._fh.close()
+
+
+class SegmentedMetadata:
+    """List-like view over the metadata of several segments (global ids)."""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.starts = []
+        total = 0
+        for p in parts:
+            self.starts.append(total)
+            total += len(p)
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self.total
+        if not 0 <= idx < self.total:
+            raise IndexError(idx)
+        part = bisect.bisect_right(self.starts, idx) - 1
+        return self.parts[part][idx - self.starts[part]]
+
+    def __iter__(self):
+        for p in self.parts:
+            yield from p
+
+
+# -------------------------------------------------------------------------
+# Snapshot = one immutable, searchable version of the index
+# -------------------------------------------------------------------------
+class Snapshot:
+    """
+    Immutable view of one published version.
+    Queries grab a reference and keep using it even if a newer
+    snapshot is swapped in meanwhile (read-copy-update).
+    """
+
+    def __init__(self, version, dim, segments, segment_cache=None, use_mmap=False,
+                 metric="l2", index_type="flat", snapshot_dir=SNAPSHOT_DIR):
+        self.version = version
         self.dim = dim
+        self.metric = metric
+        self.index_type = index_type
+        self.segment_names = [s["name"] for s in segments]
 
-        # Load or create FAISS index
-        if os.path.exists(INDEX_PATH):
-            self.index = faiss.read_index(INDEX_PATH)
-        else:
-            self.index = faiss.IndexFlatL2(self.dim)
+        cache = segment_cache or {}
+        self.loaded = {}                             # name → (index, meta, texts, file runs), reused by the next snapshot
+        for s in segments:
+            name = s["name"]
+            if name in cache:
+                self.loaded[name] = cache[name]
+                CACHE_TOTAL.inc(cache="segment", result="hit")
+                continue
+            CACHE_TOTAL.inc(cache="segment", result="miss")
+            base = os.path.join(snapshot_dir, name)
+            index = read_index_file(base + ".index", use_mmap)
+            meta = MappedMetadata(base + ".jsonl")
+            self.loaded[name] = (index, meta, open_texts(base + ".text", meta), read_file_runs(base))
 
-        # Load metadata
-        if os.path.exists(META_PATH):
-            with open(META_PATH, "r", encoding="utf-8") as f:
-                self.meta = json.load(f)
+        parts = [self.loaded[n] for n in self.segment_names]
+        self.meta = SegmentedMetadata([m for _, m, _, _ in parts])
+        self.texts = SegmentedMetadata([t for _, _, t, _ in parts])   # same global ids
+        self.segment_indexes = [idx for idx, _, _, _ in parts]
+        self.segment_starts = self.meta.starts
+        self._runs = [runs for _, _, _, runs in parts]
+        self._file_index = None
+
+        if len(parts) == 1:
+            self.index = parts[0][0]
+        elif parts:
+            # successive_ids → segment i's ids are offset by the sizes before it
+            self.index = faiss.IndexShards(dim, False, True)
+            self.index.metric_type = parts[0][0].metric_type     # merge direction
+            for idx, _, _, _ in parts:
+                self.index.add_shard(idx)
         else:
-            self.meta = []
+            self.index = new_index(dim, metric, "flat")      # nothing published yet
+
+    @classmethod
+    def from_objects(cls, index, meta, version=0, metric="l2"):
+        """Wrap an in-memory (index, meta) pair, used for legacy files."""
+        snap = cls.__new__(cls)
+        snap.version = version
+        snap.dim = index.d
+        snap.metric = metric
+        snap.index_type = "hnsw" if hasattr(index, "hnsw") else "ivf" if hasattr(index, "nprobe") else "flat"
+        snap.segment_names = []
+        snap.loaded = {}
+        snap.index = index
+        snap.meta = meta
+        snap.texts = SnippetTexts(meta)
+        snap.segment_indexes = [index]
+        snap.segment_starts = [0]
+        snap._runs = [None]
+        snap._file_index = None
+        return snap
+
+    @property
+    def file_index(self) -> FileIndex:
+        """Centroids of all segments, built on first use (segments written
+        before the file index get their runs computed here)."""
+        if self._file_index is None:
+            metas = self.meta.parts if isinstance(self.meta, SegmentedMetadata) else [self.meta]
+            parts = []
+            for idx, meta, runs, start in zip(self.segment_indexes, metas, self._runs, self.segment_starts):
+                if runs is None:
+                    runs = file_runs(list(meta), idx.reconstruct_n(0, idx.ntotal))
+                parts.append((runs[0], runs[1], start))
+            self._file_index = FileIndex(parts, self.dim)
+        return self._file_index
+
+    def vectors(self, start: int, count: int) -> np.ndarray:
+        """Stored vectors of global ids [start, start + count) — within one segment."""
+        seg = bisect.bisect_right(self.segment_starts, start) - 1
+        return self.segment_indexes[seg].reconstruct_n(start - self.segment_starts[seg], count)
+
+    def context(self, idx: int, window: int = 0) -> str:
+        """
+        Full text of chunk `idx`, plus up to `window` neighbouring chunks on
+        each side that belong to the same file, stitched into one passage.
+        """
+        ids = [idx]
+        if window:
+            file_id = self.meta[idx].get("file_id")
+            for step in (-1, 1):
+                j = idx + step
+                while abs(j - idx) <= window and 0 <= j < len(self.meta) \
+                        and self.meta[j].get("file_id") == file_id:
+                    ids.append(j)
+                    j += step
+            ids.sort()
+        return stitch([self.texts[j] for j in ids])
+
+
+def _load_legacy(dim, use_mmap, data_dir=DATA_DIR):
+    """Load the pre-snapshot single-file layout (faiss_index.bin + faiss_meta.json)."""
+    index_path = os.path.join(data_dir, os.path.basename(INDEX_PATH))
+    meta_path = os.path.join(data_dir, os.path.basename(META_PATH))
+    if os.path.exists(index_path):
+        index = read_index_file(index_path, use_mmap)
+        meta = []
+        if os.path.exists(meta_path):
+            with open(meta_path, "rb") as f:
+                meta = loads(f.read())
+        return index, meta
+
+    return None
+
+
+class FaissStore:
+    """
+    FAISS index + chunk metadata, stored as versioned snapshots.
+
+    Writer (sync):  add_batch() buffers vectors, save() publishes them as a
+                    new segment + manifest version.
+    Reader (query): FaissStore(read_only=True) memory-maps the segments and
+                    a background watcher swaps in new versions within
+                    FAISS_WATCH_INTERVAL seconds, with no restart.
+    """
+
+    def __init__(self, dim: int = VECTOR_DIM, read_only: bool = False, watch: bool = None,
+                 data_dir: str = DATA_DIR):
+        self.dim = dim
+        self.read_only = read_only
+        self.use_mmap = USE_MMAP
+
+        # One data dir per index partition (see core/partitions.py)
+        self.data_dir = data_dir
+        self.snapshot_dir = os.path.join(data_dir, os.path.basename(SNAPSHOT_DIR))
+        self.manifest_path = os.path.join(self.snapshot_dir, os.path.basename(MANIFEST_PATH))
+
+        self._write_lock = threading.Lock()
+        self._pending = np.empty((0, dim), dtype="float32")   # grown on demand, reused across saves
+        self._pending_rows = 0
+        self._pending_meta = []
+        self._pending_texts = []   # full chunk texts, same order as _pending_meta
+        self._pending_text_bytes = 0
+        self._staged = []          # written but unpublished segments (see save(publish=False))
+
+        if not read_only:
+            self._migrate_legacy()
+
+        self._snapshot = self._load_snapshot()
+
+        # Readers watch the manifest by default; writers refresh on save()
+        self._stop = threading.Event()
+        self._watcher = None
+        if watch if watch is not None else read_only:
+            self._watcher = threading.Thread(
+                target=self._watch_loop, name="faiss-snapshot-watcher", daemon=True
+            )
+            self._watcher.start()
 
-    def save(self):
-        """Save FAISS index + metadata safely."""
-        print(f"💾 Saving FAISS index → {INDEX_PATH}")
-        print(f"💾 Saving metadata → {META_PATH}")
+    # ------------ current snapshot ------------
+    @property
+    def snapshot(self) -> Snapshot:
+        return self._snapshot
 
-        faiss.write_index(self.index, INDEX_PATH)
+    @property
+    def metric(self) -> str:
+        return self._snapshot.metric
 
-        with open(META_PATH, "w", encoding="utf-8") as f:
-            json.dump(self.meta, f, indent=2)
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
 
-        print("✅ Save complete")
+    @property
+    def index(self):
+        return self._snapshot.index
 
-    def add(self, vector: np.ndarray, metadata: dict):
+    @property
+    def meta(self):
+        return self._snapshot.meta
+
+    # ------------ loading ------------
+    def read_manifest(self):
+        return read_manifest(self.snapshot_dir)
+
+    def _load_snapshot(self, previous: Snapshot = None) -> Snapshot:
+        manifest = self.read_manifest()
+
+        if manifest:
+            cache = previous.loaded if previous else None
+            return Snapshot(
+                manifest["version"], manifest.get("dim", self.dim),
+                manifest["segments"], segment_cache=cache, use_mmap=self.use_mmap,
+                metric=manifest.get("metric", "l2"),
+                index_type=manifest.get("index_type", "flat"),
+                snapshot_dir=self.snapshot_dir,
+            )
+
+        legacy = _load_legacy(self.dim, self.use_mmap, self.data_dir)
+        if legacy:
+            return Snapshot.from_objects(*legacy, metric="l2")
+
+        return Snapshot.from_objects(new_index(self.dim, index_type="flat"), [], metric=DEFAULT_METRIC)
+
+    def _migrate_legacy(self):
+        """Convert an old single-file index into snapshot segment #1."""
+        if self.read_manifest() is not None:
+            return
+        legacy = _load_legacy(self.dim, use_mmap=False, data_dir=self.data_dir)
+        if not legacy:
+            return
+
+        index, meta = legacy
+        logger.info("migrating legacy index vectors=%d", index.ntotal)
+        meta = list(meta)
+        self._write_segment("seg_000001", index, meta, SnippetTexts(meta))
+        self._write_manifest(1, [{"name": "seg_000001", "count": int(index.ntotal)}],
+                             metric="l2", index_type="flat")
+
+    def reload_if_changed(self) -> bool:
+        """
+        Load the latest manifest if its version is newer and swap it in.
+        Unchanged segments are reused, so only new segments are read.
+        """
+        manifest = self.read_manifest()
+        if not manifest or manifest["version"] == self._snapshot.version:
+            return False
+
+        new_snapshot = self._load_snapshot(previous=self._snapshot)
+        self._snapshot = new_snapshot     # single assignment → atomic swap
+        logger.info("snapshot live version=%d vectors=%d", new_snapshot.version, new_snapshot.index.ntotal)
+        return True
+
+    def _watch_loop(self):
+        while not self._stop.wait(WATCH_INTERVAL):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                # a half-deleted segment etc. → keep serving the old snapshot
+                logger.warning("snapshot reload failed, keeping version=%d: %s", self.version, e)
+
+    def close(self):
+        """Stop the background watcher."""
+        self._stop.set()
+
+    # ------------ saving ------------
+    def _write_segment(self, name, index, metadata_list, texts, vectors=None, runs=None):
+        """
+        Write one segment's files, durably. `runs` = its (runs, centroids)
+        if already known; then metadata and texts may be one-pass iterables.
+        """
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        base = os.path.join(self.snapshot_dir, name)
+
+        if runs is None:
+            if vectors is None:
+                vectors = index.reconstruct_n(0, index.ntotal) if index.ntotal else np.empty((0, self.dim), "float32")
+            runs = file_runs(metadata_list, vectors)
+
+        faiss.write_index(index, base + ".index")
+        write_meta_file(base + ".jsonl", metadata_list)
+        write_text_file(base + ".text", texts)
+        write_file_runs(base, *runs)
+
+        # Durable before any manifest can reference them
+        for suffix in (".index", ".jsonl", ".jsonl.offsets.npy", ".text", ".text.offsets.npy",
+                       ".files.npy", ".files.json"):
+            _fsync_path(base + suffix)
+        return {"name": name, "count": int(index.ntotal)}
+
+    def _write_manifest(self, version, segments, metric, index_type, committed_files=None):
+        now = time.time()
+        previous = self.read_manifest() or {}
+        names = {s["name"] for s in segments}
+        on_disk = {name.split(".", 1)[0] for name in os.listdir(self.snapshot_dir)}
+
+        # Segments the previous version published and this one does not: a
+        # reader may still be opening them, so the GC grace starts now
+        retired = {name: at for name, at in previous.get("retired", {}).items()
+                   if name not in names and name in on_disk}
+        for seg in previous.get("segments", []):
+            if seg["name"] not in names:
+                retired.setdefault(seg["name"], now)
+
+        _write_json_atomic(self.manifest_path, {
+            "version": version,
+            "dim": self.dim,
+            "metric": metric,
+            "index_type": index_type,
+            "segments": segments,
+            "committed_files": list(committed_files or []),
+            "retired": retired,
+            "created_at": now,
+        })
+
+    def save(self, publish: bool = True, files=None, replace: bool = False,
+             metric: str = None, index_type: str = None):
+        """
+        Publish buffered vectors as a new snapshot version.
+        The segment files are written first, then manifest.json is replaced
+        atomically, so readers never see a half-written version.
+
+        publish=False writes the buffered vectors as a staged segment only
+        (frees the memory, nothing becomes visible). `files` = Drive file
+        ids completed by this publish, recorded in the manifest.
+
+        replace=True publishes the buffered + staged vectors as the whole
+        index (bulk builds), optionally as another `metric` / `index_type`.
+        """
+        if self.read_only:
+            raise RuntimeError("FaissStore opened read-only")
+
+        with self._write_lock, stage_timer("index_save"), track_allocations("index_save"):
+            if not self._pending_rows and not (publish and (self._staged or files)):
+                return
+
+            manifest = self.read_manifest() or {
+                "version": 0, "segments": [],
+                "metric": DEFAULT_METRIC, "index_type": DEFAULT_INDEX_TYPE,
+            }
+            version = manifest["version"] + 1
+            if not (replace and metric):
+                metric = manifest.get("metric", "l2")
+            if not (replace and index_type):
+                index_type = manifest.get("index_type", "flat")
+
+            if self._pending_rows:
+                vectors = self._pending[:self._pending_rows]   # view, no concatenate copy
+                metas, texts = self._pending_meta, self._pending_texts
+                self._pending_rows, self._pending_meta, self._pending_texts = 0, [], []
+                self._pending_text_bytes = 0
+
+                if metric == "ip":
+                    normalize_batch(vectors, copy=False)   # whole batch at once, in place
+
+                segment_index = build_index(vectors, metric, index_type)
+
+                # Only one writer (sync lock), so `version` is still free at publish time
+                name = f"seg_{version:06d}" + (f"_s{len(self._staged):03d}" if not publish else "")
+                logger.info("saving segment=%s vectors=%d", name, len(metas))
+                self._staged.append(self._write_segment(name, segment_index, metas, texts, vectors))
+
+            if not publish:
+                return
+
+            segments = (manifest["segments"] if not replace else []) + self._staged
+            self._staged = []
+            self._write_manifest(version, segments, metric, index_type, committed_files=files)
+
+            if len(segments) > MAX_SEGMENTS:
+                start, end = merge_window(segments)
+                merged = self._compact(segments[start:end], f"seg_{version + 1:06d}", metric, index_type)
+                self._write_manifest(version + 1, segments[:start] + [merged] + segments[end:],
+                                     metric, index_type, committed_files=files)
+
+            self._snapshot = self._load_snapshot(previous=self._snapshot)
+            self._collect_garbage()
+
+            if self._pending.nbytes > PENDING_RETAIN_BYTES:
+                self._pending = np.empty((0, self.dim), dtype="float32")   # one-off bulk load
+
+        logger.info("save complete version=%d", self.version)
+
+    def discard_pending(self):
+        """Drop buffered and staged vectors (the file being ingested failed)."""
+        with self._write_lock:
+            self._pending_rows, self._pending_meta, self._pending_texts = 0, [], []
+            self._pending_text_bytes = 0
+            self._staged = []          # files are left to _collect_garbage
+
+    def _compact(self, segments, name, metric, index_type):
+        """
+        Merge `segments` into one new segment `name` (not yet published), so
+        search doesn't fan out too wide. Streamed segment by segment: vectors
+        are added COMPACT_BATCH_ROWS at a time, metadata and texts go straight
+        from the mapped source files to the new ones, and the file runs are
+        the sources' runs shifted, so only the new index itself is in memory.
+        """
+        logger.info("compacting segments=%d into %s", len(segments), name)
+        sources = []
+        for s in segments:
+            base = os.path.join(self.snapshot_dir, s["name"])
+            meta = MappedMetadata(base + ".jsonl")
+            sources.append((read_index_file(base + ".index", use_mmap=self.use_mmap),
+                            meta, open_texts(base + ".text", meta), base))
+        total = sum(idx.ntotal for idx, _, _, _ in sources)
+
+        merged = new_index(self.dim, metric, index_type, n_vectors=total)
+        if not merged.is_trained:
+            # same share of the training sample from every segment
+            _train(merged, np.vstack([
+                idx.reconstruct_n(0, min(idx.ntotal, -(-IVF_TRAIN_SAMPLE * idx.ntotal // total)))
+                for idx, _, _, _ in sources if idx.ntotal
+            ]))
+
+        runs, centroids, offset = [], [], 0
+        for idx, meta, _, base in sources:
+            for start in range(0, idx.ntotal, COMPACT_BATCH_ROWS):
+                merged.add(idx.reconstruct_n(start, min(COMPACT_BATCH_ROWS, idx.ntotal - start)))
+
+            # Segments written before the file index get their runs computed here
+            seg_runs = read_file_runs(base) or file_runs(list(meta), idx.reconstruct_n(0, idx.ntotal))
+            runs.extend([file_id, file_name, offset + first, count] for file_id, file_name, first, count in seg_runs[0])
+            centroids.append(seg_runs[1])
+            offset += idx.ntotal
+
+        centroids = np.vstack(centroids) if centroids else np.empty((0, self.dim), dtype="float32")
+        try:
+            return self._write_segment(
+                name, merged,
+                (m for _, meta, _, _ in sources for m in meta),
+                (t for _, _, texts, _ in sources for t in texts),
+                runs=(runs, centroids),
+            )
+        finally:
+            for _, meta, texts, _ in sources:
+                meta.close()
+                if hasattr(texts, "close"):
+                    texts.close()
+
+    def rebuild(self, metric: str = "ip", index_type: str = "flat", batch_size: int = 50000):
+        """
+        Convert the published index to another metric / index type in place.
+
+        Each segment is streamed in `batch_size` rows: reconstruct → normalize
+        (for ip) → add to the new index, so peak memory stays at one segment.
+        Metadata files are copied unchanged. The result is published as a
+        new version; readers swap to it like after any sync.
+        """
+        if self.read_only:
+            raise RuntimeError("FaissStore opened read-only")
+
+        with self._write_lock:
+            manifest = self.read_manifest()
+            if not manifest:
+                raise RuntimeError("No published index to rebuild")
+
+            version = manifest["version"] + 1
+            new_segments = []
+            for i, s in enumerate(manifest["segments"]):
+                src = os.path.join(self.snapshot_dir, s["name"])
+                old = read_index_file(src + ".index", use_mmap=self.use_mmap)
+                converted = new_index(self.dim, metric, index_type, n_vectors=old.ntotal)
+                if not converted.is_trained:
+                    sample = old.reconstruct_n(0, min(old.ntotal, IVF_TRAIN_SAMPLE))
+                    if metric == "ip":
+                        normalize_batch(sample, copy=False)
+                    _train(converted, sample)
+
+                for start in range(0, old.ntotal, batch_size):
+                    batch = old.reconstruct_n(start, min(batch_size, old.ntotal - start))
+                    if metric == "ip":
+                        normalize_batch(batch, copy=False)
+                    converted.add(batch)
+
+                name = f"seg_{version:06d}_{i:03d}"
+                dst = os.path.join(self.snapshot_dir, name)
+                faiss.write_index(converted, dst + ".index")
+                shutil.copyfile(src + ".jsonl", dst + ".jsonl")
+                shutil.copyfile(src + ".jsonl.offsets.npy", dst + ".jsonl.offsets.npy")
+                for suffix in (".text", ".text.offsets.npy", ".files.npy", ".files.json"):
+                    if os.path.exists(src + suffix):
+                        shutil.copyfile(src + suffix, dst + suffix)
+                new_segments.append({"name": name, "count": int(converted.ntotal)})
+                logger.info("rebuilt segment %s -> %s vectors=%d", s["name"], name, converted.ntotal)
+
+            self._write_manifest(version, new_segments, metric, index_type,
+                                 committed_files=manifest.get("committed_files"))
+            self._snapshot = self._load_snapshot(previous=self._snapshot)
+            self._collect_garbage()
+
+        logger.info("rebuilt index as %s/%s version=%d", metric, index_type, self.version)
+
+    def _collect_garbage(self):
+        """
+        Delete segment files no manifest references any more, GC_GRACE_SECONDS
+        after they were retired. Segments that were never published (staged
+        leftovers of a failed run) go by file mtime instead.
+        """
+        manifest = self.read_manifest() or {"segments": []}
+        live = {s["name"] for s in manifest["segments"] + self._staged}
+        retired = manifest.get("retired", {})
+        cutoff = time.time() - GC_GRACE_SECONDS
+
+        for name in os.listdir(self.snapshot_dir):
+            segment = name.split(".", 1)[0]
+            if not name.startswith("seg_") or segment in live:
+                continue
+            path = os.path.join(self.snapshot_dir, name)
+            try:
+                since = retired[segment] if segment in retired else os.path.getmtime(path)
+                if since < cutoff:
+                    _remove_quietly(path)
+            except OSError:
+                pass
+
+    def add(self, vector: np.ndarray, metadata: dict, text: str = None):
         """Add a single vector (not used now, kept for compatibility)."""
         if vector.ndim == 1:
             vector = np.expand_dims(vector, axis=0)
 
-        vector = vector.astype("float32")
-        self.index.add(vector)
-        self.meta.append(metadata)
-        self.save()
+        self.add_batch(vector, [metadata], texts=[text] if text is not None else None)
+
+    def _append_pending(self, vectors: np.ndarray):
+        needed = self._pending_rows + len(vectors)
+        if needed > len(self._pending):
+            grown = np.empty((max(needed, 2 * len(self._pending), PENDING_MIN_ROWS), self.dim), dtype="float32")
+            grown[:self._pending_rows] = self._pending[:self._pending_rows]
+            self._pending = grown
+        self._pending[self._pending_rows:needed] = vectors
+        self._pending_rows = needed
+
+    def pending_bytes(self) -> int:
+        """Memory held by vectors (+ chunk texts) added with save=False and not yet saved."""
+        return self._pending_rows * self.dim * 4 + self._pending_text_bytes
 
-    def add_batch(self, vectors, metadata_list):
-        """Add multiple vectors at once — Windows-safe."""
+    def add_batch(self, vectors, metadata_list, save: bool = True, texts=None):
+        """
+        Add multiple vectors at once — Windows-safe.
+        `texts` = full chunk texts for the text store (default: the snippets).
+        """
         vectors = np.asarray(vectors, dtype="float32")
-        self.index.add(vectors)
+        if vectors.ndim == 1:
+            vectors = np.expand_dims(vectors, axis=0)
+        if texts is None:
+            texts = [m.get("snippet", "") for m in metadata_list]
 
-        for m in metadata_list:
-            self.meta.append(m)
+        with self._write_lock:
+            self._append_pending(vectors)
+            self._pending_meta.extend(metadata_list)
+            self._pending_texts.extend(texts)
+            self._pending_text_bytes += sum(len(t) for t in texts)
 
-        self.save()
+        if save:
+            self.save()
+
+    def search(self, vector: np.ndarray, k: int = 5, min_score: float = None, text_window: int = None):
+        """
+        Search closest K vectors and return their metadata.
+        Each result carries a "score" (cosine similarity, higher = better);
+        hits below `min_score` are dropped.
+
+        text_window=None → metadata only; 0 → also the full chunk "text";
+        n → "text" spans up to n neighbouring chunks of the same file per side
+        (and "chunk_text" is the chunk alone).
+        """
+        return self.search_batch(vector, k=k, min_score=min_score, text_window=text_window)[0]
+
+    def search_batch(self, vectors: np.ndarray, k: int = 5, min_score: float = None,
+                     text_window: int = None):
+        """Multi-row search → one result list per query row (see search())."""
+        snap = self._snapshot  # pin one version for this query
+
+        vectors = np.asarray(vectors, dtype="float32")
+        if vectors.ndim == 1:
+            vectors = np.expand_dims(vectors, axis=0)
+        if snap.metric == "ip":
+            vectors = normalize_batch(vectors)
+
+        with stage_timer("search"):
+            coarse = COARSE_TOP_FILES > 0 and snap.index.ntotal >= COARSE_MIN_VECTORS
+            if coarse:
+                distances, ids = self._coarse_to_fine(snap, vectors, k)
+            else:
+                distances, ids = snap.index.search(vectors, k)
+
+        with stage_timer("rerank"):
+            scores, keep = rank_hits(distances, ids, snap.metric, min_score)
+
+            n_meta = len(snap.meta)
+            all_results = []
+            for row in range(len(ids)):
+                row_keep = keep[row]
+                results = []
+                for idx, score in zip(ids[row][row_keep], scores[row][row_keep]):
+                    if idx < n_meta:
+                        entry = dict(snap.meta[int(idx)])
+                        entry["score"] = float(score)
+                        if text_window is not None:
+                            entry["text"] = snap.context(int(idx), text_window)
+                        if text_window:
+                            entry["chunk_text"] = snap.texts[int(idx)]
+                        results.append(entry)
+                all_results.append(results)
+
+        return all_results
+
+
+    def _coarse_to_fine(self, snap: Snapshot, vectors: np.ndarray, k: int):
+        """
+        Two-stage search (see file_index.py): pick the best files by centroid,
+        then score only their chunks. Same (distances, ids) layout as
+        index.search(); a row whose files cover too much of the index is
+        searched in full instead.
+        """
+        ip = snap.metric == "ip"
+        distances = np.full((len(vectors), k), -np.inf if ip else np.inf, dtype="float32")
+        ids = np.full((len(vectors), k), -1, dtype=np.int64)
+
+        for row, q in enumerate(vectors):
+            with stage_timer("coarse"):
+                files = snap.file_index.top_files(q, COARSE_TOP_FILES)
+            ranges = snap.file_index.id_ranges(f for f, _ in files)
+
+            if not ranges or sum(c for _, c in ranges) > COARSE_MAX_FRACTION * snap.index.ntotal:
+                row_distances, row_ids = snap.index.search(q[None, :], k)
+                distances[row], ids[row] = row_distances[0], row_ids[0]
+                continue
+
+            candidates = np.concatenate([np.arange(s, s + c) for s, c in ranges])
+            stored = np.vstack([snap.vectors(s, c) for s, c in ranges])
+            if ip:
+                scores = stored @ q
+                order = np.argsort(-scores)[:k]
+            else:
+                scores = ((stored - q) ** 2).sum(axis=1)
+                order = np.argsort(scores)[:k]
+            distances[row, :len(order)] = scores[order]
+            ids[row, :len(order)] = candidates[order]
+
+        return distances, ids
+
+    def search_files(self, vector: np.ndarray, k: int = 10):
+        """Files most about the query, from the file centroids only (no chunk search)."""
+        snap = self._snapshot
+        vector = np.asarray(vector, dtype="float32").reshape(-1)
+        with stage_timer("search_files"):
+            files = snap.file_index.top_files(vector, k)
+        return [{
+            "file_id": file_id,
+            "file_name": snap.file_index.file_name(file_id),
+            "drive_link": f"https://drive.google.com/file/d/{file_id}",
+            "score": score,
+        } for file_id, score in files]
+
+
+# -------------------------------------------------------------------------
+# Process-wide stores (created on first use, not at import), one per
+# partition; least recently used partitions are unloaded (LRU)
+# -------------------------------------------------------------------------
+_stores = OrderedDict()          # (partition, read_only) → FaissStore, oldest first
+_stores_lock = threading.Lock()
+
+
+def get_faiss_store(read_only: bool = True, partition: str = None) -> FaissStore:
+    """
+    Shared FaissStore for this process.
+    read_only=True  → query side (mmap + snapshot watcher)
+    read_only=False → sync side (writer)
+    `partition` selects the index partition (None → default).
+    """
+    partition = normalize_partition(partition)
+    key = (partition, read_only)
+
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is not None:
+            _stores.move_to_end(key)
+            return store
+
+        store = FaissStore(read_only=read_only, data_dir=partition_dir(partition))
+        _stores[key] = store
+        _evict_partitions()
+    return store
 
-    def search(self, vector: np.ndarray, k: int = 5):
-        """Search closest K vectors and return their metadata."""
-        if vector.ndim == 1:
-            vector = np.expand_dims(vector, axis=0)
 
-        vector = vector.astype("float32")
-        distances, ids = self.index.search(vector, k)
+def _evict_partitions():
+    """Unload the least recently used stores beyond MAX_LOADED_PARTITIONS (never a busy writer)."""
+    for key in list(_stores):
+        if len(_stores) <= MAX_LOADED_PARTITIONS:
+            return
+        store = _stores[key]
+        if not store.read_only and (store._pending_rows or store._staged):
+            continue
+        del _stores[key]
+        store.close()            # stop the watcher; in-flight queries keep their snapshot
+        logger.info("unloaded partition=%s read_only=%s", key[0], key[1])
 
-        results = []
-        for idx in ids[0]:
-            if 0 <= idx < len(self.meta):
-                results.append(self.meta[idx])
 
-        return results
+def is_faiss_store_loaded(read_only: bool = True, partition: str = None) -> bool:
+    return (normalize_partition(partition), read_only) in _stores
@@ -0,0 +1,273 @@
+"""
+Local stand-in for the Google Drive v3 client (benchmarks / offline runs).
+
+Serves the files of a local directory through the same call shapes
+sync_service uses on the real client:
+
+    service.files().list(q=..., fields=..., pageSize=..., pageToken=...).execute()
+    service.files().get_media(fileId=...)      → works with MediaIoBaseDownload
+    service.changes().getStartPageToken().execute()
+    service.changes().list(pageToken=...).execute()
+    service.permissions().list(fileId=...).execute()
+    service.new_batch_http_request(callback=...)   → .add(request) / .execute()
+
+Optional per-request latency simulates the network round trip; max_qps
+makes it answer 429 rateLimitExceeded above that many requests per second
+(batch sub-requests count singly), like the real quota. shared_drive_id
+lists files as shared-drive items (no inline permissions).
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import mimetypes
+import threading
+from collections import deque
+
+from googleapiclient.errors import HttpError
+
+MIME_BY_EXT = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".txt": "text/plain",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".mp4": "video/mp4",
+}
+
+
+class _Request:
+    """Mimics googleapiclient.http.HttpRequest: .execute() plus uri/headers/http."""
+
+    def __init__(self, drive, result=None, uri=None):
+        self._drive = drive
+        self._result = result
+        self.uri = uri
+        self.headers = {}
+        self.http = drive.http
+
+    def execute(self, num_retries=0):
+        self._drive._latency()
+        return self._run()
+
+    def _run(self):
+        if self._drive._throttled():
+            raise HttpError(_Response(429, {}), _RATE_LIMITED, uri=self.uri)
+        return self._result() if callable(self._result) else self._result
+
+
+_RATE_LIMITED = json.dumps({"error": {"code": 429, "errors": [{"reason": "rateLimitExceeded"}]}}).encode()
+
+
+class _Response(dict):
+    """Mimics httplib2.Response (a dict of headers with .status)."""
+
+    def __init__(self, status, headers):
+        super().__init__(headers)
+        self.status = status
+        self.reason = "OK" if status < 400 else "Error"
+
+
+class _FakeHttp:
+    """Answers the ranged GETs MediaIoBaseDownload issues."""
+
+    def __init__(self, drive):
+        self.drive = drive
+
+    def request(self, uri, method="GET", headers=None, **_):
+        self.drive._latency()
+        if self.drive._throttled():
+            return _Response(429, {}), _RATE_LIMITED
+        file_id = uri.rsplit("/", 1)[-1]
+        entry = self.drive.files_by_id.get(file_id)
+        if entry is None:
+            return _Response(404, {}), b"not found"
+
+        with open(entry["path"], "rb") as f:
+            data = f.read()
+
+        total = len(data)
+        match = re.match(r"bytes=(\d+)-(\d+)", (headers or {}).get("range", ""))
+        start, end = (int(match.group(1)), int(match.group(2))) if match else (0, total - 1)
+        end = min(end, total - 1)
+        body = data[start:end + 1]
+
+        self.drive.bytes_served += len(body)
+        return _Response(206, {"content-range": f"bytes {start}-{end}/{total}"}), body
+
+
+class _Files:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def list(self, q=None, fields=None, pageSize=100, pageToken=None, **_):
+        wanted = set(re.findall(r"mimeType='([^']+)'", q or ""))
+        entries = [e for e in self.drive.files_by_id.values()
+                   if not wanted or e["mimeType"] in wanted]
+
+        start = int(pageToken or 0)
+        page = entries[start:start + pageSize]
+        result = {"files": [self.drive._public(e) for e in page]}
+        if start + pageSize < len(entries):
+            result["nextPageToken"] = str(start + pageSize)
+        return _Request(self.drive, result)
+
+    def get(self, fileId, fields=None, **_):
+        return _Request(self.drive, lambda: self.drive._public(self.drive.files_by_id[fileId]))
+
+    def get_media(self, fileId, **_):
+        return _Request(self.drive, uri=f"https://fake-drive.local/download/{fileId}")
+
+
+class _Permissions:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def list(self, fileId, fields=None, **_):
+        return _Request(self.drive, lambda: {"permissions": self.drive.permissions_of(fileId)})
+
+
+class _Batch:
+    """Mimics BatchHttpRequest: one round trip, callback per sub-request."""
+
+    def __init__(self, drive, callback):
+        self.drive = drive
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id or str(len(self.requests)), request))
+
+    def execute(self):
+        self.drive._latency()
+        self.drive.batches += 1
+        for request_id, request in self.requests:
+            try:
+                response, error = request._run(), None
+            except HttpError as e:
+                response, error = None, e
+            self.callback(request_id, response, error)
+
+
+class _Changes:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def getStartPageToken(self, **_):
+        return _Request(self.drive, lambda: {"startPageToken": str(len(self.drive.change_log))})
+
+    def list(self, pageToken, pageSize=100, **_):
+        def run():
+            start = int(pageToken)
+            page = self.drive.change_log[start:start + pageSize]
+            result = {"changes": page}
+            if start + pageSize < len(self.drive.change_log):
+                result["nextPageToken"] = str(start + pageSize)
+            else:
+                result["newStartPageToken"] = str(len(self.drive.change_log))
+            return result
+        return _Request(self.drive, run)
+
+
+class FakeDriveService:
+    """Drive v3 service backed by the files of `root_dir`."""
+
+    def __init__(self, root_dir: str, latency_ms: float = 0.0, max_qps: float = None,
+                 shared_drive_id: str = None):
+        self.root_dir = root_dir
+        self.latency_ms = latency_ms
+        self.max_qps = max_qps
+        self.shared_drive_id = shared_drive_id
+        self.http = _FakeHttp(self)
+        self.files_by_id = {}
+        self.change_log = []
+        self.requests = 0
+        self.batches = 0
+        self.rate_limited = 0
+        self.bytes_served = 0
+        self._recent = deque()           # request times of the last second (max_qps)
+        self._quota_lock = threading.Lock()
+
+        for name in sorted(os.listdir(root_dir)):
+            path = os.path.join(root_dir, name)
+            if os.path.isfile(path):
+                self.add_file(path, log_change=False)
+
+    # ------------ Drive API surface ------------
+    def files(self):
+        return _Files(self)
+
+    def changes(self):
+        return _Changes(self)
+
+    def permissions(self):
+        return _Permissions(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _Batch(self, callback)
+
+    def permissions_of(self, file_id: str) -> list:
+        return [{"type": "user", "role": "owner", "emailAddress": "owner@example.com"}]
+
+    # ------------ corpus mutation (incremental scenarios) ------------
+    def add_file(self, path: str, log_change: bool = True) -> str:
+        file_id = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+        ext = os.path.splitext(path)[1].lower()
+        self.files_by_id[file_id] = {
+            "id": file_id,
+            "path": path,
+            "name": os.path.basename(path),
+            "mimeType": MIME_BY_EXT.get(ext) or mimetypes.guess_type(path)[0] or "application/octet-stream",
+        }
+        if log_change:
+            self._log(file_id)
+        return file_id
+
+    def remove_file(self, file_id: str):
+        self.files_by_id.pop(file_id, None)
+        self.change_log.append({"fileId": file_id, "removed": True})
+
+    # ------------ internals ------------
+    def _public(self, entry: dict) -> dict:
+        stat = os.stat(entry["path"])
+        public = {
+            "id": entry["id"],
+            "name": entry["name"],
+            "mimeType": entry["mimeType"],
+            "size": str(stat.st_size),
+            "modifiedTime": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(stat.st_mtime)),
+        }
+        if self.shared_drive_id:
+            public["driveId"] = self.shared_drive_id
+        else:
+            public["permissions"] = self.permissions_of(entry["id"])
+        return public
+
+    def _log(self, file_id: str):
+        self.change_log.append({
+            "fileId": file_id,
+            "removed": False,
+            "file": self._public(self.files_by_id[file_id]),
+        })
+
+    def _latency(self):
+        self.requests += 1
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def _throttled(self) -> bool:
+        """Count one quota unit; True if it is over max_qps (→ 429)."""
+        if not self.max_qps:
+            return False
+        now = time.monotonic()
+        with self._quota_lock:
+            while self._recent and self._recent[0] < now - 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.max_qps:
+                self.rate_limited += 1
+                return True
+            self._recent.append(now)
+            return False
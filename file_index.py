@@ -0,0 +1,137 @@
+"""
+File-level Centroid Index (coarse-to-fine retrieval)
+----------------------------------------------------
+
+Every snapshot segment also stores one centroid per *file run* — a block
+of up to CENTROID_MAX_CHUNKS consecutive vectors of the same Drive file
+(the mean of its L2-normalized chunk vectors, normalized again):
+
+    snapshots/seg_000042.files.npy    centroids, float32 (n_runs, dim)
+    snapshots/seg_000042.files.json   [[file_id, file_name, first_id, count], ...]
+
+Runs are computed when the segment is written, so the file index grows
+with every sync like the chunk index does. Long files get several
+centroids, short files one.
+
+Query (FaissStore.search_batch, once the index has COARSE_MIN_VECTORS):
+    1. coarse → score every centroid, keep the COARSE_TOP_FILES best files
+    2. fine   → exact scores for only those files' chunk id ranges
+
+This is approximate: a chunk whose file centroid ranks low is not seen.
+COARSE_TOP_FILES=0 turns it off. search_files() answers "which files are
+about X" from the centroids alone.
+"""
+
+import os
+
+import numpy as np
+
+from backend.app.utils.jsonio import dumps, loads
+
+CENTROID_MAX_CHUNKS = int(os.environ.get("CENTROID_MAX_CHUNKS", "64"))
+COARSE_TOP_FILES = int(os.environ.get("COARSE_TOP_FILES", "32"))
+COARSE_MIN_VECTORS = int(os.environ.get("COARSE_MIN_VECTORS", "50000"))
+
+# Fine stage gathers candidate rows; above this share of the index a full search is cheaper
+COARSE_MAX_FRACTION = 0.5
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def file_runs(metas, vectors: np.ndarray, max_chunks: int = CENTROID_MAX_CHUNKS):
+    """Split a segment into runs of consecutive same-file vectors → (runs, centroids)."""
+    runs, centroids = [], []
+    start = 0
+    n = len(metas)
+    while start < n:
+        file_id = metas[start].get("file_id")
+        end = start + 1
+        while end < n and end - start < max_chunks and metas[end].get("file_id") == file_id:
+            end += 1
+        runs.append([file_id, metas[start].get("file_name"), start, end - start])
+        centroids.append(_unit(vectors[start:end]).mean(axis=0))
+        start = end
+
+    dim = vectors.shape[1] if vectors.ndim == 2 else 0
+    matrix = _unit(np.asarray(centroids, dtype="float32")) if centroids else np.empty((0, dim), dtype="float32")
+    return runs, matrix
+
+
+def write_file_runs(base: str, runs, centroids: np.ndarray):
+    np.save(base + ".files.npy", centroids)
+    with open(base + ".files.json", "wb") as f:
+        f.write(dumps(runs))
+
+
+def read_file_runs(base: str):
+    """(runs, centroids) of a segment, or None if it was written without them."""
+    try:
+        centroids = np.load(base + ".files.npy")
+        with open(base + ".files.json", "rb") as f:
+            data = f.read()
+        runs = loads(data)
+    except (OSError, ValueError):
+        return None
+    return runs, centroids
+
+
+class FileIndex:
+    """Centroids of every run in a snapshot, with global chunk id ranges."""
+
+    def __init__(self, parts, dim: int):
+        """parts = [(runs, centroids, first global id of the segment), ...]"""
+        self.file_ids, self.file_names, self.starts, self.counts = [], [], [], []
+        matrices = []
+        for runs, centroids, offset in parts:
+            for file_id, file_name, start, count in runs:
+                self.file_ids.append(file_id)
+                self.file_names.append(file_name)
+                self.starts.append(offset + start)
+                self.counts.append(count)
+            matrices.append(centroids)
+
+        self.centroids = np.vstack(matrices) if matrices else np.empty((0, dim), dtype="float32")
+        self.starts = np.asarray(self.starts, dtype=np.int64)
+        self.counts = np.asarray(self.counts, dtype=np.int64)
+
+        # run numbers of each file, for the fine stage
+        self._runs_of = {}
+        for run, file_id in enumerate(self.file_ids):
+            self._runs_of.setdefault(file_id, []).append(run)
+
+    def __len__(self):
+        return len(self.file_ids)
+
+    def top_files(self, query: np.ndarray, m: int):
+        """[(file_id, score), ...] of the m files whose best centroid is closest to `query`."""
+        if not len(self.file_ids):
+            return []
+        scores = self.centroids @ _unit(query[None, :])[0]
+
+        # A file can own several runs → look at a few more runs than files needed
+        n = min(len(scores), 4 * m)
+        while True:
+            candidates = np.argpartition(-scores, n - 1)[:n]
+            best = {}
+            for run in candidates[np.argsort(-scores[candidates])]:
+                file_id = self.file_ids[run]
+                if file_id not in best:
+                    best[file_id] = float(scores[run])
+                    if len(best) == m:
+                        return list(best.items())
+            if n == len(scores):
+                return list(best.items())
+            n = min(len(scores), 4 * n)
+
+    def id_ranges(self, file_ids):
+        """Global (start, count) chunk ranges of the given files."""
+        return [(int(self.starts[r]), int(self.counts[r]))
+                for file_id in file_ids for r in self._runs_of.get(file_id, ())]
+
+    def file_name(self, file_id):
+        runs = self._runs_of.get(file_id)
+        return self.file_names[runs[0]] if runs else None
@@ -0,0 +1,84 @@
+"""
+Caller identity, verified server-side.
+
+The add-on sends `Authorization: Bearer <ScriptApp.getIdentityToken()>`,
+a Google-signed OIDC ID token for the user running it. verified_user()
+checks its signature, expiry and audience (IDENTITY_AUDIENCE = the OAuth
+client id of the add-on's Cloud project) and returns its verified email.
+That email, not a client-chosen header, is who the query runs as.
+
+    IDENTITY_AUDIENCE unset  → bearer tokens are rejected; only the
+                               "default" partition can be used
+    TRUST_USER_HEADER=1      → no token: `X-Drive-User` is taken as is
+                               (only behind a proxy that authenticates
+                               users and sets that header itself)
+
+Verified tokens are cached until they expire, so repeated calls with the
+same token do not verify the signature again.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+IDENTITY_AUDIENCE = os.environ.get("IDENTITY_AUDIENCE") or None
+TRUST_USER_HEADER = os.environ.get("TRUST_USER_HEADER", "0") == "1"
+TOKEN_CACHE_SIZE = 1024
+
+USER_HEADER = "x-drive-user"
+
+_cache = OrderedDict()            # token → (email, expires_at)
+_cache_lock = threading.Lock()
+_transport = None
+
+
+class Unauthenticated(Exception):
+    """No valid identity where one is required (→ 401)."""
+
+
+def _verify(token: str):
+    """(email, expires_at) of a valid ID token; Unauthenticated otherwise."""
+    global _transport
+    from google.oauth2 import id_token
+    from google.auth.exceptions import GoogleAuthError
+    from google.auth.transport import requests as google_requests
+
+    if _transport is None:
+        _transport = google_requests.Request()       # reuses one HTTP session for the Google certs
+    try:
+        claims = id_token.verify_oauth2_token(token, _transport, audience=IDENTITY_AUDIENCE)
+    except (ValueError, GoogleAuthError) as e:          # bad token, or Google certs unreachable
+        raise Unauthenticated(f"Invalid identity token: {e}")
+
+    email = (claims.get("email") or "").strip().lower()
+    if not email or not claims.get("email_verified"):
+        raise Unauthenticated("Identity token has no verified email")
+    return email, float(claims.get("exp", 0))
+
+
+def verified_user(headers):
+    """Email of the caller from request headers, or None if anonymous."""
+    auth = headers.get("authorization") or ""
+    if not auth.lower().startswith("bearer "):
+        if TRUST_USER_HEADER:
+            return (headers.get(USER_HEADER) or "").strip().lower() or None
+        return None
+
+    if IDENTITY_AUDIENCE is None:
+        raise Unauthenticated("Identity tokens are not accepted: IDENTITY_AUDIENCE is not configured")
+
+    token = auth[7:].strip()
+    now = time.time()
+    with _cache_lock:
+        cached = _cache.get(token)
+        if cached is not None and cached[1] > now:
+            _cache.move_to_end(token)
+            return cached[0]
+
+    email, expires_at = _verify(token)
+    with _cache_lock:
+        _cache[token] = (email, expires_at)
+        while len(_cache) > TOKEN_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return email
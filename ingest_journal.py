@@ -0,0 +1,495 @@
+"""
+Ingest Journal (SQLite)
+-----------------------
+
+Replaces processed_files.json. One row per Drive file:
+
+    file_id | file_name | state | raw_path | size | chunks | updated_at
+
+state moves  downloaded → extracted → embedded → committed.
+
+A file only counts as done once it is `committed`, and that happens in
+the same step that makes its vectors visible:
+
+1. The chunks are embedded into the FAISS writer (staged, unpublished)
+2. faiss_store.save(files=[file_id, ...]) atomically replaces manifest.json;
+   the manifest lists the file ids that publish completed (sync publishes
+   several files at once)
+3. The journal row is set to `committed`
+
+A crash between 2 and 3 is repaired by reconcile(): ids listed in the
+manifest are marked committed. A crash before 2 leaves only unpublished
+segment files (garbage-collected later), so the file is simply ingested
+again — no duplicate vectors. Spilled downloads whose raw file is still on
+disk are reused instead of downloaded again.
+
+SQLite runs in WAL mode; every state change is its own transaction.
+Most run with synchronous=NORMAL, which can lose the last transactions on
+power loss. Marking files `committed` runs with synchronous=FULL, which
+also makes every earlier transaction durable. Otherwise files committed
+before the latest manifest could lose their mark. reconcile() does not
+repair those, so they would be re-embedded as duplicate vectors.
+
+The same database holds the chunk dedup tables (see processing/dedup.py):
+    chunks   → one row per embedded chunk: hash, SimHash bands, owning file
+    postings → (chunk_hash, file_id) for every file containing the chunk
+Rows of a file are written with its `embedded` state and ignored until
+the file is committed.
+
+`files.acl` holds who may see the file (from the Drive permissions
+listed at every sync) as a JSON list of principals: "anyone",
+"domain:<domain>", "user:<email>", "group:<email>". NULL = unknown.
+
+A bulk build that replaces the whole index (bulk_indexer.py --replace)
+records into a staging journal next to this one (begin_replace()) and
+swaps it in with apply_replace() only after its publish succeeded, so a
+failed build leaves the journal matching the still-published index. A
+crash between that publish and the swap is finished by reconcile().
+
+There is one journal per index partition (core/partitions.py).
+"""
+
+import os
+import json
+import time
+import sqlite3
+import pathlib
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+
+from backend.app.core.partitions import (
+    partition_path, normalize_partition, DEFAULT_PARTITION, MAX_LOADED_PARTITIONS,
+)
+from backend.app.processing.dedup import bands
+from backend.app.utils.logger import get_logger
+
+logger = get_logger("ingest_journal")
+
+JOURNAL_PATH = "backend/app/data/ingest_journal.db"
+LEGACY_PROCESSED_FILE = "backend/app/data/processed_files.json"
+REPLACE_SUFFIX = ".replace"       # staging journal of a whole-index bulk build
+
+DOWNLOADED, EXTRACTED, EMBEDDED, COMMITTED = "downloaded", "extracted", "embedded", "committed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id     TEXT PRIMARY KEY,
+    file_name   TEXT NOT NULL,
+    state       TEXT NOT NULL,
+    raw_path    TEXT,
+    size        INTEGER,
+    chunks      INTEGER,
+    updated_at  REAL NOT NULL,
+    acl         TEXT
+);
+CREATE INDEX IF NOT EXISTS files_state ON files(state);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    hash        TEXT PRIMARY KEY,
+    simhash     INTEGER NOT NULL,
+    b0 INTEGER, b1 INTEGER, b2 INTEGER, b3 INTEGER,
+    file_id     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_b0 ON chunks(b0);
+CREATE INDEX IF NOT EXISTS chunks_b1 ON chunks(b1);
+CREATE INDEX IF NOT EXISTS chunks_b2 ON chunks(b2);
+CREATE INDEX IF NOT EXISTS chunks_b3 ON chunks(b3);
+CREATE INDEX IF NOT EXISTS chunks_file ON chunks(file_id);
+
+CREATE TABLE IF NOT EXISTS postings (
+    chunk_hash  TEXT NOT NULL,
+    file_id     TEXT NOT NULL,
+    PRIMARY KEY (chunk_hash, file_id)
+);
+CREATE INDEX IF NOT EXISTS postings_file ON postings(file_id);
+"""
+
+_UPSERT_FILE = """
+INSERT INTO files (file_id, file_name, state, raw_path, size, chunks, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(file_id) DO UPDATE SET
+    file_name  = excluded.file_name,
+    state      = excluded.state,
+    raw_path   = COALESCE(excluded.raw_path, files.raw_path),
+    size       = COALESCE(excluded.size, files.size),
+    chunks     = COALESCE(excluded.chunks, files.chunks),
+    updated_at = excluded.updated_at
+"""
+
+
+def _remove_db(path: str):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _signed64(value: int) -> int:
+    """SQLite INTEGER is signed 64-bit."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+class IngestJournal:
+    """Per-file ingest state, durable across crashes."""
+
+    def __init__(self, path: str = JOURNAL_PATH, read_only: bool = False):
+        """
+        read_only=True → lookups only (query side): opened with mode=ro, no
+        schema / migration work that could race the sync writer for the lock.
+        """
+        self.path = path
+        self.read_only = read_only
+        self._lock = threading.Lock()
+
+        if read_only:
+            uri = pathlib.Path(path).resolve().as_uri() + "?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(files)")}
+            self._has_acl = "acl" in columns        # migrated by the next sync
+            return
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")     # durable at WAL checkpoints; no torn writes
+        self._conn.executescript(_SCHEMA)
+
+        # Journals created before ACLs were tracked
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(files)")}
+        if "acl" not in columns:
+            self._conn.execute("ALTER TABLE files ADD COLUMN acl TEXT")
+        self._has_acl = True
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _durable(self):
+        """synchronous=FULL for the enclosed commit (caller holds self._lock)."""
+        self._conn.execute("PRAGMA synchronous=FULL")
+        try:
+            yield
+        finally:
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    # ------------ reads ------------
+    def get(self, file_id: str):
+        """Row as a dict, or None if the file was never seen."""
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT file_id, file_name, state, raw_path, size, chunks, updated_at "
+                "FROM files WHERE file_id = ?", (file_id,),
+            )
+            row = cur.fetchone()
+        if row is None:
+            return None
+        keys = ("file_id", "file_name", "state", "raw_path", "size", "chunks", "updated_at")
+        return dict(zip(keys, row))
+
+    def raw_files(self) -> dict:
+        """{raw_path: (file_id, file_name)} of downloads spilled to the raw dir."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT raw_path, file_id, file_name FROM files WHERE raw_path IS NOT NULL",
+            ).fetchall()
+        return {os.path.normpath(path): (fid, name) for path, fid, name in rows}
+
+    def is_committed(self, file_id: str) -> bool:
+        row = self.get(file_id)
+        return row is not None and row["state"] == COMMITTED
+
+    def count(self, state: str = COMMITTED) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files WHERE state = ?", (state,)).fetchone()[0]
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    # ------------ writes ------------
+    def mark(self, file_id: str, file_name: str, state: str, raw_path: str = None,
+             size: int = None, chunks: int = None):
+        """Record a state transition (one transaction). Unset fields keep their value."""
+        row = (file_id, file_name, state, raw_path, size, chunks, time.time())
+        with self._lock:
+            if state == COMMITTED:
+                with self._durable():
+                    self._conn.execute(_UPSERT_FILE, row)
+            else:
+                self._conn.execute(_UPSERT_FILE, row)
+
+    def mark_committed_many(self, entries):
+        """[(file_id, file_name), ...] → committed, in ONE transaction."""
+        now = time.time()
+        with self._lock, self._durable():
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    """
+                    INSERT INTO files (file_id, file_name, state, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(file_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at
+                    """,
+                    [(fid, name, COMMITTED, now) for fid, name in entries],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ------------ whole-index replace ------------
+    def begin_replace(self, base_version: int) -> "IngestJournal":
+        """
+        Empty staging journal for a build that will replace the whole index
+        published as `base_version`. Record the build into it, then
+        apply_replace() once the build is published (or discard_replace()).
+        """
+        path = self.path + REPLACE_SUFFIX
+        _remove_db(path)
+        staged = IngestJournal(path)
+        staged._conn.execute("CREATE TABLE replace_base (version INTEGER NOT NULL)")
+        staged._conn.execute("INSERT INTO replace_base VALUES (?)", (base_version,))
+        return staged
+
+    def apply_replace(self, staged: "IngestJournal"):
+        """
+        The staged build is published: in ONE transaction every file goes back
+        to `downloaded` (ACLs and spilled downloads are kept), the chunk rows +
+        postings become the staged ones and the staged files are committed.
+        Files the build did not cover are synced again.
+        """
+        staged.close()
+        with self._lock, self._durable():
+            self._conn.execute("ATTACH DATABASE ? AS staged", (staged.path,))
+            try:
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.execute("UPDATE files SET state = ?, chunks = NULL", (DOWNLOADED,))
+                    self._conn.execute("DELETE FROM chunks")
+                    self._conn.execute("DELETE FROM postings")
+                    self._conn.execute("INSERT INTO chunks SELECT hash, simhash, b0, b1, b2, b3, file_id FROM staged.chunks")
+                    self._conn.execute("INSERT INTO postings SELECT chunk_hash, file_id FROM staged.postings")
+                    self._conn.execute(
+                        """
+                        INSERT INTO files (file_id, file_name, state, chunks, updated_at)
+                        SELECT file_id, file_name, ?, chunks, ? FROM staged.files WHERE true
+                        ON CONFLICT(file_id) DO UPDATE SET
+                            file_name = excluded.file_name, state = excluded.state,
+                            chunks = excluded.chunks, updated_at = excluded.updated_at
+                        """,
+                        (COMMITTED, time.time()),
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            finally:
+                self._conn.execute("DETACH DATABASE staged")
+        _remove_db(staged.path)
+
+    def discard_replace(self, staged: "IngestJournal"):
+        """The staged build was not published; forget it."""
+        staged.close()
+        _remove_db(staged.path)
+
+    def _recover_replace(self, manifest):
+        """A staging journal left by a crash: apply it if its build got published, else drop it."""
+        path = self.path + REPLACE_SUFFIX
+        if not os.path.exists(path):
+            return
+        staged = IngestJournal(path)
+        try:
+            base = staged._conn.execute("SELECT version FROM replace_base").fetchone()
+            files = {row[0] for row in staged._conn.execute("SELECT file_id FROM files")}
+        except sqlite3.Error:
+            base, files = None, None
+        published = (base is not None and manifest and manifest["version"] > base[0]
+                     and set(manifest.get("committed_files") or ()) == files)
+        if published:
+            self.apply_replace(staged)
+            logger.info("applied staged whole-index build published as v%s", manifest["version"])
+        else:
+            self.discard_replace(staged)
+            logger.info("dropped unpublished staged whole-index build")
+
+    # ------------ chunk dedup ------------
+    def has_chunk(self, chunk_hash: str) -> bool:
+        """Is this exact chunk already indexed by a committed file?"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM chunks c JOIN files f ON f.file_id = c.file_id "
+                "WHERE c.hash = ? AND f.state = ?", (chunk_hash, COMMITTED),
+            ).fetchone()
+        return row is not None
+
+    def reset_chunks(self, file_id: str):
+        """Forget chunk rows of an earlier, uncommitted attempt at this file."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM chunks WHERE file_id = ?", (file_id,))
+                self._conn.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def record_chunks(self, file_id: str, file_name: str, new_chunks, postings, chunks: int):
+        """New chunk rows + postings + the `embedded` state, in ONE transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (hash, simhash, b0, b1, b2, b3, file_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(h, _signed64(sim), *bands(sim), file_id) for h, sim in new_chunks],
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO postings (chunk_hash, file_id) VALUES (?, ?)",
+                    [(h, file_id) for h in postings],
+                )
+                self._conn.execute(_UPSERT_FILE, (file_id, file_name, EMBEDDED, None, None, chunks, time.time()))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def sources_for(self, chunk_hashes) -> dict:
+        """{chunk_hash: [(file_id, file_name), ...]} over committed files."""
+        hashes = list(set(chunk_hashes))
+        if not hashes:
+            return {}
+        marks = ",".join("?" * len(hashes))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT p.chunk_hash, p.file_id, f.file_name FROM postings p "
+                f"JOIN files f ON f.file_id = p.file_id "
+                f"WHERE p.chunk_hash IN ({marks}) AND f.state = ? ORDER BY f.file_name",
+                (*hashes, COMMITTED),
+            ).fetchall()
+
+        out = {}
+        for chunk_hash, file_id, file_name in rows:
+            out.setdefault(chunk_hash, []).append((file_id, file_name))
+        return out
+
+    def simhashes_for(self, chunk_hashes) -> dict:
+        """{chunk_hash: simhash} of indexed chunks (query-time near-duplicate collapsing)."""
+        hashes = list(set(chunk_hashes))
+        if not hashes:
+            return {}
+        marks = ",".join("?" * len(hashes))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT hash, simhash FROM chunks WHERE hash IN ({marks})", hashes,
+            ).fetchall()
+        return {chunk_hash: stored & ((1 << 64) - 1) for chunk_hash, stored in rows}
+
+    # ------------ access control ------------
+    def update_acls(self, entries):
+        """[(file_id, [principal, ...] or None), ...] from the Drive listing, one transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "UPDATE files SET acl = ? WHERE file_id = ?",
+                    [(json.dumps(acl) if acl is not None else None, fid) for fid, acl in entries],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def acls_for(self, file_ids) -> dict:
+        """{file_id: [principal, ...] or None}"""
+        ids = list(set(file_ids))
+        if not ids:
+            return {}
+        if not self._has_acl:
+            return {fid: None for fid in ids}
+        marks = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT file_id, acl FROM files WHERE file_id IN ({marks})", ids,
+            ).fetchall()
+        return {fid: (json.loads(acl) if acl else None) for fid, acl in rows}
+
+    # ------------ recovery ------------
+    def reconcile(self, manifest) -> int:
+        """
+        Mark files the last published manifest completed as committed
+        (crash between publishing and journaling). Returns how many were fixed.
+        """
+        self._recover_replace(manifest)
+        if not manifest:
+            return 0
+
+        fixed = []
+        for file_id in manifest.get("committed_files", []):
+            row = self.get(file_id)
+            if row is not None and row["state"] != COMMITTED:
+                fixed.append((file_id, row["file_name"]))
+
+        if fixed:
+            self.mark_committed_many(fixed)
+            logger.info("reconciled files committed by manifest v%s: %d", manifest.get("version"), len(fixed))
+        return len(fixed)
+
+    def bootstrap(self, drive_files, published_meta=()):
+        """
+        First run on an existing install: seed `committed` rows from
+        processed_files.json (matched by name against the Drive listing)
+        and from the file ids already present in the published index.
+        A corrupt or missing JSON file no longer means a full re-index.
+        """
+        names = {}
+        legacy = LEGACY_PROCESSED_FILE if self.path == JOURNAL_PATH else None   # default partition only
+        if legacy and os.path.exists(legacy):
+            try:
+                with open(legacy, "r") as f:
+                    names = json.load(f)
+            except Exception:
+                logger.warning("processed_files.json unreadable, seeding from the index only")
+
+        indexed_ids = {m.get("file_id") for m in published_meta}
+        entries = [(f["id"], f["name"]) for f in drive_files
+                   if f["name"] in names or f["id"] in indexed_ids]
+        if entries:
+            self.mark_committed_many(entries)
+
+        if legacy and os.path.exists(legacy):
+            os.replace(legacy, legacy + ".migrated")
+        logger.info("journal bootstrapped committed=%d", len(entries))
+        return len(entries)
+
+
+def journal_path(partition: str = None) -> str:
+    if normalize_partition(partition) == DEFAULT_PARTITION:
+        return JOURNAL_PATH
+    return partition_path(partition, os.path.basename(JOURNAL_PATH))
+
+
+# -------------------------------------------------------------------------
+# Query side: one shared connection per partition for lookups (LRU)
+# -------------------------------------------------------------------------
+_readers = OrderedDict()
+_readers_lock = threading.Lock()
+
+
+def get_journal_reader(partition: str = None):
+    """Shared read-only IngestJournal for lookups; None until a sync has created it."""
+    partition = normalize_partition(partition)
+    with _readers_lock:
+        reader = _readers.get(partition)
+        if reader is not None:
+            _readers.move_to_end(partition)
+            return reader
+
+        path = journal_path(partition)
+        if not os.path.exists(path):
+            return None
+
+        reader = _readers[partition] = IngestJournal(path, read_only=True)
+        while len(_readers) > MAX_LOADED_PARTITIONS:
+            _readers.popitem(last=False)     # closed once in-flight lookups drop it
+        return reader
@@ -0,0 +1,29 @@
+"""
+JSON (de)serialization shared by the index files and the API responses.
+
+    data = dumps(obj)        # → UTF-8 bytes
+    obj = loads(data)        # bytes / str → object
+
+orjson when it is installed (several × faster on metadata and manifests),
+otherwise stdlib json with the same output shape: UTF-8, non-ASCII kept,
+no whitespace. Decode errors are ValueError either way.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:          # optional → stdlib json
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -7,6 +7,10 @@ It expects environment variables:
 - OPENAI_API_KEY (if using OpenAI)
 - GROQ_API_KEY   (if using Groq)
 - LLM_MODEL      -> optional model name for OpenAI (default "gpt-4o-mini")
+- OPENAI_API_URL -> optional endpoint override (e.g. mock_llm_server.py for benchmarks)
+
+`timeout` lets the caller cap a call by its remaining request budget
+(see core/admission.py); LLM_API_TIMEOUT is the upper bound.
 """
 
 from __future__ import annotations
@@ -15,6 +19,8 @@ import requests
 import logging
 from typing import Dict
 
+from backend.app.utils.metrics import stage_timer
+
 logger = logging.getLogger("llm_engine")
 logger.setLevel(logging.INFO)
 
@@ -25,16 +31,18 @@ GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")
 LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-4o-mini")
 TIMEOUT = int(os.environ.get("LLM_API_TIMEOUT", "30"))
 
-def run_llm(prompt: str) -> str:
+@stage_timer("llm")
+def run_llm(prompt: str, timeout: float = None) -> str:
     """
     Dispatch to chosen provider. Return the final generated text.
     Never raises raw provider exceptions — it returns an error message instead.
     """
+    timeout = TIMEOUT if timeout is None else min(timeout, TIMEOUT)
     try:
         if LLM_PROVIDER == "openai":
-            return _run_openai(prompt)
+            return _run_openai(prompt, timeout)
         elif LLM_PROVIDER == "groq":
-            return _run_groq(prompt)
+            return _run_groq(prompt, timeout)
         else:
             return f"Error: Unsupported LLM_PROVIDER '{LLM_PROVIDER}'."
     except Exception as e:
@@ -44,11 +52,11 @@ def run_llm(prompt: str) -> str:
 # ----------------------------
 # OpenAI call (chat completion)
 # ----------------------------
-def _run_openai(prompt: str) -> str:
+def _run_openai(prompt: str, timeout: float = TIMEOUT) -> str:
     if not OPENAI_API_KEY:
         return "OpenAI API key not configured (OPENAI_API_KEY)."
 
-    url = "https://api.openai.com/v1/chat/completions"
+    url = os.environ.get("OPENAI_API_URL", "https://api.openai.com/v1/chat/completions")
     payload = {
         "model": os.environ.get("LLM_MODEL", LLM_MODEL),
         "messages": [
@@ -63,7 +71,7 @@ def _run_openai(prompt: str) -> str:
         "Content-Type": "application/json"
     }
 
-    resp = requests.post(url, json=payload, headers=headers, timeout=TIMEOUT)
+    resp = requests.post(url, json=payload, headers=headers, timeout=timeout)
     resp.raise_for_status()
     data = resp.json()
     # Defensive parsing: handle different response shapes
@@ -77,7 +85,7 @@ def _run_openai(prompt: str) -> str:
 # ----------------------------
 # Groq call (example)
 # ----------------------------
-def _run_groq(prompt: str) -> str:
+def _run_groq(prompt: str, timeout: float = TIMEOUT) -> str:
     if not GROQ_API_KEY:
         return "Groq API key not configured (GROQ_API_KEY)."
 
@@ -97,7 +105,7 @@ def _run_groq(prompt: str) -> str:
         "Content-Type": "application/json"
     }
 
-    resp = requests.post(url, json=payload, headers=headers, timeout=TIMEOUT)
+    resp = requests.post(url, json=payload, headers=headers, timeout=timeout)
     resp.raise_for_status()
     data = resp.json()
     try:
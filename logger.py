@@ -3,10 +3,15 @@ import logging
 def get_logger(name: str):
     """
     Creates a formatted logger instance for consistent debug/info output.
+    Safe to call many times: the handler is only attached once per name.
     """
 
     logger = logging.getLogger(name)
+    if logger.handlers:                 # already configured → reuse it
+        return logger
+
     logger.setLevel(logging.INFO)
+    logger.propagate = False            # avoid a second copy via the root logger
 
     # Formatter for readable log output
     formatter = logging.Formatter(
@@ -0,0 +1,206 @@
+"""
+Lightweight instrumentation: counters, histograms, stage timers, trace spans.
+
+    from backend.app.utils.metrics import stage_timer, FILES_TOTAL
+
+    with stage_timer("embed"):               # → drive_agent_stage_seconds{stage="embed"}
+        vectors = embedder.embed_batch(chunks)
+
+    @stage_timer("llm")                      # also works as a decorator
+    def run_llm(prompt): ...
+
+    FILES_TOTAL.inc(status="indexed")
+
+GET /metrics renders everything in the Prometheus text format.
+
+Per-request traces: begin_trace() (done by the query route when the client
+sends `X-Trace: 1`) makes every stage_timer in that request also record a
+span; the spans come back as a Server-Timing header.
+
+Everything is in-process and per worker; no external dependency. Timers
+wrap whole stages (one file, one batch, one query) — never per-chunk
+loops — so the cost is one perf_counter pair + one lock per stage.
+"""
+
+import time
+import bisect
+import threading
+import contextvars
+
+from backend.app.utils.timers import Timer
+
+# Seconds; spans sub-millisecond FAISS searches up to multi-minute extractions
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: dict = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, v in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {v}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}            # labels → [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 3)
+            series[slot] += 1                      # non-cumulative; summed on render
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            running = 0
+            for bound, n in zip(self.buckets, series):
+                running += n
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': bound})} {running}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get_or_create(Counter, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# -------------------------------------------------------------------------
+# Metrics used across the backend
+# -------------------------------------------------------------------------
+STAGE_SECONDS = REGISTRY.histogram(
+    "drive_agent_stage_seconds",
+    "Time per pipeline stage (download, extract, chunk, embed, index_add, search, rerank, llm, ...)",
+)
+BYTES_TOTAL = REGISTRY.counter("drive_agent_bytes_downloaded_total", "Bytes downloaded from Drive")
+FILES_TOTAL = REGISTRY.counter("drive_agent_files_total", "Files seen by sync, by status")
+CHUNKS_TOTAL = REGISTRY.counter("drive_agent_chunks_indexed_total", "Chunks embedded and indexed")
+DEDUP_TOTAL = REGISTRY.counter("drive_agent_chunks_deduplicated_total", "Chunks skipped as duplicates, by kind")
+QUERIES_TOTAL = REGISTRY.counter("drive_agent_queries_total", "Queries served, by endpoint")
+CACHE_TOTAL = REGISTRY.counter("drive_agent_cache_requests_total", "Cache lookups, by cache and result")
+
+
+# -------------------------------------------------------------------------
+# Trace spans (per request, opt-in)
+# -------------------------------------------------------------------------
+_trace = contextvars.ContextVar("drive_agent_trace", default=None)
+
+
+def begin_trace():
+    """Start collecting spans for the current request / context."""
+    _trace.set([])
+
+
+def end_trace() -> list:
+    """Stop collecting and return [(name, start_offset_s, duration_s), ...]."""
+    spans = _trace.get()
+    _trace.set(None)
+    return spans or []
+
+
+def server_timing(spans: list) -> str:
+    """Format spans for a Server-Timing response header (durations in ms)."""
+    return ", ".join(f"{name};dur={dur * 1000:.2f}" for name, _, dur in spans)
+
+
+class stage_timer(Timer):
+    """
+    Timer that records into STAGE_SECONDS (and the current trace, if any).
+    Use as a context manager or as a decorator.
+    """
+
+    def __init__(self, stage: str, histogram: Histogram = STAGE_SECONDS):
+        super().__init__()
+        self.stage = stage
+        self.histogram = histogram
+        self.elapsed = None
+
+    def start(self):
+        self.start_time = time.perf_counter()
+
+    def stop(self, msg=None):
+        self.elapsed = time.perf_counter() - self.start_time
+        self.histogram.observe(self.elapsed, stage=self.stage)
+
+        spans = _trace.get()
+        if spans is not None:
+            spans.append((self.stage, self.start_time, self.elapsed))
+        return self.elapsed
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def __call__(self, func):
+        import functools
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(self.stage, self.histogram):
+                return func(*args, **kwargs)
+        return wrapper
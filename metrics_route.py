@@ -0,0 +1,14 @@
+# backend/app/routes/metrics_route.py
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from backend.app.utils.metrics import REGISTRY
+
+router = APIRouter()
+
+
+# Prometheus scrape endpoint → stage histograms + counters (per worker)
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,53 @@
+"""
+Convert the published FAISS index to another metric / index type in place.
+
+    python migrate_index.py                          # L2 → cosine (IndexFlatIP)
+    python migrate_index.py --index-type hnsw        # L2 → HNSW inner product
+    python migrate_index.py --batch-size 20000
+    python migrate_index.py --partition team-drive-id  # one partition's index
+
+Vectors are streamed segment by segment in fixed-size batches, normalized
+and re-added, then published as a new snapshot version. Running query
+workers pick it up through their snapshot watcher; no restart needed.
+
+Holds the sync lock for the duration, so no sync can publish in between.
+"""
+
+import sys
+import argparse
+
+from backend.app.drive.sync_jobs import FileLock, lock_path
+from backend.app.vectorstore.faiss_store import FaissStore
+from backend.app.core.partitions import partition_dir
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--metric", choices=["ip", "l2"], default="ip")
+    parser.add_argument("--index-type", choices=["flat", "hnsw", "ivf"], default="flat")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument("--partition", default=None)
+    args = parser.parse_args()
+
+    lock = FileLock(lock_path(args.partition))
+    if not lock.try_acquire():
+        print("❌ A sync is running — try again when it has finished.")
+        sys.exit(1)
+
+    try:
+        store = FaissStore(read_only=False, data_dir=partition_dir(args.partition))   # also migrates pre-snapshot files
+        manifest = store.read_manifest() or {}
+        current = (manifest.get("metric", "l2"), manifest.get("index_type", "flat"))
+
+        if current == (args.metric, args.index_type):
+            print(f"✔ Index is already {args.metric}/{args.index_type}, nothing to do.")
+            return
+
+        print(f"🔁 Converting {current[0]}/{current[1]} → {args.metric}/{args.index_type}")
+        store.rebuild(metric=args.metric, index_type=args.index_type, batch_size=args.batch_size)
+    finally:
+        lock.release()
+
+
+if __name__ == "__main__":
+    main()
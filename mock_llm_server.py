@@ -0,0 +1,78 @@
+"""
+Mock OpenAI-compatible chat completion server (benchmarks).
+
+    python mock_llm_server.py --port 8089 --latency-ms 300
+
+Point the backend at it with:
+    LLM_PROVIDER=openai OPENAI_API_KEY=mock OPENAI_API_URL=http://127.0.0.1:8089/v1/chat/completions
+
+Every request sleeps `latency_ms` (plus optional jitter) and returns a
+short canned answer, so query benchmarks measure our own overhead
+instead of a real provider.
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _make_handler(latency_ms: float, jitter_ms: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+
+            time.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000.0)
+
+            prompt = payload.get("messages", [{}])[-1].get("content", "")
+            body = json.dumps({
+                "id": "mock",
+                "object": "chat.completion",
+                "model": payload.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": f"Mock answer ({len(prompt)} prompt chars)."},
+                    "finish_reason": "stop",
+                }],
+            }).encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # keep benchmark output clean
+
+    return Handler
+
+
+def start_mock_llm(port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0):
+    """Start the server on a daemon thread. Returns (server, url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(latency_ms, jitter_ms))
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    return server, url
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    server, url = start_mock_llm(args.port, args.latency_ms, args.jitter_ms)
+    print(f"🤖 Mock LLM listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Text normalization check: streaming normalize_pieces() vs clean_text().
+
+    python normalize_bench.py                    # 2000 synthetic pages
+    python normalize_bench.py --pages 20000 --repeat 5
+
+The synthetic document has what real PDF exports have: a running header
+and a "Page N of M" footer on every page, words hyphenated across line
+breaks, ligatures / full-width characters, non-English paragraphs and
+stray control characters.
+
+For both cleaners it prints:
+    - throughput (MB/s of input) and peak extra memory (tracemalloc)
+    - chunks produced by the chunker (fewer = less to embed and store)
+    - how much non-ASCII text survived, and whether newlines did
+"""
+
+import time
+import random
+import argparse
+import tracemalloc
+
+from backend.app.processing.cleaner import clean_text, normalize_pieces
+from backend.app.processing.chunker import iter_chunks
+
+WORDS = (
+    "invoice contract resume project report budget meeting summary design "
+    "review quarterly revenue customer support policy onboarding roadmap"
+).split()
+FOREIGN = [
+    "Die Überprüfung des Budgets für das nächste Quartal ist abgeschlossen.",
+    "Le contrôle qualité a été effectué par l'équipe de conformité.",
+    "会議の議事録と予算の見直しは来週までに共有されます。",
+    "Отчёт о продажах за квартал готов к проверке.",
+]
+
+
+def _page(rng: random.Random, n: int, total: int) -> str:
+    lines = ["ACME Corp — Confidential Quarterly Report", ""]
+    for _ in range(30):
+        words = [rng.choice(WORDS) for _ in range(12)]
+        line = " ".join(words)
+        if rng.random() < 0.2:                       # hyphenated line break
+            line += " perfor-"
+            words = ["mance"] + words[:3]
+            line += "\n" + " ".join(words)
+        if rng.random() < 0.1:
+            line = rng.choice(FOREIGN) + " ﬁnancial ＱＵＡＲＴＥＲ\x07­"
+        lines.append(line)
+    lines += ["", f"Page {n} of {total}"]
+    return "\n".join(lines) + "\n"
+
+
+def _run(name, clean, pages, repeat):
+    size = sum(len(p.encode("utf-8")) for p in pages)
+    best, out = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = clean(pages)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    clean(pages)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    chunks = sum(1 for c in iter_chunks([out]) if c.strip())
+    non_ascii = sum(1 for ch in out if ord(ch) > 127)
+    print(f"{name:<16} {size / best / 1e6:8.1f} MB/s   peak {peak / 1e6:7.1f} MB   "
+          f"chunks {chunks:7d}   non-ascii {non_ascii:8d}   newlines {out.count(chr(10)):7d}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pages = [_page(rng, n + 1, args.pages) for n in range(args.pages)]
+    print(f"📄 {args.pages} pages, {sum(map(len, pages)) / 1e6:.1f}M chars")
+
+    _run("clean_text", lambda p: clean_text("".join(p)), pages, args.repeat)
+    _run("normalize_pieces", lambda p: "".join(normalize_pieces(p, paged=True)), pages, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
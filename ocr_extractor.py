@@ -1,11 +1,25 @@
-import pytesseract                   # OCR engine for reading text from images
-from PIL import Image                # PIL to open images
+import io
 
 def extract_image_text(file_path: str) -> str:
     """
     Uses Tesseract OCR to read text from image files (JPG, PNG).
     """
 
+    import pytesseract                         # OCR engine (imported on first use)
+    from PIL import Image                      # PIL to open images
+
     image = Image.open(file_path)              # Open the image using PIL
     text = pytesseract.image_to_string(image)  # Perform OCR to extract text
     return text                                # Return extracted text
+
+
+def extract_image_bytes(data: bytes) -> str:
+    """
+    Same as extract_image_text, but for an image already in memory.
+    """
+
+    import pytesseract
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))       # PIL decodes straight from the buffer
+    return pytesseract.image_to_string(image)
@@ -0,0 +1,125 @@
+# --------------------------------------------------------------
+# ONNX Runtime encoder for the local sentence-transformers model
+# --------------------------------------------------------------
+#
+# Reproduces the SentenceTransformer pipeline (tokenize → transformer →
+# mean pooling → optional L2 normalize) on onnxruntime, which is much
+# faster than eager PyTorch on CPU-only machines.
+#
+# The .onnx files are exported once from the local model:
+#     local_model/onnx/model.onnx          (float32)
+#     local_model/onnx/model_int8.onnx     (dynamic int8 quantized)
+
+import os
+import json
+import numpy as np
+
+
+def _read_json(path: str, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def export_onnx(model_dir: str, onnx_path: str, quantize: bool = False) -> str:
+    """
+    Export the transformer of `model_dir` to ONNX (needs torch + transformers).
+    With quantize=True an int8 copy is written next to it and its path returned.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+    fp32_path = onnx_path.replace("_int8", "") if quantize else onnx_path
+
+    if not os.path.exists(fp32_path):
+        print(f"🔧 Exporting ONNX model → {fp32_path}")
+        tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        model = AutoModel.from_pretrained(model_dir).eval()
+
+        dummy = tokenizer(["export sample"], return_tensors="pt")
+        input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in dummy]
+        dynamic = {n: {0: "batch", 1: "sequence"} for n in input_names}
+        dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(dummy[n] for n in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic,
+                opset_version=14,
+            )
+
+    if not quantize:
+        return fp32_path
+
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    print(f"🔧 Quantizing ONNX model (int8) → {onnx_path}")
+    quantize_dynamic(fp32_path, onnx_path, weight_type=QuantType.QInt8)
+    return onnx_path
+
+
+class OnnxEncoder:
+    """
+    Drop-in replacement for SentenceTransformer.encode() on onnxruntime.
+    """
+
+    def __init__(self, model_dir: str, onnx_path: str, threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            opts.intra_op_num_threads = threads
+            opts.inter_op_num_threads = 1
+
+        self.session = ort.InferenceSession(onnx_path, opts, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        # Mirror the sentence-transformers config of the local model
+        st_config = _read_json(os.path.join(model_dir, "sentence_bert_config.json"), {})
+        self.max_length = st_config.get("max_seq_length", 256)
+
+        modules = _read_json(os.path.join(model_dir, "modules.json"), [])
+        self.normalize = any(m.get("type", "").endswith("Normalize") for m in modules)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.session.get_outputs()[0].shape[-1])
+
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True, **_):
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        out = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            tokens = self.tokenizer(
+                batch, padding=True, truncation=True,
+                max_length=self.max_length, return_tensors="np",
+            )
+            feeds = {k: v.astype(np.int64) for k, v in tokens.items() if k in self.input_names}
+            if "token_type_ids" in self.input_names and "token_type_ids" not in feeds:
+                feeds["token_type_ids"] = np.zeros_like(feeds["input_ids"])
+
+            hidden = self.session.run(None, feeds)[0]              # (batch, seq, dim)
+
+            # Mean pooling over real (non-padding) tokens
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+            if self.normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+            out.append(pooled.astype(np.float32))
+
+        emb = np.concatenate(out) if out else np.zeros((0, 0), dtype=np.float32)
+        return emb[0] if single else emb
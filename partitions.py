@@ -0,0 +1,101 @@
+"""
+Index partitions (multi-user / multi-tenant).
+
+Every partition — one user's My Drive, or one shared drive — has its own
+data directory with its own Drive token, FAISS snapshots, ingest journal,
+raw download cache and sync lock:
+
+    backend/app/data/                          → partition "default" (single-user installs)
+    backend/app/data/partitions/<partition>/   → every other partition
+        token.json  snapshots/  ingest_journal.db  raw/  sync.lock
+
+Requests pick their partition with the `X-Drive-Partition` header (the
+Apps Script add-on sends the user's email, or a shared drive id set in
+its script properties); no header → "default". The caller's email comes
+from a verified identity token (core/identity.py), never from a header
+the client picks; with ACL enforcement, any other partition needs it,
+and an email partition only serves that user (check_access(), used by
+the query and sync routes).
+
+Query-side stores are loaded on first use and the least recently used
+partitions are unloaded beyond MAX_LOADED_PARTITIONS.
+"""
+
+import os
+import re
+
+from backend.app.config import settings
+from backend.app.core.identity import verified_user, Unauthenticated
+
+DATA_DIR = "backend/app/data"
+PARTITIONS_DIR = os.path.join(DATA_DIR, "partitions")
+DEFAULT_PARTITION = "default"
+
+MAX_LOADED_PARTITIONS = int(os.environ.get("MAX_LOADED_PARTITIONS", "8"))
+ACL_ENFORCE = os.environ.get("QUERY_ACL_ENFORCE", "1") == "1"
+
+PARTITION_HEADER = "x-drive-partition"
+
+# Emails and Drive ids; no path separators, so the id is safe as a dir name
+_VALID_ID = re.compile(r"^[a-z0-9@._+-]{1,128}$")
+
+
+def normalize_partition(partition: str = None) -> str:
+    """Canonical partition id; raises ValueError for anything unsafe."""
+    if not partition:
+        return DEFAULT_PARTITION
+    partition = partition.strip().lower()
+    if not _VALID_ID.match(partition) or partition.strip(".") == "":
+        raise ValueError(f"Invalid partition id: {partition!r}")
+    return partition
+
+
+def partition_dir(partition: str = None) -> str:
+    partition = normalize_partition(partition)
+    if partition == DEFAULT_PARTITION:
+        return DATA_DIR
+    return os.path.join(PARTITIONS_DIR, partition)
+
+
+def partition_path(partition: str, *parts) -> str:
+    """Path inside a partition's data dir (the dir is created on demand)."""
+    base = partition_dir(partition)
+    os.makedirs(base, exist_ok=True)
+    return os.path.join(base, *parts)
+
+
+def token_path(partition: str = None) -> str:
+    """Drive OAuth token of the partition (the default keeps settings.GOOGLE_TOKEN_PATH)."""
+    if normalize_partition(partition) == DEFAULT_PARTITION:
+        return settings.GOOGLE_TOKEN_PATH
+    return partition_path(partition, "token.json")
+
+
+def list_partitions() -> list[str]:
+    """The default partition plus every partition dir that has a Drive token."""
+    found = [DEFAULT_PARTITION]
+    if os.path.isdir(PARTITIONS_DIR):
+        for name in sorted(os.listdir(PARTITIONS_DIR)):
+            if _VALID_ID.match(name) and os.path.exists(os.path.join(PARTITIONS_DIR, name, "token.json")):
+                found.append(name)
+    return found
+
+
+def partition_from_headers(headers) -> tuple[str, str]:
+    """
+    (partition, verified user email or None) from request headers;
+    ValueError if malformed, identity.Unauthenticated for a bad token.
+    """
+    partition = normalize_partition(headers.get(PARTITION_HEADER))
+    return partition, verified_user(headers)
+
+
+def check_access(partition: str = None, user: str = None):
+    """Unauthenticated without a user where one is needed, PermissionError for someone else's partition."""
+    partition = normalize_partition(partition)
+    if not ACL_ENFORCE or partition == DEFAULT_PARTITION:
+        return
+    if not user:
+        raise Unauthenticated("A verified identity token is required for a non-default partition")
+    if "@" in partition and partition != user.strip().lower():
+        raise PermissionError(f"Partition {partition!r} belongs to another user")
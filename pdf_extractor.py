@@ -1,17 +1,50 @@
-import fitz  # PyMuPDF library for extracting text from PDFs
-
 def extract_pdf_text(file_path: str) -> str:
     """
     Extracts text from a PDF file using PyMuPDF (fitz).
     Returns one combined text string.
     """
 
+    import fitz  # PyMuPDF library for extracting text from PDFs (imported on first use)
+
     doc = fitz.open(file_path)                     # Open the PDF file
-    full_text = ""                                 # Accumulator for all extracted text
+    return _read_pages(doc)
+
+
+def extract_pdf_bytes(data: bytes) -> str:
+    """
+    Extracts text from a PDF held in memory (bytes / memoryview).
+    No temporary file is written.
+    """
+
+    import fitz
+
+    doc = fitz.open(stream=data, filetype="pdf")   # Open straight from the buffer
+    return _read_pages(doc)
+
+
+def iter_pdf_pages(file_path: str):
+    """Yields the text of one page at a time (sync streams these into the chunker)."""
+
+    import fitz
+
+    yield from _iter_pages(fitz.open(file_path))
+
+
+def iter_pdf_pages_bytes(data: bytes):
+    """Same as iter_pdf_pages, for a PDF held in memory."""
+
+    import fitz
+
+    yield from _iter_pages(fitz.open(stream=data, filetype="pdf"))
+
+
+def _iter_pages(doc):
+    try:
+        for page in doc:                           # Loop through each page
+            yield page.get_text() + "\n"           # Extract clean text from the page
+    finally:
+        doc.close()                                # Close the file to free memory
 
-    for page in doc:                               # Loop through each page
-        text = page.get_text()                     # Extract clean text from the page
-        full_text += text + "\n"                   # Append text to final output
 
-    doc.close()                                    # Close the file to free memory
-    return full_text                               # Return the complete extracted text
+def _read_pages(doc) -> str:
+    return "".join(_iter_pages(doc))               # Return the complete extracted text
@@ -0,0 +1,220 @@
+"""
+Opt-in profiling for individual slow syncs / slow queries.
+
+    with profile("query") as session:         # session is None when disabled
+        answer_query(...)
+
+    with track_allocations("extract"):        # tracemalloc peak, only inside a session
+        text = extractor.extract_bytes(data, name)
+
+Enabled per request (`X-Profile: 1` on /query) or per sync job
+(`POST /sync?profile=true`). Each session writes to PROFILE_DIR:
+
+    <name>_<timestamp>.collapsed   folded stacks ("a;b;c 42"), feed to
+                                   flamegraph.pl, speedscope or inferno
+    <name>_<timestamp>.json        duration, sample count, allocation peaks
+
+The sampler is a daemon thread that reads the profiled thread's stack via
+sys._current_frames() every PROFILE_SAMPLE_MS, so the profiled code itself
+is not instrumented. PROFILE_MODE=cprofile switches to deterministic
+cProfile (.prof, pstats format) — exact call counts, higher overhead.
+Only one cProfile session runs per process (it hooks the interpreter
+globally); a request that asks for one while another is active is not
+profiled (session None).
+
+session.path is None when the profile could not be written.
+
+When no session is active, profile(enabled=False) and track_allocations()
+are a single check and a bare yield.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import tracemalloc
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+from backend.app.utils.logger import get_logger
+
+logger = get_logger("profiling")
+
+PROFILE_DIR = "backend/app/data/profiles"
+PROFILE_MODE = os.environ.get("PROFILE_MODE", "sample").lower()         # sample | cprofile
+PROFILE_SAMPLE_MS = float(os.environ.get("PROFILE_SAMPLE_MS", "5"))
+MAX_STACK_DEPTH = 128
+
+_session = contextvars.ContextVar("drive_agent_profile", default=None)
+
+# cProfile hooks the whole interpreter → one session at a time
+_cprofile_lock = threading.Lock()
+
+# tracemalloc is process-wide → refcounted so overlapping phases share it
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label.replace(";", ":")          # ';' separates frames in the folded format
+
+
+class SamplingProfiler:
+    """Samples one thread's stack on a background thread; counts folded stacks."""
+
+    def __init__(self, thread_id: int, interval_ms: float = PROFILE_SAMPLE_MS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000.0
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfileSession:
+    """One profiled run: the sampler/cProfile plus allocation peaks per phase."""
+
+    def __init__(self, name: str, mode: str = PROFILE_MODE):
+        self.name = name
+        self.mode = mode
+        self.alloc_peaks = {}           # phase → peak bytes allocated inside it
+        self.started_at = None
+        self.seconds = None
+        self.path = None
+        self._sampler = None
+        self._cprofile = None
+
+    def start(self):
+        self.started_at = time.time()
+        if self.mode == "cprofile":
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            self._sampler = SamplingProfiler(threading.get_ident())
+            self._sampler.start()
+
+    def stop(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        self.seconds = time.time() - self.started_at
+
+    def write(self) -> str:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(self.started_at))
+        base = os.path.join(PROFILE_DIR, f"{self.name}_{stamp}_{int(self.started_at * 1000) % 1000:03d}")
+
+        if self._cprofile is not None:
+            self.path = base + ".prof"
+            self._cprofile.dump_stats(self.path)
+        else:
+            self.path = base + ".collapsed"
+            self._sampler.write_collapsed(self.path)
+
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        return self.path
+
+    def summary(self) -> dict:
+        return {
+            "name": self.name,
+            "mode": self.mode,
+            "started_at": self.started_at,
+            "seconds": round(self.seconds or 0.0, 4),
+            "samples": self._sampler.samples if self._sampler else None,
+            "sample_interval_ms": PROFILE_SAMPLE_MS if self._sampler else None,
+            "alloc_peak_bytes": self.alloc_peaks,
+            "profile": os.path.basename(self.path) if self.path else None,
+        }
+
+
+@contextmanager
+def profile(name: str, enabled: bool = True):
+    """Profile the enclosed block (current thread). Yields the session, or None if disabled."""
+    if not enabled or _session.get() is not None:
+        yield None
+        return
+
+    exclusive = PROFILE_MODE == "cprofile"
+    if exclusive and not _cprofile_lock.acquire(blocking=False):
+        logger.info("cProfile session already active, not profiling %s", name)
+        yield None
+        return
+
+    session = ProfileSession(name)
+    try:
+        session.start()
+        token = _session.set(session)
+        try:
+            yield session
+        finally:
+            session.stop()
+            _session.reset(token)
+            try:
+                session.write()
+                logger.info("profile written path=%s seconds=%.3f", session.path, session.seconds)
+            except OSError as e:
+                session.path = None
+                logger.warning("could not write profile %s: %s", name, e)
+    finally:
+        if exclusive:
+            _cprofile_lock.release()
+
+
+@contextmanager
+def track_allocations(phase: str):
+    """Record the tracemalloc peak of the enclosed block into the active session."""
+    global _tracemalloc_users
+
+    session = _session.get()
+    if session is None:
+        yield
+        return
+
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0:
+            tracemalloc.start()
+        _tracemalloc_users += 1
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        with _tracemalloc_lock:
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            session.alloc_peaks[phase] = max(session.alloc_peaks.get(phase, 0), peak)
+            _tracemalloc_users -= 1
+            if _tracemalloc_users == 0:
+                tracemalloc.stop()
@@ -1,11 +1,17 @@
 # backend/app/rag/prompt_builder.py
 
+import os
 from typing import List, Dict
 
-def build_prompt(chunks: List[Dict], question: str, mode: str = "default", max_chars: int = 4000) -> str:
+# Hits carry their full chunk text (+ neighbouring chunks), not just the snippet
+PROMPT_MAX_CHARS = int(os.environ.get("PROMPT_MAX_CHARS", "12000"))
+PROMPT_MAX_CHUNK_CHARS = int(os.environ.get("PROMPT_MAX_CHUNK_CHARS", "3000"))
+
+def build_prompt(chunks: List[Dict], question: str, mode: str = "default",
+                 max_chars: int = PROMPT_MAX_CHARS, max_chunk_chars: int = PROMPT_MAX_CHUNK_CHARS) -> str:
     """
     Builds a clean RAG prompt:
-    - Reads FAISS metadata chunks (file_name, snippet…)
+    - Reads FAISS search hits (file_name, text — or the snippet if no text…)
     - Supports "default" (answer question) and "summary" (merge all info)
     """
 
@@ -31,9 +37,9 @@ def build_prompt(chunks: List[Dict], question: str, mode: str = "default", max_c
 
     for i, chunk in enumerate(chunks, start=1):
         file_name = chunk.get("file_name", "unknown_file")
-        snippet = chunk.get("snippet", "")
+        text = chunk.get("text") or chunk.get("snippet", "")
 
-        safe = snippet if len(snippet) <= 1000 else snippet[:1000] + " ... (truncated)"
+        safe = text if len(text) <= max_chunk_chars else text[:max_chunk_chars] + " ... (truncated)"
         block = f"[{i}] {file_name}\n{safe}\n"
 
         if used_chars + len(block) > max_chars:
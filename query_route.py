@@ -1,60 +1,157 @@
 # backend/app/routes/query_route.py
 
-from fastapi import APIRouter
+import math
 
-from backend.app.models.schemas import QueryRequest, QueryResponse, ChunkResult
-from backend.app.embeddings.embedder import EmbeddingModel
-from backend.app.vectorstore.faiss_store import FaissStore
-from backend.app.rag.prompt_builder import build_prompt
-from backend.app.rag.llm_engine import run_llm
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from backend.app.models.schemas import (
+    QueryRequest, QueryResponse, QueryBatchRequest, QueryBatchResponse,
+    FileSearchRequest, FileSearchResponse,
+)
+from backend.app.vectorstore.faiss_store import get_faiss_store
+from backend.app.rag.query_service import answer_query, answer_queries, find_files, batch_llm_concurrency
+from backend.app.core.warmup import start_warmup, readiness
+from backend.app.core.partitions import partition_from_headers, check_access
+from backend.app.core.identity import Unauthenticated
+from backend.app.utils.responses import json_response
+from backend.app.core.admission import (
+    query_gate, llm_gate, llm_batch_gate, single_flight, Overloaded, Deadline, QUERY_DEADLINE_SECONDS,
+)
+from backend.app.utils.metrics import QUERIES_TOTAL, begin_trace, end_trace, server_timing
+from backend.app.utils.profiling import profile
 
 router = APIRouter(prefix="/query")
 
-# Load once
-embedder = EmbeddingModel()
-faiss_store = FaissStore()
 
+# Model + index load lazily (first query) or in the background warm-up
+@router.on_event("startup")
+def warm_up_query_path():
+    start_warmup()
+
+
+# `X-Trace: 1` → per-stage timings come back in a Server-Timing header
+def _traced(request: Request) -> bool:
+    if request.headers.get("x-trace") == "1":
+        begin_trace()
+        return True
+    return False
+
+
+# `X-Drive-Partition` → which index, identity token → who asks (ACL
+# filtering); a caller may only read partitions check_access() allows
+def _caller(request: Request):
+    try:
+        partition, user = partition_from_headers(request.headers)
+        check_access(partition, user)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Unauthenticated as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    return partition, user
+
+
+# Bounded concurrency (core/admission.py): no slot within the queue
+# deadline → 503 + Retry-After instead of piling up in the threadpool
+def _busy(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+def _admitted(deadline: Deadline, run):
+    try:
+        with query_gate.slot(deadline):
+            return run()
+    except Overloaded as e:
+        raise _busy(e)
+
+
+# Only what the client asked for (`fields`, `max_results`) goes on the wire
+def _select(result: QueryResponse, fields=None, max_results: int = None) -> dict:
+    hits = result.results[:max_results] if max_results else result.results
+    include = set(fields) if fields else None
+    return {
+        "answer": result.answer,
+        "results": [hit.model_dump(include=include) for hit in hits],
+        "degraded": result.degraded,
+    }
+
+
+# Responses are serialized with orjson and gzip/brotli-compressed when
+# large (utils/responses.py); response_model only documents the shape.
 @router.post("/", response_model=QueryResponse)
-def run_query(payload: QueryRequest):
+def run_query(payload: QueryRequest, request: Request):
+    QUERIES_TOTAL.inc(endpoint="query")
+    partition, user = _caller(request)
+    traced = _traced(request)
+    deadline = Deadline()
+
+    # `X-Profile: 1` → sampled flamegraph of this query under data/profiles
+    with profile("query", enabled=request.headers.get("x-profile") == "1") as session:
+        # embed → search FAISS (top 7) → prompt → LLM, see rag/query_service.py;
+        # identical queries in flight at the same time share one run
+        key = (partition, user, payload.mode, payload.query.strip())
+        try:
+            result = single_flight.do(key, lambda: _admitted(deadline, lambda: answer_query(
+                payload.query, mode=payload.mode, partition=partition, user=user, deadline=deadline,
+            )), timeout=deadline.remaining())
+        except Overloaded as e:          # waited on an identical query past the deadline
+            raise _busy(e)
 
-    query = payload.query
-    mode = payload.mode       # ← NEW
+    headers = {}
+    if traced:
+        headers["Server-Timing"] = server_timing(end_trace())
+    if session is not None and session.path:
+        headers["X-Profile"] = session.path
+    return json_response(request, _select(result, payload.fields, payload.max_results), headers=headers)
 
-    # ---------------------------
-    # 1. Embed user query
-    # ---------------------------
-    query_vec = embedder.embed_query(query)
 
-    # ---------------------------
-    # 2. Search FAISS (top 7)
-    # ---------------------------
-    results = faiss_store.search(query_vec, k=7)
+# Bulk retrieval → one batched embed + one multi-row FAISS search
+@router.post("/batch", response_model=QueryBatchResponse)
+def run_query_batch(payload: QueryBatchRequest, request: Request):
+    QUERIES_TOTAL.inc(len(payload.queries), endpoint="batch")
+    partition, user = _caller(request)
+    traced = _traced(request)
 
-    if len(results) == 0:
-        return QueryResponse(answer="I don't know.", results=[])
+    # One query slot for the whole batch; its budget grows with the LLM rounds
+    rounds = math.ceil(len(payload.queries) / batch_llm_concurrency(payload.llm_concurrency))
+    deadline = Deadline(QUERY_DEADLINE_SECONDS * max(1, rounds))
 
-    # ---------------------------
-    # 3. Build prompt (default/summary)
-    # ---------------------------
-    prompt = build_prompt(results, query, mode=mode)
+    results = _admitted(deadline, lambda: answer_queries(
+        payload.queries,
+        mode=payload.mode,
+        k=payload.top_k,
+        generate_answers=payload.generate_answers,
+        llm_concurrency=payload.llm_concurrency,
+        partition=partition,
+        user=user,
+        deadline=deadline,
+    ))
 
-    # ---------------------------
-    # 4. LLM answer
-    # ---------------------------
-    answer = run_llm(prompt)
+    headers = {"Server-Timing": server_timing(end_trace())} if traced else None
+    return json_response(request, {"results": [_select(r) for r in results]}, headers=headers)
 
-    # ---------------------------
-    # 5. Convert metadata to Pydantic
-    # ---------------------------
-    response_chunks = [ChunkResult(**chunk) for chunk in results]
 
-    return QueryResponse(
-        answer=answer,
-        results=response_chunks
-    )
+# "Which files are about X" → file-level centroids only, no LLM
+@router.post("/files", response_model=FileSearchResponse)
+def run_file_search(payload: FileSearchRequest, request: Request):
+    QUERIES_TOTAL.inc(endpoint="files")
+    partition, user = _caller(request)
+    result = _admitted(Deadline(), lambda: find_files(payload.query, k=payload.top_k, partition=partition, user=user))
+    return json_response(request, result.model_dump())
 
 
 # Debug → count vectors in FAISS
 @router.get("/debug/index_count")
-def debug_index_count():
-    return {"faiss_vectors": faiss_store.index.ntotal}
+def debug_index_count(request: Request):
+    partition, _ = _caller(request)
+    return {"faiss_vectors": get_faiss_store(read_only=True, partition=partition).index.ntotal}
+
+
+# Readiness → 200 once model + index are loaded, 503 while warming up
+@router.get("/ready")
+def ready():
+    status = readiness()
+    status["admission"] = {"query": query_gate.stats(), "llm": llm_gate.stats(), "llm_batch": llm_batch_gate.stats()}
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
@@ -0,0 +1,252 @@
+# backend/app/rag/query_service.py
+#
+# Retrieval + answer generation, usable without HTTP.
+#
+#   answer_query("what is in my resume?")                 → QueryResponse
+#   answer_queries(["q1", "q2", ...], llm_concurrency=8)  → [QueryResponse, ...]
+#   find_files("quarterly budget")                        → FileSearchResponse
+#
+# The batch path embeds all queries in ONE encode() call and searches
+# FAISS with ONE multi-row search(), instead of N of each.
+#
+# Chunks are deduplicated at ingest, so each hit is expanded to every
+# file that contains it (postings in the ingest journal) → "sources".
+# Near-duplicate hits (SimHash, processing/dedup.py) are collapsed into
+# the best-scoring one.
+#
+# `partition` selects the index (core/partitions.py). When the caller's
+# email is known (`user`), sources the user cannot open per the Drive
+# permissions stored at sync are dropped, and so are hits left without
+# any source; FAISS is over-fetched (k × ACL_OVERFETCH) to refill top-k.
+# A file whose permissions are unknown is not shown to a user. The user's
+# own partition is not filtered: it was listed with their own token.
+# Group shares are not expanded to members, so a file shared with the
+# user only through a group is not shown.
+#
+# With ACL_ENFORCE, check_access() runs first: a non-default partition
+# needs a verified `user` (core/identity.py), and a partition named by an
+# email is served only to that user.
+#
+# The prompt gets each hit's full chunk text from the compressed text
+# store, widened by PROMPT_NEIGHBOR_CHUNKS chunks of the same file per side.
+#
+# With a `deadline` (core/admission.py) the LLM call gets only the time
+# left of it, and must win a slot of the shared llm_gate; when it cannot,
+# the query is answered retrieval-only (degraded=True). Batch calls also
+# need a slot of llm_batch_gate, which has fewer slots than llm_gate, so
+# batches cannot starve interactive queries. They wait for slots up to
+# the batch deadline, so a batch only degrades when it runs out of time.
+
+import os
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from backend.app.models.schemas import QueryResponse, ChunkResult, FileSearchResponse, FileResult
+from backend.app.embeddings.embedder import get_embedding_model
+from backend.app.vectorstore.faiss_store import get_faiss_store
+from backend.app.rag.prompt_builder import build_prompt
+from backend.app.rag.llm_engine import run_llm
+from backend.app.drive.ingest_journal import get_journal_reader
+from backend.app.processing.dedup import collapse_near
+from backend.app.core.partitions import normalize_partition, check_access, ACL_ENFORCE
+from backend.app.core.admission import (
+    llm_gate, llm_batch_gate, Overloaded, Deadline, LLM_MIN_BUDGET, ADMISSION_TOTAL,
+)
+from backend.app.utils.metrics import stage_timer
+
+# Calibrated similarity cutoff (cosine); unset → keep every top-k hit
+QUERY_MIN_SCORE = float(os.environ["QUERY_MIN_SCORE"]) if os.environ.get("QUERY_MIN_SCORE") else None
+DEFAULT_TOP_K = 7
+NO_ANSWER = "I don't know."
+DEGRADED_ANSWER = "The answer service is busy right now; here are the most relevant passages."
+
+ACL_OVERFETCH = int(os.environ.get("QUERY_ACL_OVERFETCH", "3"))
+PROMPT_NEIGHBOR_CHUNKS = int(os.environ.get("PROMPT_NEIGHBOR_CHUNKS", "1"))
+
+
+def _filtered(partition: str, user: str) -> bool:
+    """Do results need ACL filtering for this caller?"""
+    return bool(ACL_ENFORCE and user) and normalize_partition(partition) != user.strip().lower()
+
+
+def _fetch_k(k: int, filtered: bool) -> int:
+    return k * max(1, ACL_OVERFETCH) if filtered else k
+
+
+def _can_see(acl, user: str) -> bool:
+    if acl is None:                          # permissions unknown → not visible
+        return False
+    domain = user.rsplit("@", 1)[-1]
+    return "anyone" in acl or f"user:{user}" in acl or f"domain:{domain}" in acl
+
+
+def _expand_sources(all_results: list, partition: str = None, user: str = None, k: int = None):
+    """
+    Attach "sources" (all files containing the chunk) to every hit, one
+    lookup for all; with a `user`, keep only what they may see (≤ k hits).
+
+    A hit whose owning file the user may not open, but which a visible copy
+    contains, is handed to that copy: its file fields point at the copy and
+    its text is the chunk alone, without the owner's neighbouring chunks.
+    """
+    journal = get_journal_reader(partition)
+    postings, simhashes = {}, {}
+    if journal is not None:
+        hashes = [r["chunk_hash"] for results in all_results for r in results if r.get("chunk_hash")]
+        postings = journal.sources_for(hashes)
+        simhashes = journal.simhashes_for(hashes)
+
+    own_text = {}                            # id(hit) → text of the chunk alone
+    for results in all_results:
+        for r in results:
+            files = postings.get(r.get("chunk_hash")) or [(r["file_id"], r["file_name"])]
+            r["sources"] = [{
+                "file_id": file_id,
+                "file_name": file_name,
+                "drive_link": f"https://drive.google.com/file/d/{file_id}",
+            } for file_id, file_name in files]
+            own_text[id(r)] = r.pop("chunk_text", r.get("text"))
+
+    if not _filtered(partition, user):
+        for results in all_results:
+            collapse_near(results, simhashes)
+        return
+    if journal is None:                      # no permissions known at all
+        for results in all_results:
+            results.clear()
+        return
+
+    acls = journal.acls_for(
+        fid for results in all_results for r in results
+        for fid in [r["file_id"]] + [s["file_id"] for s in r["sources"]]
+    )
+    for results in all_results:
+        visible = []
+        for r in results:
+            r["sources"] = [s for s in r["sources"] if _can_see(acls.get(s["file_id"]), user)]
+            if not r["sources"]:
+                continue
+            if not _can_see(acls.get(r["file_id"]), user):
+                copy = r["sources"][0]
+                r.update(file_id=copy["file_id"], file_name=copy["file_name"], drive_link=copy["drive_link"])
+                if "text" in r:
+                    r["text"] = own_text[id(r)]
+            visible.append(r)
+        collapse_near(visible, simhashes)           # after filtering: a hidden hit must not hide a visible copy
+        results[:] = visible[:k]
+
+
+def _to_response(results: list, answer: str) -> QueryResponse:
+    if answer is None:
+        return QueryResponse(answer=DEGRADED_ANSWER, degraded=True,
+                             results=[ChunkResult(**chunk) for chunk in results])
+    return QueryResponse(
+        answer=answer,
+        results=[ChunkResult(**chunk) for chunk in results],
+    )
+
+
+def _generate(prompt: str, deadline: Deadline = None, queue_timeout: float = None, batch: bool = False):
+    """LLM answer within the request's remaining budget; None → degraded (retrieval only)."""
+    if deadline is None:
+        return run_llm(prompt)
+    try:
+        with llm_batch_gate.slot(deadline, queue_timeout) if batch else nullcontext(), \
+                llm_gate.slot(deadline, queue_timeout):
+            budget = deadline.remaining()
+            if budget < LLM_MIN_BUDGET:
+                ADMISSION_TOTAL.inc(gate="llm", result="degraded")
+                return None
+            return run_llm(prompt, timeout=budget)
+    except Overloaded:
+        ADMISSION_TOTAL.inc(gate="llm", result="degraded")
+        return None
+
+
+def answer_query(query: str, mode: str = "default", k: int = DEFAULT_TOP_K,
+                 min_score: float = QUERY_MIN_SCORE, partition: str = None,
+                 user: str = None, deadline: Deadline = None) -> QueryResponse:
+    """Single query: embed → search → prompt → LLM."""
+    check_access(partition, user)
+
+    # 1. Embed user query
+    with stage_timer("embed"):
+        query_vec = get_embedding_model().embed_query(query)
+
+    # 2. Search FAISS (partition's index), keep what the user may see
+    store = get_faiss_store(read_only=True, partition=partition)
+    results = store.search(query_vec, k=_fetch_k(k, _filtered(partition, user)), min_score=min_score,
+                           text_window=PROMPT_NEIGHBOR_CHUNKS)
+    _expand_sources([results], partition, user, k)
+
+    if len(results) == 0:
+        return QueryResponse(answer=NO_ANSWER, results=[])
+
+    # 3. Build prompt (default/summary) + 4. LLM answer
+    answer = _generate(build_prompt(results, query, mode=mode), deadline)
+
+    return _to_response(results, answer)
+
+
+def batch_llm_concurrency(requested: int) -> int:
+    """LLM threads of a batch: more than llm_batch_gate slots would only queue."""
+    return max(1, min(requested, llm_batch_gate.limit))
+
+
+def answer_queries(queries: List[str], mode: str = "default", k: int = DEFAULT_TOP_K,
+                   min_score: float = QUERY_MIN_SCORE, generate_answers: bool = True,
+                   llm_concurrency: int = 4, partition: str = None,
+                   user: str = None, deadline: Deadline = None) -> List[QueryResponse]:
+    """
+    Many queries at once (evaluation / pre-warming jobs).
+
+    generate_answers=False → retrieval only (answer is left empty).
+    LLM calls run concurrently, at most `llm_concurrency` (capped at the
+    llm_batch_gate limit) at a time, each waiting for a slot until the deadline.
+    """
+    check_access(partition, user)
+    if not queries:
+        return []
+
+    # 1. One batched encode for every query
+    with stage_timer("embed"):
+        query_vecs = get_embedding_model().embed_batch(queries)
+
+    # 2. One multi-row FAISS search
+    store = get_faiss_store(read_only=True, partition=partition)
+    all_results = store.search_batch(query_vecs, k=_fetch_k(k, _filtered(partition, user)), min_score=min_score,
+                                     text_window=PROMPT_NEIGHBOR_CHUNKS if generate_answers else None)
+    _expand_sources(all_results, partition, user, k)
+
+    if not generate_answers:
+        return [_to_response(results, "") for results in all_results]
+
+    # 3 + 4. Prompts → LLM, bounded concurrency (order preserved by map)
+    def answer(i: int) -> str:
+        if not all_results[i]:
+            return NO_ANSWER
+        prompt = build_prompt(all_results[i], queries[i], mode=mode)
+        return _generate(prompt, deadline, queue_timeout=deadline.remaining() if deadline else None, batch=True)
+
+    with ThreadPoolExecutor(max_workers=batch_llm_concurrency(llm_concurrency)) as pool:
+        answers = list(pool.map(answer, range(len(queries))))
+
+    return [_to_response(results, ans) for results, ans in zip(all_results, answers)]
+
+
+def find_files(query: str, k: int = 10, partition: str = None, user: str = None) -> FileSearchResponse:
+    """Which files are about `query`: file centroids only, no chunk search, no LLM."""
+    check_access(partition, user)
+    with stage_timer("embed"):
+        query_vec = get_embedding_model().embed_query(query)
+
+    store = get_faiss_store(read_only=True, partition=partition)
+    files = store.search_files(query_vec, k=_fetch_k(k, _filtered(partition, user)))
+
+    if _filtered(partition, user):
+        journal = get_journal_reader(partition)
+        acls = journal.acls_for(f["file_id"] for f in files) if journal is not None else {}
+        files = [f for f in files if _can_see(acls.get(f["file_id"]), user)][:k]
+
+    return FileSearchResponse(results=[FileResult(**f) for f in files])
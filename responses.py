@@ -0,0 +1,55 @@
+"""
+Fast JSON responses for the query routes.
+
+    return json_response(request, content)
+
+`content` is plain dicts / lists (already dumped from the Pydantic models),
+serialized with utils/jsonio.py (orjson if installed) and, from
+RESPONSE_COMPRESS_MIN_BYTES on, compressed with brotli (`brotli` package,
+optional) or gzip, whichever the client's Accept-Encoding allows.
+UrlFetchApp in the add-on sends `Accept-Encoding: gzip` and decompresses
+transparently.
+"""
+
+import os
+import gzip
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from backend.app.utils.jsonio import dumps
+
+try:
+    import brotli
+except ImportError:          # optional → gzip only
+    brotli = None
+
+RESPONSE_COMPRESS_MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4           # fast levels; the payloads are small
+
+
+def _accepted_encodings(request: Request) -> set:
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(coding.lower())
+    return accepted
+
+
+def json_response(request: Request, content, status_code: int = 200, headers: dict = None) -> Response:
+    body = dumps(content)
+    headers = dict(headers or {})
+
+    if len(body) >= RESPONSE_COMPRESS_MIN_BYTES:
+        accepted = _accepted_encodings(request)
+        if brotli is not None and "br" in accepted:
+            body = brotli.compress(body, quality=BROTLI_QUALITY)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
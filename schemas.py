@@ -1,24 +1,57 @@
 # backend/app/models/schemas.py
 
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 # ---------------------------
 # INPUT: What user sends
 # ---------------------------
+ChunkField = Literal["file_name", "snippet", "file_id", "drive_link", "score", "sources"]
+
+
 class QueryRequest(BaseModel):
     query: str                # User question
     mode: str = "default"     # NEW → "default" or "summary"
+    fields: Optional[List[ChunkField]] = None              # per-hit fields to return (default: all)
+    max_results: Optional[int] = Field(None, ge=1, le=50)  # return at most this many hits
+
+
+class FileSearchRequest(BaseModel):
+    query: str
+    top_k: int = Field(10, ge=1, le=100)
+
+
+class QueryBatchRequest(BaseModel):
+    queries: List[str] = Field(..., max_length=1000)   # up to 1000 questions per call
+    mode: str = "default"
+    top_k: int = Field(7, ge=1, le=100)
+    generate_answers: bool = True                      # False → retrieval only, no LLM
+    llm_concurrency: int = Field(4, ge=1, le=32)        # parallel LLM calls
 
 
 # ---------------------------
 # RESULT CHUNK FROM FAISS
 # ---------------------------
+class SourceRef(BaseModel):
+    file_id: str
+    file_name: str
+    drive_link: str
+
+
 class ChunkResult(BaseModel):
     file_name: str
     snippet: str
     file_id: str
     drive_link: str
+    score: Optional[float] = None    # cosine similarity (higher = better)
+    sources: List[SourceRef] = []    # every file containing this chunk (deduplicated copies)
+
+
+class FileResult(BaseModel):
+    file_id: str
+    file_name: Optional[str] = None
+    drive_link: str
+    score: float                     # cosine similarity of the file centroid
 
 
 # ---------------------------
@@ -27,3 +60,12 @@ class ChunkResult(BaseModel):
 class QueryResponse(BaseModel):
     answer: str                      # LLM final answer
     results: List[ChunkResult]       # Exact chunks used
+    degraded: bool = False           # LLM busy / out of time → retrieval only, no answer
+
+
+class QueryBatchResponse(BaseModel):
+    results: List[QueryResponse]     # Same order as the request's queries
+
+
+class FileSearchResponse(BaseModel):
+    results: List[FileResult]        # Best matching files first
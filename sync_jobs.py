@@ -0,0 +1,338 @@
+"""
+Background Sync Jobs
+--------------------
+
+POST /sync no longer runs the pipeline inside the HTTP request. Instead:
+
+1. A SyncJob is created and queued (at most ONE active job per index
+   partition — a second POST returns the job that is already queued/running)
+2. A single worker thread runs the queued jobs in order: sync_drive_files(job)
+3. A cross-process file lock per partition keeps other uvicorn workers from
+   syncing it at the same time (the ingest journal + FAISS writer are single-writer)
+4. Clients poll GET /sync/{job_id} for stage, throughput and ETA
+5. DELETE /sync/{job_id} requests cancellation (checked between files)
+
+Optional periodic syncs: set SYNC_INTERVAL_MINUTES > 0 (every partition).
+Profiling a single run: POST /sync?profile=true (see utils/profiling.py).
+"""
+
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from backend.app.utils.logger import get_logger
+from backend.app.utils.metrics import stage_timer
+from backend.app.utils.profiling import profile
+from backend.app.core.partitions import (
+    normalize_partition, partition_path, list_partitions, DEFAULT_PARTITION,
+)
+
+logger = get_logger("sync_jobs")
+
+DATA_DIR = "backend/app/data"
+LOCK_PATH = os.path.join(DATA_DIR, "sync.lock")        # default partition
+
+SYNC_INTERVAL_MINUTES = float(os.environ.get("SYNC_INTERVAL_MINUTES", "0"))
+MAX_JOB_HISTORY = 50                # finished jobs kept for GET /sync/{job_id}
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = (
+    "queued", "running", "succeeded", "failed", "cancelled"
+)
+
+
+class JobCancelled(Exception):
+    """Raised inside the pipeline when a job was cancelled."""
+
+
+# -------------------------------------------------------------------------
+# Job + progress tracking
+# -------------------------------------------------------------------------
+class SyncJob:
+    """
+    Progress of one sync run.
+    sync_drive_files() updates it; the API only reads it.
+    """
+
+    def __init__(self, trigger: str = "api", profile: bool = False, partition: str = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.trigger = trigger
+        self.partition = normalize_partition(partition)
+        self.profile = profile
+        self.profile_path = None
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+        self.stage_name = None
+        self.stage_seconds = {}      # stage → total seconds spent
+        self.files_total = 0
+        self.files_done = 0
+        self.files_skipped = 0
+        self.files_failed = 0        # refused by Drive, retried next sync
+        self.bytes_downloaded = 0
+        self.chunks_indexed = 0
+        self.chunks_deduplicated = 0
+        self.quota = None            # DriveGateway QuotaStats of this run
+
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+
+    # ------------ called by the pipeline ------------
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time one pipeline stage (download / extract / dedup / embed / index_add).
+        Also feeds the drive_agent_stage_seconds histogram.
+        """
+        self.stage_name = name
+        timer = stage_timer(name)
+        timer.start()
+        try:
+            yield
+        finally:
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + timer.stop()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    # ------------ reporting ------------
+    def to_dict(self) -> dict:
+        end = self.finished_at or time.time()
+        elapsed = (end - self.started_at) if self.started_at else 0.0
+
+        files_per_sec = self.files_done / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.files_total - self.files_done - self.files_skipped - self.files_failed, 0)
+        eta = remaining / files_per_sec if files_per_sec > 0 and self.status == RUNNING else None
+
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "trigger": self.trigger,
+            "partition": self.partition,
+            "stage": self.stage_name,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(elapsed, 2),
+            "progress": {
+                "files_total": self.files_total,
+                "files_done": self.files_done,
+                "files_skipped": self.files_skipped,
+                "files_failed": self.files_failed,
+                "bytes_downloaded": self.bytes_downloaded,
+                "chunks_indexed": self.chunks_indexed,
+                "chunks_deduplicated": self.chunks_deduplicated,
+            },
+            "stage_seconds": {k: round(v, 3) for k, v in self.stage_seconds.items()},
+            "throughput": {
+                "files_per_sec": round(files_per_sec, 3),
+                "bytes_per_sec": round(self.bytes_downloaded / elapsed, 1) if elapsed > 0 else 0.0,
+                "chunks_per_sec": round(self.chunks_indexed / elapsed, 2) if elapsed > 0 else 0.0,
+            },
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "drive_quota": self.quota.to_dict() if self.quota else None,
+            "result": self.result,
+            "error": self.error,
+            "profile": self.profile_path,
+        }
+
+
+# -------------------------------------------------------------------------
+# Cross-process lock (one sync per machine, not just per worker)
+# -------------------------------------------------------------------------
+class FileLock:
+    """Non-blocking exclusive lock on LOCK_PATH (fcntl on POSIX, msvcrt on Windows)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = None
+
+    def try_acquire(self) -> bool:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fh = open(self.path, "a+")
+        try:
+            if os.name == "nt":
+                import msvcrt
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        self._fh = fh
+        return True
+
+    def release(self):
+        if self._fh is None:
+            return
+        try:
+            if os.name == "nt":
+                import msvcrt
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._fh.close()
+            self._fh = None
+
+
+def lock_path(partition: str = None) -> str:
+    if normalize_partition(partition) == DEFAULT_PARTITION:
+        return LOCK_PATH
+    return partition_path(partition, os.path.basename(LOCK_PATH))
+
+
+# -------------------------------------------------------------------------
+# Job manager
+# -------------------------------------------------------------------------
+class SyncJobManager:
+    """Queues sync jobs and runs them one at a time on a worker thread."""
+
+    def __init__(self):
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._active = {}              # partition → its queued or running job
+        self._worker = None
+        self._scheduler = None
+
+    # ------------ public API ------------
+    def submit(self, trigger: str = "api", profile: bool = False, partition: str = None) -> SyncJob:
+        """Queue a sync of `partition`. If one is already queued/running there, return it instead."""
+        partition = normalize_partition(partition)
+        with self._lock:
+            if partition in self._active:
+                return self._active[partition]
+
+            job = SyncJob(trigger=trigger, profile=profile, partition=partition)
+            self._jobs[job.id] = job
+            self._active[partition] = job
+            self._trim_history()
+            self._ensure_worker()
+
+        self._wakeup.set()
+        return job
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def list(self, partition: str = None):
+        if partition is None:
+            return list(self._jobs.values())
+        partition = normalize_partition(partition)
+        return [job for job in self._jobs.values() if job.partition == partition]
+
+    def cancel(self, job_id: str):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        job.cancel_event.set()
+        with self._lock:
+            if job.status == QUEUED:
+                self._finish(job, CANCELLED)
+        return job
+
+    def start_scheduler(self, interval_minutes: float = SYNC_INTERVAL_MINUTES):
+        """Submit a sync every `interval_minutes` (no-op if <= 0)."""
+        if interval_minutes <= 0 or self._scheduler is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval_minutes * 60)
+                for partition in list_partitions():
+                    self.submit(trigger="schedule", partition=partition)
+
+        self._scheduler = threading.Thread(target=loop, name="sync-scheduler", daemon=True)
+        self._scheduler.start()
+        logger.info("scheduled sync every %g min", interval_minutes)
+
+    # ------------ internals ------------
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._worker_loop, name="sync-worker", daemon=True)
+            self._worker.start()
+
+    def _trim_history(self):
+        while len(self._jobs) > MAX_JOB_HISTORY:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status in (QUEUED, RUNNING):
+                break
+            self._jobs.pop(oldest_id)
+
+    def _finish(self, job: SyncJob, status: str):
+        job.status = status
+        job.finished_at = time.time()
+        job.stage_name = None
+        if self._active.get(job.partition) is job:
+            del self._active[job.partition]
+
+    def _next_queued(self):
+        with self._lock:
+            for job in self._active.values():          # insertion order = submit order
+                if job.status == QUEUED:
+                    return job
+        return None
+
+    def _worker_loop(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+            job = self._next_queued()
+            while job is not None:
+                try:
+                    self._run(job)
+                except Exception as e:               # never let one job kill the worker
+                    logger.exception("sync job %s crashed the worker loop", job.id)
+                    job.error = job.error or f"{type(e).__name__}: {e}"
+                    with self._lock:
+                        if job.status in (QUEUED, RUNNING):
+                            self._finish(job, FAILED)
+                job = self._next_queued()
+
+    def _run(self, job: SyncJob):
+        file_lock = FileLock(lock_path(job.partition))
+        status = FAILED
+        try:
+            # Imported here: the pipeline loads the embedding model + FAISS
+            from backend.app.drive.sync_service import sync_drive_files
+
+            # Wait for any sync of this partition running in another worker process
+            while not file_lock.try_acquire():
+                if job.cancel_event.wait(2.0):
+                    raise JobCancelled()
+                job.stage_name = "waiting_for_lock"
+
+            job.status = RUNNING
+            job.started_at = time.time()
+            with profile(f"sync_{job.id}", enabled=job.profile) as session:
+                job.result = sync_drive_files(job=job, partition=job.partition)
+            if session is not None:
+                job.profile_path = session.path
+            status = SUCCEEDED
+        except JobCancelled:
+            status = CANCELLED
+        except Exception as e:
+            logger.exception("sync job %s failed", job.id)
+            job.error = f"{type(e).__name__}: {e}"
+            status = FAILED
+        finally:
+            file_lock.release()
+            with self._lock:
+                self._finish(job, status)
+
+
+# Process-wide manager used by sync_route
+job_manager = SyncJobManager()
@@ -1,8 +1,61 @@
-from fastapi import APIRouter
-from backend.app.drive.sync_service import sync_drive_files
+from fastapi import APIRouter, HTTPException, Request
+from backend.app.drive.sync_jobs import job_manager
+from backend.app.core.partitions import partition_from_headers, check_access, list_partitions
+from backend.app.core.identity import Unauthenticated
 
 router = APIRouter()
 
-@router.post("/sync")
-def sync_route():
-    return sync_drive_files()
+
+@router.on_event("startup")
+def start_sync_scheduler():
+    job_manager.start_scheduler()      # no-op unless SYNC_INTERVAL_MINUTES > 0
+
+
+# `X-Drive-Partition` header → which index to sync (default: "default"),
+# under the same access rules as /query
+def _partition(request: Request) -> str:
+    try:
+        partition, user = partition_from_headers(request.headers)
+        check_access(partition, user)
+        return partition
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Unauthenticated as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+
+
+def _job(job_id: str, partition: str):
+    job = job_manager.get(job_id)
+    if job is None or job.partition != partition:      # another partition's job → as if unknown
+        raise HTTPException(status_code=404, detail="Unknown sync job")
+    return job
+
+
+@router.post("/sync", status_code=202)
+def sync_route(request: Request, profile: bool = False):
+    """Queue a sync job (or return the one already running). ?profile=true → flamegraph under data/profiles."""
+    partition = _partition(request)
+    if partition not in list_partitions():             # no Drive token → nothing to sync with
+        raise HTTPException(status_code=404, detail=f"Partition {partition!r} is not authorized for Drive")
+    job = job_manager.submit(profile=profile, partition=partition)
+    return job.to_dict()
+
+
+@router.get("/sync")
+def list_sync_jobs(request: Request):
+    return [job.to_dict() for job in job_manager.list(partition=_partition(request))]
+
+
+@router.get("/sync/{job_id}")
+def sync_status(job_id: str, request: Request):
+    return _job(job_id, _partition(request)).to_dict()
+
+
+@router.delete("/sync/{job_id}")
+def cancel_sync(job_id: str, request: Request):
+    job = job_manager.cancel(_job(job_id, _partition(request)).id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown sync job")
+    return job.to_dict()
@@ -5,7 +5,7 @@ Resumable Google Drive Sync Service (Windows Safe)
 This pipeline performs:
 
 1. Connect to Google Drive
-2. Download supported files:
+2. Download supported files (into memory; large files spill to disk):
       ✔ PDF
       ✔ DOCX
       ✔ TXT
@@ -15,12 +15,41 @@ This pipeline performs:
 4. Split text into chunks
 5. Generate embeddings for each chunk
 6. Store results in FAISS vector store (BATCH SAVE → Windows safe)
-7. Save processed filenames → enabling RESUMABLE sync
+7. Record per-file state in the ingest journal → enabling RESUMABLE sync
+
+Before embedding, each chunk goes through the Deduplicator (exact hash):
+copies of an already indexed chunk are not embedded again, the file is
+just added to that chunk's postings (SYNC_DEDUP=0 turns this off). Near
+duplicates are embedded; queries collapse them (see processing/dedup.py).
+
+Steps 3–6 stream: extractor pages → chunk generator → fixed-size embed
+batches (one reused float32 buffer) → FaissStore pending buffer. A file's
+text, chunks and vectors are never all in memory at once; if the pending
+vectors pass SYNC_MEMORY_CEILING_MB the store is flushed mid-file.
+
+Drive access goes through the DriveGateway (drive_gateway.py): one
+rate limiter for every call, adaptive backoff on quota errors, batched
+permission lookups. Downloads run DRIVE_DOWNLOAD_WORKERS files ahead of
+extraction on a small thread pool. A file Drive refuses for good
+(deleted, not downloadable) is skipped and retried by the next sync.
+
+Every index partition (a user's My Drive or a shared drive, see
+core/partitions.py) is synced separately: its own Drive token, raw dir,
+ingest journal and FAISS snapshots. The Drive permissions of every listed
+file are stored in the journal for query-time ACL filtering.
+
+Embedded files are published together: every SYNC_PUBLISH_FILES files or
+SYNC_PUBLISH_SECONDS, whichever comes first, and at the end of the sync
+(or when it is cancelled). One publish = one FAISS segment, so a first
+sync of N files writes N / SYNC_PUBLISH_FILES segments, not N.
 
 Resume Logic:
 -------------
 If sync stops or errors, the system will pick up where it left off.
-Previously processed files are skipped.
+Committed files are skipped. Files are committed in the same step that
+publishes their vectors (see ingest_journal.py), so a crash never leaves
+duplicate vectors or forces a full re-index; it only loses the files
+embedded since the last publish. Large downloads already on disk are reused.
 
 This version prevents:
 ✔ Windows file-lock errors
@@ -31,177 +60,474 @@ This version prevents:
 
 import os
 import io
-import json
-from googleapiclient.http import MediaIoBaseDownload
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 
 # Local Modules
 from backend.app.drive.drive_client import get_drive_service
+from backend.app.drive.drive_gateway import DriveGateway, DriveFileError, DRIVE_DOWNLOAD_WORKERS
 from backend.app.extractors.extractor import Extractor
-from backend.app.embeddings.embedder import EmbeddingModel
-from backend.app.processing.chunker import chunk_text
-from backend.app.vectorstore.faiss_store import FaissStore
+from backend.app.embeddings.embedder import get_embedding_model, EMBED_BATCH_SIZE
+from backend.app.processing.chunker import iter_chunks
+from backend.app.processing.cleaner import normalize_pieces, is_paged, NORMALIZE_ENABLED
+from backend.app.processing.dedup import Deduplicator, DEDUP_ENABLED
+from backend.app.vectorstore.faiss_store import get_faiss_store
+from backend.app.drive.sync_jobs import SyncJob, JobCancelled
+from backend.app.drive.ingest_journal import (
+    IngestJournal, journal_path, DOWNLOADED, EXTRACTED, EMBEDDED, COMMITTED,
+)
+from backend.app.core.partitions import normalize_partition, partition_path, token_path
+from backend.app.utils.logger import get_logger
+from backend.app.utils.metrics import BYTES_TOTAL, FILES_TOTAL, CHUNKS_TOTAL, DEDUP_TOTAL
+from backend.app.utils.profiling import track_allocations
+
+logger = get_logger("sync")
 
 
 # -------------------------------------------------------------------------
-# INITIAL SETUP — Loaded once when backend starts
+# INITIAL SETUP — cheap objects only; the embedding model and the FAISS
+# writer are loaded on the first sync (see get_embedding_model / get_faiss_store)
 # -------------------------------------------------------------------------
 extractor = Extractor()
-embedder = EmbeddingModel()
-faiss_store = FaissStore()
 
-RAW_DIR = "backend/app/data/raw"
-PROCESSED_FILE = "backend/app/data/processed_files.json"
+RAW_DIR = "backend/app/data/raw"       # default partition; others use <partition>/raw
 
-os.makedirs(RAW_DIR, exist_ok=True)
+# Files up to this size are downloaded into memory and extracted straight
+# from the buffer. Anything bigger (or of unknown size) is written to the raw dir.
+SPILL_THRESHOLD_BYTES = int(os.environ.get("SYNC_SPILL_THRESHOLD_MB", "32")) * 1024 * 1024
+
+# Unsaved vectors held by the FAISS writer before it is flushed to a segment
+MEMORY_CEILING_BYTES = int(os.environ.get("SYNC_MEMORY_CEILING_MB", "256")) * 1024 * 1024
+
+# Embedded files are published (→ visible to queries) in groups
+PUBLISH_EVERY_FILES = int(os.environ.get("SYNC_PUBLISH_FILES", "64"))
+PUBLISH_EVERY_SECONDS = float(os.environ.get("SYNC_PUBLISH_SECONDS", "30"))
 
 
 # -------------------------------------------------------------------------
 # Resume Helpers
 # -------------------------------------------------------------------------
-def load_processed():
-    """Load list of files already processed. Returns {} if none exist."""
-    if not os.path.exists(PROCESSED_FILE):
-        return {}
+def _reusable_download(row, drive_size):
+    """Raw file left by an interrupted run, if it is complete."""
+    if not row or not row["raw_path"] or not os.path.exists(row["raw_path"]):
+        return None
+    on_disk_size = os.path.getsize(row["raw_path"])
+    if on_disk_size != row["size"] or (drive_size is not None and on_disk_size != int(drive_size)):
+        return None
+    return row["raw_path"]
+
+
+# -------------------------------------------------------------------------
+# ACL Helper
+# -------------------------------------------------------------------------
+def acl_principals(drive_file):
+    """
+    Principals allowed to read a listed file, from its Drive permissions.
+    None when Drive did not return permissions (e.g. the caller cannot
+    see the sharing settings) → unknown, hidden from users at query time.
+    """
+    permissions = drive_file.get("permissions")
+    if permissions is None:
+        return None
+
+    principals = []
+    for p in permissions:
+        kind = p.get("type")
+        if kind == "anyone":
+            principals.append("anyone")
+        elif kind == "domain" and p.get("domain"):
+            principals.append(f"domain:{p['domain'].lower()}")
+        elif kind in ("user", "group") and p.get("emailAddress"):
+            principals.append(f"{kind}:{p['emailAddress'].lower()}")
+    return sorted(set(principals))
+
+
+def _fetch_permissions(gateway, files) -> set:
+    """
+    Shared-drive items come without permissions in list() → batched lookups.
+    Returns the ids whose lookup failed: their stored ACL is left as it was
+    (not overwritten with "unknown"), and the next sync looks them up again.
+    """
+    missing = [f for f in files if "permissions" not in f and f.get("driveId")]
+    if not missing:
+        return set()
+
+    fields = "permissions(type, role, emailAddress, domain)"
+    results = gateway.batch({
+        f["id"]: (lambda s, fid=f["id"]: s.permissions().list(fileId=fid, fields=fields, supportsAllDrives=True))
+        for f in missing
+    }, kind="permissions")
+    failed = set()
+    for f in missing:
+        response = results.get(f["id"])
+        if isinstance(response, dict):
+            f["permissions"] = response.get("permissions", [])
+        else:
+            failed.add(f["id"])
+    if failed:
+        logger.warning("permission lookups failed files=%d (ACLs kept, retried next sync)", len(failed))
+    return failed
+
+
+# -------------------------------------------------------------------------
+# Download Helpers
+# -------------------------------------------------------------------------
+def download_file(gateway, file_id, file_path, size=None):
+    """
+    Download one Drive file (rate-limited, retried chunk by chunk).
+
+    Returns:
+        (data, None)       → small file, data is the in-memory bytes
+        (None, file_path)  → large file, written to disk at file_path
+    """
+    in_memory = size is not None and int(size) <= SPILL_THRESHOLD_BYTES
+    fh = io.BytesIO() if in_memory else io.FileIO(file_path, "wb")
+
     try:
-        with open(PROCESSED_FILE, "r") as f:
-            return json.load(f)
-    except Exception:
-        return {}  # corrupted file fallback
+        gateway.download(file_id, fh)
+    finally:
+        if not in_memory:
+            fh.close()
+
+    if in_memory:
+        return fh.getvalue(), None
+    return None, file_path
+
+
+def _fetch(gateway, raw_dir, f, row):
+    """Download worker: (data, on_disk, reused) for one file."""
+    on_disk = _reusable_download(row, f.get("size"))
+    if on_disk:
+        return None, on_disk, True
 
+    # file id in the name → same-named files can download at the same time
+    file_path = os.path.join(raw_dir, f"{f['id']}_{f['name']}")
+    data, on_disk = download_file(gateway, f["id"], file_path, f.get("size"))
+    return data, on_disk, False
 
-def save_processed(data):
-    """Save updated dictionary of processed filenames."""
-    with open(PROCESSED_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+
+def _prefetched(pool, fetch, items, window):
+    """Yield (item, future) in order, keeping up to `window` downloads in flight."""
+    in_flight = deque()
+    for item in items:
+        in_flight.append((item, pool.submit(fetch, *item)))
+        if len(in_flight) >= window:
+            yield in_flight.popleft()
+    while in_flight:
+        yield in_flight.popleft()
+
+
+# -------------------------------------------------------------------------
+# Streaming Helpers
+# -------------------------------------------------------------------------
+def _batched(items, size):
+    """Group an iterator into lists of `size` (last one may be shorter)."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _index_batch(job, embedder, faiss_store, dedup, batch, buffer, file_name, file_id):
+    """
+    Embed one batch of chunks into `buffer` and append it to the FAISS writer.
+    Duplicates of already indexed chunks are dropped first. Returns #embedded.
+    """
+    hashes = [None] * len(batch)
+    if dedup is not None:
+        with job.stage("dedup"):
+            kept = []
+            for chunk in batch:
+                chunk_hash, kind = dedup.check(chunk)
+                if kind is None:
+                    kept.append((chunk, chunk_hash))
+                else:
+                    job.chunks_deduplicated += 1
+                    DEDUP_TOTAL.inc(kind=kind)
+        if not kept:
+            return 0
+        batch, hashes = [c for c, _ in kept], [h for _, h in kept]
+
+    with job.stage("embed"):
+        vectors = embedder.embed_batch(batch, batch_size=len(batch), out=buffer)
+
+        metas = [{
+            "file_name": file_name,
+            "file_id": file_id,
+            "drive_link": f"https://drive.google.com/file/d/{file_id}",
+            "snippet": chunk[:250],
+            "chunk_hash": chunk_hash,
+        } for chunk, chunk_hash in zip(batch, hashes)]
+
+    with job.stage("index_add"):
+        faiss_store.add_batch(vectors, metas, save=False, texts=batch)   # copied into the pending buffer
+        if faiss_store.pending_bytes() >= MEMORY_CEILING_BYTES:
+            faiss_store.save(publish=False)                   # memory ceiling → stage mid-file
+
+    return len(batch)
+
+
+def _embed_file(job, embedder, faiss_store, journal, dedup, buffer, data, on_disk, file_name, file_id):
+    """Extract → normalize → chunk → dedup → embed one file into the writer (not yet published). Returns #embedded."""
+    if on_disk:
+        pieces = extractor.iter_extract(on_disk)
+    else:
+        pieces = extractor.iter_extract_bytes(data, file_name)
+    if NORMALIZE_ENABLED:
+        pieces = normalize_pieces(pieces, paged=is_paged(file_name))   # NFKC, boilerplate, de-hyphenation
+    batches = _batched((c for c in iter_chunks(pieces) if c.strip()), EMBED_BATCH_SIZE)
+
+    if dedup is not None:
+        dedup.start_file(file_id)
+
+    n_seen = n_chunks = 0
+    while True:
+        with job.stage("extract"), track_allocations("extract"):
+            batch = next(batches, None)
+        if batch is None:
+            break
+        n_seen += len(batch)
+        n_chunks += _index_batch(job, embedder, faiss_store, dedup, batch, buffer, file_name, file_id)
+    journal.mark(file_id, file_name, EXTRACTED)
+
+    # If empty → placeholder for video
+    if n_seen == 0:
+        logger.warning("no extractable text, indexing placeholder file=%s", file_name)
+        text = f"This is a video file: {file_name}\nDrive Link: https://drive.google.com/file/d/{file_id}"
+        for batch in _batched(iter_chunks([text]), EMBED_BATCH_SIZE):
+            n_chunks += _index_batch(job, embedder, faiss_store, dedup, batch, buffer, file_name, file_id)
+
+    if dedup is not None:
+        journal.record_chunks(file_id, file_name, dedup.new_chunks, dedup.postings, n_chunks)
+    else:
+        journal.mark(file_id, file_name, EMBEDDED, chunks=n_chunks)
+    return n_chunks
 
 
 # -------------------------------------------------------------------------
 # MAIN SYNC PIPELINE
 # -------------------------------------------------------------------------
-def sync_drive_files():
+def sync_drive_files(job: SyncJob = None, service=None, partition: str = None):
     """
-    Full sync pipeline with resume capability.
+    Full sync pipeline with resume capability, for one index partition
+    (default: the single-user "default" partition).
+
+    `job` receives per-stage progress and is checked for cancellation
+    between files. Normally this runs on the sync worker thread
+    (see sync_jobs.py), not inside an HTTP request.
+
+    `service` defaults to the real Drive client; benchmarks pass a
+    FakeDriveService instead.
 
     Returns:
         JSON summary of:
             - new_files_indexed
-            - total processed files
+            - total committed files
     """
 
-    print("\n⚡ SYNC STARTED...\n")
-
-    # Files already processed earlier
-    processed = load_processed()
-
-    # Supported MIME Types
-    mime_types = [
-        "application/pdf",
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        "text/plain",
-        "image/png",
-        "image/jpeg",
-        "video/mp4",
-        "video/quicktime",
-        "video/x-msvideo",
-        "video/x-matroska",
-    ]
-
-    # Build Drive search query
-    query = " or ".join([f"mimeType='{m}'" for m in mime_types])
-
-    # Lazy-load Drive service
-    service = get_drive_service()
-    results = service.files().list(q=query).execute()
-
-    files = results.get("files", [])
-    print(f"🔵 Total Drive files detected: {len(files)}")
-
-    new_indexed = 0
-
-    # ---------------------------------------------------------------------
-    # PROCESS FILES ONE BY ONE
-    # ---------------------------------------------------------------------
-    for f in files:
-        file_name = f["name"]
-        file_id = f["id"]
-        file_path = os.path.join(RAW_DIR, file_name)
-
-        # Skip if already processed
-        if file_name in processed:
-            print(f"⏭ SKIP (already processed): {file_name}")
-            continue
-
-        print(f"\n📌 Processing new file: {file_name}")
-
-        # -------------------------------------------------------------
-        # STEP 1: DOWNLOAD FILE
-        # -------------------------------------------------------------
-        download_service = get_drive_service()
-        request = download_service.files().get_media(fileId=file_id)
-        fh = io.FileIO(file_path, "wb")
-        downloader = MediaIoBaseDownload(fh, request)
-
-        done = False
-        while not done:
-            _, done = downloader.next_chunk()
-
-        print("   ✔ Download complete.")
-
-        # -------------------------------------------------------------
-        # STEP 2: EXTRACT TEXT
-        # -------------------------------------------------------------
-        print("   🔍 Extracting text...")
-        text = extractor.extract(file_path)
-
-        # If empty → placeholder for video
-        if not text.strip():
-            print("   ⚠ No extractable text. Saving placeholder.")
-            text = f"This is a video file: {file_name}\nDrive Link: https://drive.google.com/file/d/{file_id}"
-
-        # -------------------------------------------------------------
-        # STEP 3: CHUNK TEXT
-        # -------------------------------------------------------------
-        chunks = chunk_text(text)
-        print(f"   📚 Total chunks created: {len(chunks)}")
-
-        # -------------------------------------------------------------
-        # STEP 4: BATCH EMBED + SAVE (Windows Safe)
-        # -------------------------------------------------------------
-        vectors = []
-        metas = []
-
-        for idx, chunk in enumerate(chunks, 1):
-            print(f"      🔹 Embedding chunk {idx}/{len(chunks)}")
-            vector = embedder.embed(chunk)
-
-            vectors.append(vector)
-            metas.append({
-                "file_name": file_name,
-                "file_id": file_id,
-                "drive_link": f"https://drive.google.com/file/d/{file_id}",
-                "snippet": chunk[:250],
-            })
-
-        # Save batches ONCE → avoids Windows file locks
-        faiss_store.add_batch(vectors, metas)
-
-        print("   ✔ Embeddings saved.")
-
-        # -------------------------------------------------------------
-        # STEP 5: UPDATE PROCESSED LIST
-        # -------------------------------------------------------------
-        processed[file_name] = True
-        save_processed(processed)
-
-        new_indexed += 1
-
-    # ---------------------------------------------------------------------
-    # END OF SYNC SUMMARY
-    # ---------------------------------------------------------------------
-    print("\n✅ SYNC FINISHED.\n")
-
-    return {
-        "message": "Resumable Sync Completed Successfully",
-        "new_files_indexed": new_indexed,
-        "already_processed": len(processed)
-    }
+    partition = normalize_partition(partition)
+    job = job or SyncJob(trigger="direct", partition=partition)
+
+    embedder = get_embedding_model()
+    faiss_store = get_faiss_store(read_only=False, partition=partition)
+    raw_dir = partition_path(partition, "raw")
+    os.makedirs(raw_dir, exist_ok=True)
+
+    logger.info("sync started job=%s trigger=%s partition=%s", job.id, job.trigger, partition)
+
+    # Per-file ingest state; repair a crash between publish and journal write
+    journal = IngestJournal(journal_path(partition))
+    try:
+        journal.reconcile(faiss_store.read_manifest())
+        dedup = Deduplicator(journal) if DEDUP_ENABLED else None
+
+        # Supported MIME Types
+        mime_types = [
+            "application/pdf",
+            "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            "text/plain",
+            "image/png",
+            "image/jpeg",
+            "video/mp4",
+            "video/quicktime",
+            "video/x-msvideo",
+            "video/x-matroska",
+        ]
+
+        # Build Drive search query
+        query = " or ".join([f"mimeType='{m}'" for m in mime_types])
+
+        # Lazy-load Drive service; download threads build their own client.
+        # Never a browser login here: it would block the sync worker.
+        factory = None
+        if service is None:
+            service = get_drive_service(token_path(partition), interactive=False)
+            factory = lambda: get_drive_service(token_path(partition), interactive=False)
+        gateway = DriveGateway(service, service_factory=factory)
+        job.quota = gateway.stats
+
+        # All pages (nextPageToken), rate-limited
+        files = gateway.list_files(
+            query,
+            fields="nextPageToken, files(id, name, mimeType, size, driveId, "
+                   "permissions(type, role, emailAddress, domain))",
+            supportsAllDrives=True, includeItemsFromAllDrives=True,
+        )
+        acl_failed = _fetch_permissions(gateway, files)
+
+        # First run after upgrading: seed the journal from processed_files.json + the index
+        if journal.is_empty():
+            journal.bootstrap(files, faiss_store.meta)
+
+        # Sharing changes (incl. revocations) apply to already indexed files right away;
+        # failed lookups are left out, so a file keeps its last known ACL
+        acls = {f["id"]: acl_principals(f) for f in files if f["id"] not in acl_failed}
+        journal.update_acls(acls.items())
+
+        job.files_total = len(files)
+        logger.info("drive files detected=%d", len(files))
+
+        new_indexed = 0
+
+        # One embedding buffer for every batch of every file
+        batch_buffer = np.empty((EMBED_BATCH_SIZE, embedder.dimension()), dtype="float32")
+
+        # Skip if already committed
+        todo = []
+        for f in files:
+            row = journal.get(f["id"])
+            if row is not None and row["state"] == COMMITTED:
+                job.files_skipped += 1
+                FILES_TOTAL.inc(status="skipped")
+            else:
+                todo.append((f, row))
+
+        # ---------------------------------------------------------------------
+        # PROCESS FILES ONE BY ONE (downloads run ahead on the pool),
+        # PUBLISH THEM IN GROUPS
+        # ---------------------------------------------------------------------
+        unpublished = []                   # embedded files waiting for the next publish
+        last_publish = time.monotonic()
+        pool = ThreadPoolExecutor(max_workers=max(1, DRIVE_DOWNLOAD_WORKERS), thread_name_prefix="drive-download")
+        try:
+            for (f, row), fetched in _prefetched(pool, lambda f, row: _fetch(gateway, raw_dir, f, row),
+                                                 todo, max(1, DRIVE_DOWNLOAD_WORKERS)):
+                try:
+                    job.check_cancelled()
+                except JobCancelled:
+                    _publish(job, faiss_store, journal, dedup, unpublished, acls)   # keep what is done
+                    raise
+                done = _process_file(job, embedder, faiss_store, journal, dedup, batch_buffer,
+                                     f, row, fetched)
+                if done is None:
+                    continue
+                unpublished.append(done)
+
+                if (len(unpublished) >= PUBLISH_EVERY_FILES
+                        or time.monotonic() - last_publish >= PUBLISH_EVERY_SECONDS):
+                    new_indexed += _publish(job, faiss_store, journal, dedup, unpublished, acls)
+                    last_publish = time.monotonic()
+
+            new_indexed += _publish(job, faiss_store, journal, dedup, unpublished, acls)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        # ---------------------------------------------------------------------
+        # END OF SYNC SUMMARY
+        # ---------------------------------------------------------------------
+        logger.info(
+            "sync finished job=%s new_files=%d skipped=%d failed=%d stage_seconds=%s drive=%s",
+            job.id, new_indexed, job.files_skipped, job.files_failed,
+            job.to_dict()["stage_seconds"], gateway.stats.to_dict(),
+        )
+
+        return {
+            "message": "Resumable Sync Completed Successfully",
+            "new_files_indexed": new_indexed,
+            "files_failed": job.files_failed,
+            "already_processed": journal.count(COMMITTED)
+        }
+    finally:
+        journal.close()
+
+
+def _process_file(job, embedder, faiss_store, journal, dedup, batch_buffer, f, row, fetched):
+    """
+    Download result → journal → extract/embed into the writer, unpublished.
+    Returns (file_id, file_name, #chunks, size, in_memory), None if skipped.
+    """
+    file_name = f["name"]
+    file_id = f["id"]
+
+    # -------------------------------------------------------------
+    # STEP 1: DOWNLOAD FILE (or reuse a complete spill from last run)
+    # -------------------------------------------------------------
+    with job.stage("download"):
+        try:
+            data, on_disk, reused = fetched.result()
+        except DriveFileError as e:
+            logger.warning("skipping file=%s id=%s: drive refused it (%s)", file_name, file_id, e)
+            job.files_failed += 1
+            FILES_TOTAL.inc(status="failed")
+            return None
+
+    if reused:
+        size = os.path.getsize(on_disk)
+        logger.info("resuming from downloaded file=%s state=%s", file_name, row["state"])
+    else:
+        size = len(data) if data is not None else os.path.getsize(on_disk)
+        job.bytes_downloaded += size
+        BYTES_TOTAL.inc(size)
+    journal.mark(file_id, file_name, DOWNLOADED, raw_path=on_disk, size=size)
+    journal.reset_chunks(file_id)       # chunk rows of an earlier failed attempt
+
+    # -------------------------------------------------------------
+    # STEP 2–4: EXTRACT → NORMALIZE → CHUNK → EMBED, streamed batch by batch
+    # ("extract" time includes normalizing + chunking; blank chunks are dropped)
+    # -------------------------------------------------------------
+    try:
+        n_chunks = _embed_file(job, embedder, faiss_store, journal, dedup, batch_buffer,
+                               data, on_disk, file_name, file_id)
+    except BaseException:
+        faiss_store.discard_pending()             # nothing unpublished becomes visible
+        raise
+    return file_id, file_name, n_chunks, size, not on_disk
+
+
+def _publish(job, faiss_store, journal, dedup, unpublished, acls) -> int:
+    """
+    STEP 5: publish every embedded file in ONE save (manifest replace =
+    commit point), then commit them in the journal. Empties `unpublished`
+    and returns how many files were published.
+    """
+    if not unpublished:
+        return 0
+    file_ids = [file_id for file_id, _, _, _, _ in unpublished]
+    try:
+        with job.stage("index_add"):
+            faiss_store.save(files=file_ids)
+    except BaseException:
+        faiss_store.discard_pending()
+        raise
+
+    journal.mark_committed_many([(file_id, file_name) for file_id, file_name, _, _, _ in unpublished])
+    journal.update_acls([(file_id, acls[file_id]) for file_id in file_ids if file_id in acls])
+    if dedup is not None:
+        dedup.published()
+
+    for file_id, file_name, n_chunks, size, in_memory in unpublished:
+        job.files_done += 1
+        job.chunks_indexed += n_chunks
+        FILES_TOTAL.inc(status="indexed")
+        CHUNKS_TOTAL.inc(n_chunks)
+        logger.info("indexed file=%s bytes=%d chunks=%d in_memory=%s", file_name, size, n_chunks, in_memory)
+
+    published = len(unpublished)
+    unpublished.clear()
+    return published
@@ -0,0 +1,214 @@
+"""
+Chunk Text Store (compressed, random access)
+--------------------------------------------
+
+FAISS metadata only keeps a 250-char snippet per vector; the full chunk
+text lives next to each snapshot segment:
+
+    snapshots/seg_000042.text               compressed blocks, appended in id order
+    snapshots/seg_000042.text.offsets.npy   [block_chunks, count, off_0, ..., off_n]
+
+Every block holds TEXT_BLOCK_CHUNKS consecutive chunks (so neighbouring
+chunks of a file usually share a block). A decompressed block is
+
+    uint32 byte length of each chunk | the chunks' UTF-8 bytes
+
+and is compressed with zstd (`zstandard` package) or, when that is not
+installed, zlib. The codec is recognised per block from its magic bytes.
+
+Readers mmap the file and the offsets, so looking up chunk i is one
+slice + one decompress; decompressed blocks are kept in a process-wide
+LRU bounded by TEXT_CACHE_MB, so repeated lookups are dict hits.
+"""
+
+import os
+import mmap
+import zlib
+import threading
+from array import array
+from itertools import islice
+from collections import OrderedDict
+
+import numpy as np
+
+from backend.app.config import settings
+from backend.app.utils.metrics import CACHE_TOTAL
+
+try:
+    import zstandard
+except ImportError:          # optional → zlib blocks
+    zstandard = None
+
+TEXT_BLOCK_CHUNKS = int(os.environ.get("TEXT_BLOCK_CHUNKS", "16"))
+TEXT_COMPRESS_LEVEL = int(os.environ.get("TEXT_COMPRESS_LEVEL", "3"))
+TEXT_CACHE_MB = int(os.environ.get("TEXT_CACHE_MB", "32"))
+
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_HEADER = 2                  # offsets[0] = chunks per block, offsets[1] = chunk count
+
+
+def _compress(data: bytes) -> bytes:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=TEXT_COMPRESS_LEVEL).compress(data)
+    return zlib.compress(data, min(TEXT_COMPRESS_LEVEL * 2, 9))
+
+
+def _decompress(data: bytes) -> bytes:
+    if data[:4] == _ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError("chunk text is zstd-compressed; install the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def write_text_file(path: str, texts, block_chunks: int = TEXT_BLOCK_CHUNKS):
+    """
+    Write chunk texts (in vector id order) as compressed blocks + offsets
+    table. `texts` may be any iterable; only one block is held at a time.
+    """
+    texts = iter(texts)
+    block_offsets = array("Q", [0])
+    count = 0
+
+    with open(path, "wb") as f:
+        pos = 0
+        while True:
+            encoded = [t.encode("utf-8") for t in islice(texts, block_chunks)]
+            if not encoded:
+                break
+            count += len(encoded)
+            lengths = np.array([len(e) for e in encoded], dtype="<u4")
+            block = _compress(lengths.tobytes() + b"".join(encoded))
+            f.write(block)
+            pos += len(block)
+            block_offsets.append(pos)
+
+    offsets = np.zeros(_HEADER + len(block_offsets), dtype=np.uint64)
+    offsets[0], offsets[1] = block_chunks, count
+    offsets[_HEADER:] = np.frombuffer(block_offsets, dtype=np.uint64)
+    np.save(path + ".offsets.npy", offsets)
+
+
+# -------------------------------------------------------------------------
+# Decompressed-block LRU (shared by every segment of every store)
+# -------------------------------------------------------------------------
+class BlockCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._blocks = OrderedDict()     # (path, block_no) → (texts, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._blocks.get(key)
+            if entry is not None:
+                self._blocks.move_to_end(key)
+                return entry[0]
+        return None
+
+    def put(self, key, texts, nbytes: int):
+        with self._lock:
+            if key in self._blocks:
+                return
+            self._blocks[key] = (texts, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._blocks) > 1:
+                _, (_, evicted) = self._blocks.popitem(last=False)
+                self._bytes -= evicted
+
+
+block_cache = BlockCache(TEXT_CACHE_MB * 1024 * 1024)
+
+
+class ChunkTextFile:
+    """
+    Read-only, memory-mapped view of one segment's chunk texts.
+    Behaves like a list of str: len(texts), texts[i].
+    """
+
+    def __init__(self, path: str, cache: BlockCache = block_cache):
+        self.path = path
+        self.cache = cache
+        offsets = np.load(path + ".offsets.npy", mmap_mode="r")
+        self.block_chunks, self.count = int(offsets[0]), int(offsets[1])
+        self.offsets = offsets[_HEADER:]
+        self._fh = open(path, "rb")
+        size = os.fstat(self._fh.fileno()).st_size
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return self.count
+
+    def _block(self, b: int) -> list:
+        key = (self.path, b)
+        texts = self.cache.get(key)
+        if texts is not None:
+            CACHE_TOTAL.inc(cache="text_block", result="hit")
+            return texts
+        CACHE_TOTAL.inc(cache="text_block", result="miss")
+
+        raw = _decompress(self._mm[int(self.offsets[b]):int(self.offsets[b + 1])])
+        n = min(self.block_chunks, self.count - b * self.block_chunks)
+        lengths = np.frombuffer(raw, dtype="<u4", count=n)
+        ends = np.cumsum(lengths) + 4 * n
+        texts = [raw[int(end - length):int(end)].decode("utf-8") for length, end in zip(lengths, ends)]
+        self.cache.put(key, texts, len(raw))
+        return texts
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self.count
+        if not 0 <= idx < self.count:
+            raise IndexError(idx)
+        return self._block(idx // self.block_chunks)[idx % self.block_chunks]
+
+    def __iter__(self):
+        for b in range(len(self.offsets) - 1):
+            yield from self._block(b)
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._fh.close()
+
+
+class SnippetTexts:
+    """Stand-in for segments written before the text store: the metadata snippets."""
+
+    def __init__(self, meta):
+        self.meta = meta
+
+    def __len__(self):
+        return len(self.meta)
+
+    def __getitem__(self, idx):
+        return self.meta[idx].get("snippet", "")
+
+    def __iter__(self):
+        for m in self.meta:
+            yield m.get("snippet", "")
+
+
+def open_texts(path: str, meta):
+    """ChunkTextFile for a segment, or its snippets if it has no text file."""
+    if os.path.exists(path + ".offsets.npy"):
+        return ChunkTextFile(path)
+    return SnippetTexts(meta)
+
+
+def stitch(texts: list) -> str:
+    """
+    Join consecutive chunks of one file into one passage. Chunks overlap by
+    CHUNK_OVERLAP chars (see chunker.py); the repeated part is dropped.
+    Chunks that are not adjacent (e.g. a deduplicated one in between) are
+    joined with a gap marker.
+    """
+    overlap = settings.CHUNK_OVERLAP
+    out = texts[0]
+    for t in texts[1:]:
+        if overlap and out.endswith(t[:overlap]):
+            out += t[overlap:]
+        else:
+            out += "\n…\n" + t
+    return out
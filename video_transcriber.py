@@ -1,11 +1,23 @@
-import whisper   # OpenAI Whisper for transcription
+import threading
+
+_model = None                          # Whisper model, loaded on first transcription
+_model_lock = threading.Lock()
+
+
+def _get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import whisper   # OpenAI Whisper for transcription (heavy import)
+                _model = whisper.load_model("base")     # Load a light Whisper model for good performance
+    return _model
 
-model = whisper.load_model("base")     # Load a light Whisper model for good performance
 
 def transcribe_video(file_path: str) -> str:
     """
     Converts spoken audio inside a video file into text using Whisper.
     """
 
-    result = model.transcribe(file_path)    # Run Whisper transcription
-    return result["text"]                   # Return only the transcribed text
+    result = _get_model().transcribe(file_path)    # Run Whisper transcription
+    return result["text"]                          # Return only the transcribed text
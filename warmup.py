@@ -0,0 +1,65 @@
+"""
+Startup warm-up + readiness.
+
+Nothing heavy is loaded at import time any more. The API answers
+immediately after startup; the embedding model and FAISS store are loaded
+on the first request that needs them, or ahead of time by a background
+warm-up thread (WARMUP_ON_STARTUP=1, the default).
+
+GET /query/ready reports whether the query path is fully loaded, so load
+balancers can hold traffic until it is.
+"""
+
+import os
+import time
+import threading
+
+from backend.app.embeddings.embedder import get_embedding_model, is_embedding_model_loaded
+from backend.app.vectorstore.faiss_store import get_faiss_store, is_faiss_store_loaded
+from backend.app.utils.logger import get_logger
+
+logger = get_logger("warmup")
+
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "1") == "1"
+
+_state = {"started_at": None, "finished_at": None, "error": None}
+_thread = None
+
+
+def _warm_up():
+    _state["started_at"] = time.time()
+    try:
+        get_faiss_store(read_only=True)
+        model = get_embedding_model()
+        model.embed_query("warm-up")        # first encode triggers lazy kernels / graph optimisation
+    except Exception as e:
+        _state["error"] = f"{type(e).__name__}: {e}"
+        logger.warning("warm-up failed: %s", _state["error"])
+    finally:
+        _state["finished_at"] = time.time()
+
+
+def start_warmup(force: bool = False):
+    """Load the query-side components in a background thread (once)."""
+    global _thread
+    if not (WARMUP_ON_STARTUP or force) or _thread is not None:
+        return
+    _thread = threading.Thread(target=_warm_up, name="warmup", daemon=True)
+    _thread.start()
+
+
+def readiness() -> dict:
+    components = {
+        "embedding_model": is_embedding_model_loaded(),
+        "faiss_store": is_faiss_store_loaded(read_only=True),
+    }
+    took = None
+    if _state["started_at"] and _state["finished_at"]:
+        took = round(_state["finished_at"] - _state["started_at"], 2)
+
+    return {
+        "ready": all(components.values()),
+        "components": components,
+        "warmup_seconds": took,
+        "warmup_error": _state["error"],
+    }